@@ -9,7 +9,7 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import Base
-from app.models import User, Event, SwapRequest
+from app.models import User, Event, SwapRequest, SwapRequestArchive, SwapIntent, SwapCycle, SwapCycleLeg
 from app.core.config import settings
 
 config = context.config
@@ -0,0 +1,81 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+event_status = sa.Enum("BUSY", "SWAPPABLE", "SWAP_PENDING", name="eventstatus")
+swap_request_status = sa.Enum("PENDING", "ACCEPTED", "REJECTED", name="swaprequeststatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("status", event_status, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_events_id", "events", ["id"])
+
+    op.create_table(
+        "swap_requests",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("requester_slot_id", sa.Integer(), nullable=False),
+        sa.Column("requested_slot_id", sa.Integer(), nullable=False),
+        sa.Column("requester_id", sa.Integer(), nullable=False),
+        sa.Column("receiver_id", sa.Integer(), nullable=False),
+        sa.Column("status", swap_request_status, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["requester_slot_id"], ["events.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["requested_slot_id"], ["events.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["requester_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["receiver_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_swap_requests_id", "swap_requests", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_swap_requests_id", table_name="swap_requests")
+    op.drop_table("swap_requests")
+    op.drop_index("ix_events_id", table_name="events")
+    op.drop_table("events")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
+    swap_request_status.drop(op.get_bind(), checkfirst=True)
+    event_status.drop(op.get_bind(), checkfirst=True)
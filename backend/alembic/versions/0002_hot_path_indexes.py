@@ -0,0 +1,57 @@
+"""Indexes for the hot event and swap request queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GET /events: user_id = ? ORDER BY start_time
+    op.create_index("ix_events_user_id_start_time", "events", ["user_id", "start_time"])
+    # GET /swappable-slots: status = 'SWAPPABLE' ORDER BY start_time, id
+    op.create_index(
+        "ix_events_swappable_start_time",
+        "events",
+        ["start_time", "id"],
+        postgresql_where=sa.text("status = 'SWAPPABLE'"),
+        sqlite_where=sa.text("status = 'SWAPPABLE'"),
+    )
+    # GET /swap-requests/incoming: receiver_id = ? AND status = 'PENDING'
+    op.create_index(
+        "ix_swap_requests_receiver_id_pending",
+        "swap_requests",
+        ["receiver_id"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+        sqlite_where=sa.text("status = 'PENDING'"),
+    )
+    # GET /swap-requests/outgoing: requester_id = ? ORDER BY created_at DESC
+    op.create_index(
+        "ix_swap_requests_requester_id_created_at",
+        "swap_requests",
+        ["requester_id", "created_at"],
+    )
+    # Pending-request check on both slots, and cascades from events
+    op.create_index("ix_swap_requests_requester_slot_id", "swap_requests", ["requester_slot_id"])
+    op.create_index("ix_swap_requests_requested_slot_id", "swap_requests", ["requested_slot_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_swap_requests_requested_slot_id", table_name="swap_requests")
+    op.drop_index("ix_swap_requests_requester_slot_id", table_name="swap_requests")
+    op.drop_index("ix_swap_requests_requester_id_created_at", table_name="swap_requests")
+    op.drop_index("ix_swap_requests_receiver_id_pending", table_name="swap_requests")
+    op.drop_index("ix_events_swappable_start_time", table_name="events")
+    op.drop_index("ix_events_user_id_start_time", table_name="events")
@@ -0,0 +1,109 @@
+"""Swap intents and multi-party swap cycles
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+swap_intent_status = sa.Enum("OPEN", "MATCHED", name="swapintentstatus")
+swap_cycle_status = sa.Enum("PROPOSED", "ACCEPTED", "REJECTED", name="swapcyclestatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "swap_intents",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("offered_slot_id", sa.Integer(), nullable=False),
+        sa.Column("wanted_slot_id", sa.Integer(), nullable=False),
+        sa.Column("status", swap_intent_status, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["offered_slot_id"], ["events.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["wanted_slot_id"], ["events.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_swap_intents_id", "swap_intents", ["id"])
+    # Matcher: every OPEN intent, oldest first
+    op.create_index(
+        "ix_swap_intents_open",
+        "swap_intents",
+        ["id"],
+        postgresql_where=sa.text("status = 'OPEN'"),
+        sqlite_where=sa.text("status = 'OPEN'"),
+    )
+    # One open intent per offered/wanted pair
+    op.create_index(
+        "ux_swap_intents_open_pair",
+        "swap_intents",
+        ["offered_slot_id", "wanted_slot_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'OPEN'"),
+        sqlite_where=sa.text("status = 'OPEN'"),
+    )
+    op.create_index("ix_swap_intents_user_id", "swap_intents", ["user_id"])
+    op.create_index("ix_swap_intents_wanted_slot_id", "swap_intents", ["wanted_slot_id"])
+
+    op.create_table(
+        "swap_cycles",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("status", swap_cycle_status, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_swap_cycles_id", "swap_cycles", ["id"])
+
+    op.create_table(
+        "swap_cycle_legs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("cycle_id", sa.Integer(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("intent_id", sa.Integer(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("give_slot_id", sa.Integer(), nullable=False),
+        sa.Column("take_slot_id", sa.Integer(), nullable=False),
+        sa.Column("accepted", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["cycle_id"], ["swap_cycles.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["intent_id"], ["swap_intents.id"], ondelete="SET NULL"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["give_slot_id"], ["events.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["take_slot_id"], ["events.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_swap_cycle_legs_id", "swap_cycle_legs", ["id"])
+    op.create_index("ix_swap_cycle_legs_cycle_id_position", "swap_cycle_legs", ["cycle_id", "position"])
+    # GET /swap-cycles: the cycles a user takes part in
+    op.create_index("ix_swap_cycle_legs_user_id", "swap_cycle_legs", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_swap_cycle_legs_user_id", table_name="swap_cycle_legs")
+    op.drop_index("ix_swap_cycle_legs_cycle_id_position", table_name="swap_cycle_legs")
+    op.drop_index("ix_swap_cycle_legs_id", table_name="swap_cycle_legs")
+    op.drop_table("swap_cycle_legs")
+    op.drop_index("ix_swap_cycles_id", table_name="swap_cycles")
+    op.drop_table("swap_cycles")
+    op.drop_index("ix_swap_intents_wanted_slot_id", table_name="swap_intents")
+    op.drop_index("ix_swap_intents_user_id", table_name="swap_intents")
+    op.drop_index("ux_swap_intents_open_pair", table_name="swap_intents")
+    op.drop_index("ix_swap_intents_open", table_name="swap_intents")
+    op.drop_index("ix_swap_intents_id", table_name="swap_intents")
+    op.drop_table("swap_intents")
+    swap_cycle_status.drop(op.get_bind(), checkfirst=True)
+    swap_intent_status.drop(op.get_bind(), checkfirst=True)
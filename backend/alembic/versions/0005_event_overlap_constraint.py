@@ -0,0 +1,41 @@
+"""Exclusion constraint against overlapping events per user (Postgres)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:00:00.000000
+
+Fails if a user already has overlapping events; resolve those first. On
+other databases the rule is checked by the application only.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute(
+        "ALTER TABLE events ADD COLUMN during tsrange "
+        "GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED"
+    )
+    op.execute(
+        "ALTER TABLE events ADD CONSTRAINT ex_events_user_id_during "
+        "EXCLUDE USING gist (user_id WITH =, during WITH &&) DEFERRABLE INITIALLY DEFERRED"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("ALTER TABLE events DROP CONSTRAINT ex_events_user_id_during")
+    op.execute("ALTER TABLE events DROP COLUMN during")
@@ -0,0 +1,37 @@
+"""EXPIRED swap request status and an index for finding stale pending requests
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("ALTER TYPE swaprequeststatus ADD VALUE IF NOT EXISTS 'EXPIRED'")
+    # Expiry: status = 'PENDING' AND created_at < ? ORDER BY created_at
+    op.create_index(
+        "ix_swap_requests_pending_created_at",
+        "swap_requests",
+        ["created_at"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+        sqlite_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_swap_requests_pending_created_at", table_name="swap_requests")
+    # Postgres cannot drop an enum value; expired requests read as rejected
+    op.execute("UPDATE swap_requests SET status = 'REJECTED' WHERE status = 'EXPIRED'")
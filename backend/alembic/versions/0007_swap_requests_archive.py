@@ -0,0 +1,105 @@
+"""Archive table for finished swap requests
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The type already exists for swap_requests.status
+swap_request_status = postgresql.ENUM(
+    "PENDING", "ACCEPTED", "REJECTED", "EXPIRED", name="swaprequeststatus", create_type=False
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "swap_requests_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("requester_slot_id", sa.Integer(), nullable=False),
+        sa.Column("requested_slot_id", sa.Integer(), nullable=False),
+        sa.Column("requester_id", sa.Integer(), nullable=False),
+        sa.Column("receiver_id", sa.Integer(), nullable=False),
+        sa.Column("status", swap_request_status, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("requester_slot_title", sa.String(), nullable=False),
+        sa.Column("requested_slot_title", sa.String(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["requester_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["receiver_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # GET /swap-requests/history, per role, newest first
+    op.create_index(
+        "ix_swap_requests_archive_requester_id_created_at",
+        "swap_requests_archive",
+        ["requester_id", "created_at", "id"],
+    )
+    op.create_index(
+        "ix_swap_requests_archive_receiver_id_created_at",
+        "swap_requests_archive",
+        ["receiver_id", "created_at", "id"],
+    )
+    # Incoming requests are paged oldest first
+    op.drop_index("ix_swap_requests_receiver_id_pending", table_name="swap_requests")
+    op.create_index(
+        "ix_swap_requests_receiver_id_pending",
+        "swap_requests",
+        ["receiver_id", "created_at", "id"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+        sqlite_where=sa.text("status = 'PENDING'"),
+    )
+    # History of received requests that are not archived yet
+    op.create_index(
+        "ix_swap_requests_receiver_id_finished",
+        "swap_requests",
+        ["receiver_id", "created_at", "id"],
+        postgresql_where=sa.text("status != 'PENDING'"),
+        sqlite_where=sa.text("status != 'PENDING'"),
+    )
+    # Archiving: finished requests, least recently updated first
+    op.create_index(
+        "ix_swap_requests_finished_updated_at",
+        "swap_requests",
+        ["updated_at"],
+        postgresql_where=sa.text("status != 'PENDING'"),
+        sqlite_where=sa.text("status != 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    # Archived requests go back to the main table; their slots may be gone
+    op.execute(
+        "INSERT INTO swap_requests (id, requester_slot_id, requested_slot_id, requester_id, receiver_id, "
+        "status, created_at, updated_at) "
+        "SELECT a.id, a.requester_slot_id, a.requested_slot_id, a.requester_id, a.receiver_id, "
+        "a.status, a.created_at, a.updated_at FROM swap_requests_archive a "
+        "WHERE EXISTS (SELECT 1 FROM events WHERE events.id = a.requester_slot_id) "
+        "AND EXISTS (SELECT 1 FROM events WHERE events.id = a.requested_slot_id)"
+    )
+    op.drop_index("ix_swap_requests_finished_updated_at", table_name="swap_requests")
+    op.drop_index("ix_swap_requests_receiver_id_finished", table_name="swap_requests")
+    op.drop_index("ix_swap_requests_receiver_id_pending", table_name="swap_requests")
+    op.create_index(
+        "ix_swap_requests_receiver_id_pending",
+        "swap_requests",
+        ["receiver_id"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+        sqlite_where=sa.text("status = 'PENDING'"),
+    )
+    op.drop_index("ix_swap_requests_archive_receiver_id_created_at", table_name="swap_requests_archive")
+    op.drop_index("ix_swap_requests_archive_requester_id_created_at", table_name="swap_requests_archive")
+    op.drop_table("swap_requests_archive")
@@ -0,0 +1,37 @@
+"""EXPIRED swap cycle status and an index for finding stale proposed cycles
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("ALTER TYPE swapcyclestatus ADD VALUE IF NOT EXISTS 'EXPIRED'")
+    # Expiry: status = 'PROPOSED' AND created_at < ? ORDER BY created_at
+    op.create_index(
+        "ix_swap_cycles_proposed_created_at",
+        "swap_cycles",
+        ["created_at"],
+        postgresql_where=sa.text("status = 'PROPOSED'"),
+        sqlite_where=sa.text("status = 'PROPOSED'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_swap_cycles_proposed_created_at", table_name="swap_cycles")
+    # Postgres cannot drop an enum value; expired cycles read as rejected
+    op.execute("UPDATE swap_cycles SET status = 'REJECTED' WHERE status = 'EXPIRED'")
@@ -0,0 +1,138 @@
+"""
+Archiving of finished swap requests.
+
+Accepted, rejected and expired requests stay in swap_requests for
+SWAP_ARCHIVE_AFTER_HOURS after their last update (so the outgoing list
+still shows recent decisions), then move to swap_requests_archive, which
+backs the paginated GET /swap-requests/history. That keeps swap_requests
+and its indexes close to the size of the pending working set.
+
+Each batch is one transaction: claim the least recently updated finished
+requests, copy them with their slot titles into the archive, delete them.
+A request whose slot row is already gone (SQLite does not enforce the
+foreign key) is still archived, under DELETED_SLOT_TITLE.
+On Postgres the claim uses FOR UPDATE SKIP LOCKED, so several workers
+archive disjoint batches.
+"""
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.event import Event
+from app.models.swap_request import SwapRequest, SwapRequestArchive, SwapRequestStatus
+from app.api.periodic import PeriodicJob
+
+# Archived in place of the title of a slot that no longer exists
+DELETED_SLOT_TITLE = "(deleted slot)"
+
+archived_requests = registry.counter(
+    "slotswapper_swap_requests_archived_total",
+    "Finished swap requests moved to swap_requests_archive.",
+)
+archive_runs = registry.counter(
+    "slotswapper_swap_archive_runs_total",
+    "Swap request archiving runs, by outcome.",
+    ("outcome",),
+)
+archive_batch_duration = registry.histogram(
+    "slotswapper_swap_archive_batch_seconds",
+    "Time taken by one swap request archiving batch, including its commit.",
+)
+
+
+async def _archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int, now: datetime) -> int:
+    """Move up to `batch_size` requests finished before `cutoff` to the archive, then commit."""
+    requests = SwapRequest.__table__
+    archive = SwapRequestArchive.__table__
+    result = await db.execute(
+        select(requests.c.id)
+        .where(requests.c.status != SwapRequestStatus.PENDING, requests.c.updated_at < cutoff)
+        .order_by(requests.c.updated_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    ids = result.scalars().all()
+    if not ids:
+        await db.commit()
+        return 0
+
+    requester_slot = Event.__table__.alias("requester_slot")
+    requested_slot = Event.__table__.alias("requested_slot")
+    rows = (
+        select(
+            requests.c.id,
+            requests.c.requester_slot_id,
+            requests.c.requested_slot_id,
+            requests.c.requester_id,
+            requests.c.receiver_id,
+            requests.c.status,
+            requests.c.created_at,
+            requests.c.updated_at,
+            func.coalesce(requester_slot.c.title, DELETED_SLOT_TITLE),
+            func.coalesce(requested_slot.c.title, DELETED_SLOT_TITLE),
+            literal(now, archive.c.archived_at.type),
+        )
+        # Outer joins, so every claimed row is copied before the delete below
+        .outerjoin(requester_slot, requester_slot.c.id == requests.c.requester_slot_id)
+        .outerjoin(requested_slot, requested_slot.c.id == requests.c.requested_slot_id)
+        .where(requests.c.id.in_(ids))
+    )
+    await db.execute(insert(archive).from_select([
+        "id", "requester_slot_id", "requested_slot_id", "requester_id", "receiver_id",
+        "status", "created_at", "updated_at", "requester_slot_title", "requested_slot_title", "archived_at",
+    ], rows))
+    await db.execute(delete(requests).where(requests.c.id.in_(ids)))
+    await db.commit()
+    return len(ids)
+
+
+async def archive_finished_swap_requests(
+    db: AsyncSession, age: timedelta, batch_size: int, now: Optional[datetime] = None
+) -> int:
+    """
+    Archive every finished request last updated more than `age` ago, one
+    batch per transaction. Stops after a short batch. Returns how many moved.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - age
+    total = 0
+    while True:
+        started = time.perf_counter()
+        moved = await _archive_batch(db, cutoff, batch_size, now)
+        archive_batch_duration.observe(time.perf_counter() - started)
+        archived_requests.inc(moved)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+class SwapArchiveScheduler(PeriodicJob):
+    """Runs archive_finished_swap_requests every `interval` seconds on the worker's event loop."""
+
+    description = "Swap request archiving"
+
+    def __init__(self, age_hours: float, interval: float, batch_size: int):
+        super().__init__(interval, archive_runs)
+        self.age = timedelta(hours=age_hours)
+        self.batch_size = batch_size
+
+    @property
+    def enabled(self) -> bool:
+        return self.age > timedelta(0)
+
+    async def run(self, db: AsyncSession) -> int:
+        return await archive_finished_swap_requests(db, self.age, self.batch_size)
+
+
+@lru_cache(maxsize=None)
+def get_swap_archive() -> SwapArchiveScheduler:
+    """The process's archiving job, configured from the settings on first use."""
+    return SwapArchiveScheduler(
+        settings.SWAP_ARCHIVE_AFTER_HOURS,
+        settings.SWAP_ARCHIVE_INTERVAL_SECONDS,
+        settings.SWAP_ARCHIVE_BATCH_SIZE,
+    )
@@ -0,0 +1,59 @@
+from typing import Optional
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.event import Event
+from app.utils.etags import etag_matches, make_etag
+
+# Conditional responses must be revalidated, never served from a shared cache
+CACHE_CONTROL = "private, no-cache"
+
+
+def event_etag(event: Event) -> str:
+    """Strong ETag of a single event; `version` is bumped by every write."""
+    return make_etag("event", event.id, event.version, event.updated_at.isoformat() if event.updated_at else None)
+
+
+async def user_events_etag(db: AsyncSession, user_id: int, representation: str) -> str:
+    """
+    Strong ETag over all of a user's events, from one aggregate query.
+
+    The sum of row versions acts as the user's version counter: any update
+    bumps it, and rows gained or lost (creates, deletes, swaps) move the
+    count and max(updated_at). Nothing is stored, so writes never contend
+    on a shared counter row. `representation` keeps tags of different
+    encodings (JSON list, .ics feed) apart.
+    """
+    result = await db.execute(
+        select(func.count(Event.id), func.sum(Event.version), func.max(Event.updated_at))
+        .where(Event.user_id == user_id)
+    )
+    count, version_sum, last_modified = result.one()
+    return make_etag(
+        representation, user_id, count, version_sum, last_modified.isoformat() if last_modified else None
+    )
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Return a 304 response if the request's If-None-Match covers `etag`."""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        )
+    return None
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def require_if_match(request: Request, etag: str) -> None:
+    """412 unless the request's If-Match (when sent) still names the current version."""
+    header = request.headers.get("if-match")
+    if header is not None and not etag_matches(header, etag, weak=False):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Event was modified since it was fetched"
+        )
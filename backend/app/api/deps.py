@@ -1,41 +1,88 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+from typing import Any, Dict, Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
-from app.core.security import decode_access_token
+from app.core.security import decode_access_token_claims
+from app.core.principal_cache import Principal, get_principal_cache
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Dependency to get the current authenticated user.
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    token = credentials.credentials
-    user_id = decode_access_token(token)
-    
-    if user_id is None:
-        raise credentials_exception
-    
+
+
+def _user_id_from_claims(claims: Dict[str, Any]) -> int:
     try:
-        user_id = int(user_id)
-    except ValueError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    
+        return int(claims.get("sub"))
+    except (TypeError, ValueError):
+        raise _credentials_exception()
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Dependency to get the current authenticated user.
+
+    Verified tokens are cached, so repeat requests skip both the JWT
+    signature check and the users lookup.
+    """
+    token = credentials.credentials
+    principal = get_principal_cache().get(token)
+    if principal is not None:
+        return principal
+
+    claims = decode_access_token_claims(token)
+    if claims is None:
+        raise _credentials_exception()
+
+    user = await db.get(User, _user_id_from_claims(claims))
+
     if user is None:
-        raise credentials_exception
-    
-    return user
\ No newline at end of file
+        raise _credentials_exception()
+
+    principal = Principal.from_user(user)
+    get_principal_cache().set(token, principal, token_expires_at=claims.get("exp"))
+
+    return principal
+
+
+def user_id_from_token(token: str) -> int:
+    """
+    Resolve a bearer token to a user id without touching the database.
+
+    The id is taken from the cached principal or the verified token itself,
+    so a deleted user keeps a valid id until the token expires.
+    """
+    principal = get_principal_cache().get(token)
+    if principal is not None:
+        return principal.id
+
+    claims = decode_access_token_claims(token)
+    if claims is None:
+        raise _credentials_exception()
+
+    return _user_id_from_claims(claims)
+
+
+async def get_token_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = Query(None, description="Bearer token for clients that cannot set headers")
+) -> int:
+    """
+    Dependency for routes that only need the caller's id; never uses the database.
+
+    Also accepts the token as a `token` query parameter, for EventSource
+    streams and calendar subscriptions, which cannot send an Authorization
+    header.
+    """
+    return user_id_from_token(credentials.credentials if credentials else token or "")
@@ -0,0 +1,263 @@
+"""
+Expiry of stale pending swap requests and proposed swap cycles.
+
+A PENDING request keeps both slots out of the marketplace, so every worker
+runs a background task expiring requests older than SWAP_REQUEST_TTL_HOURS.
+Each batch is one transaction of two set-based UPDATEs: the oldest pending
+requests become EXPIRED, then their slots go back to SWAPPABLE. Both bump
+the row versions, so an accept or cancel working from the old state fails
+with 409 instead of overwriting the expiry.
+
+Running on several workers at once is safe. On Postgres each batch claims
+its requests with FOR UPDATE SKIP LOCKED, so workers take disjoint batches
+and never wait on a request someone is answering (the routes lock requests
+before slots, as expiry does). SQLite serializes writers anyway.
+
+Proposed swap cycles that not every participant accepted within
+SWAP_CYCLE_TTL_HOURS expire the same way: the cycle becomes EXPIRED and
+its slots SWAPPABLE again. The intents of participants who accepted
+reopen. Those of participants who never answered are withdrawn, as on a
+rejection, so the matcher does not propose the same stuck cycle again.
+"""
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.slot_cache import invalidate_slots
+from app.models.event import Event, EventStatus
+from app.models.swap_cycle import SwapCycle, SwapCycleLeg, SwapCycleStatus, SwapIntent, SwapIntentStatus
+from app.models.swap_request import SwapRequest, SwapRequestStatus
+from app.api.notifications import notify_slots, notify_swap_cycle, notify_swap_request
+from app.api.periodic import PeriodicJob
+
+expired_requests = registry.counter(
+    "slotswapper_swap_requests_expired_total",
+    "Pending swap requests expired by SWAP_REQUEST_TTL_HOURS.",
+)
+released_slots = registry.counter(
+    "slotswapper_swap_expiry_released_slots_total",
+    "Slots returned to the marketplace by swap request expiry.",
+)
+expired_cycles = registry.counter(
+    "slotswapper_swap_cycles_expired_total",
+    "Proposed swap cycles expired by SWAP_CYCLE_TTL_HOURS.",
+)
+expiry_runs = registry.counter(
+    "slotswapper_swap_expiry_runs_total",
+    "Swap request expiry runs, by outcome.",
+    ("outcome",),
+)
+expiry_batch_duration = registry.histogram(
+    "slotswapper_swap_expiry_batch_seconds",
+    "Time taken by one swap request or swap cycle expiry batch, including its commit.",
+)
+
+
+async def _expire_batch(
+    db: AsyncSession, cutoff: datetime, batch_size: int, now: datetime
+) -> Tuple[Sequence[Row], Sequence[Row]]:
+    """Expire up to `batch_size` requests created before `cutoff` and release their slots, then commit."""
+    requests = SwapRequest.__table__
+    events = Event.__table__
+    claimed = (
+        select(requests.c.id)
+        .where(requests.c.status == SwapRequestStatus.PENDING, requests.c.created_at < cutoff)
+        .order_by(requests.c.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(requests)
+        .where(requests.c.id.in_(claimed))
+        .values(status=SwapRequestStatus.EXPIRED, version=requests.c.version + 1, updated_at=now)
+        .returning(
+            requests.c.id,
+            requests.c.requester_slot_id,
+            requests.c.requested_slot_id,
+            requests.c.requester_id,
+            requests.c.receiver_id,
+        )
+    )
+    expired = result.all()
+    slots = []
+    if expired:
+        slot_ids = [slot_id for row in expired for slot_id in (row.requester_slot_id, row.requested_slot_id)]
+        result = await db.execute(
+            update(events)
+            .where(events.c.id.in_(slot_ids), events.c.status == EventStatus.SWAP_PENDING)
+            .values(status=EventStatus.SWAPPABLE, version=events.c.version + 1, updated_at=now)
+            .returning(events.c.id, events.c.user_id, events.c.start_time)
+        )
+        slots = result.all()
+    await db.commit()
+    return expired, slots
+
+
+async def _notify_expired(expired: Sequence[Row], slots: Sequence[Row]) -> None:
+    for row in expired:
+        await notify_swap_request("expired", SwapRequest(
+            id=row.id,
+            requester_slot_id=row.requester_slot_id,
+            requested_slot_id=row.requested_slot_id,
+            requester_id=row.requester_id,
+            receiver_id=row.receiver_id,
+            status=SwapRequestStatus.EXPIRED,
+        ))
+    if slots:
+        await invalidate_slots([slot.start_time for slot in slots])
+        await notify_slots(
+            "updated", [slot.id for slot in slots], EventStatus.SWAPPABLE,
+            owner_ids={slot.user_id for slot in slots}, marketplace=True
+        )
+
+
+async def expire_stale_swap_requests(
+    db: AsyncSession, ttl: timedelta, batch_size: int, now: Optional[datetime] = None
+) -> int:
+    """
+    Expire every pending request created more than `ttl` ago, one batch per transaction.
+
+    Stops after a short batch; requests skipped because another transaction
+    holds them are picked up by the next run. Returns how many expired.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - ttl
+    total = 0
+    while True:
+        started = time.perf_counter()
+        expired, slots = await _expire_batch(db, cutoff, batch_size, now)
+        expiry_batch_duration.observe(time.perf_counter() - started)
+        expired_requests.inc(len(expired))
+        released_slots.inc(len(slots))
+        await _notify_expired(expired, slots)
+        total += len(expired)
+        if len(expired) < batch_size:
+            return total
+
+
+async def _expire_cycle_batch(
+    db: AsyncSession, cutoff: datetime, batch_size: int, now: datetime
+) -> Tuple[Sequence[int], Sequence[Row], Sequence[Row]]:
+    """Expire up to `batch_size` cycles proposed before `cutoff`, release their slots and intents, then commit."""
+    cycles = SwapCycle.__table__
+    legs_table = SwapCycleLeg.__table__
+    events = Event.__table__
+    intents = SwapIntent.__table__
+    claimed = (
+        select(cycles.c.id)
+        .where(cycles.c.status == SwapCycleStatus.PROPOSED, cycles.c.created_at < cutoff)
+        .order_by(cycles.c.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(cycles)
+        .where(cycles.c.id.in_(claimed))
+        .values(status=SwapCycleStatus.EXPIRED, version=cycles.c.version + 1, updated_at=now)
+        .returning(cycles.c.id)
+    )
+    cycle_ids = result.scalars().all()
+    legs, slots = [], []
+    if cycle_ids:
+        result = await db.execute(
+            select(legs_table)
+            .where(legs_table.c.cycle_id.in_(cycle_ids))
+            .order_by(legs_table.c.cycle_id, legs_table.c.position)
+        )
+        legs = result.all()
+        result = await db.execute(
+            update(events)
+            .where(events.c.id.in_([leg.give_slot_id for leg in legs]), events.c.status == EventStatus.SWAP_PENDING)
+            .values(status=EventStatus.SWAPPABLE, version=events.c.version + 1, updated_at=now)
+            .returning(events.c.id, events.c.user_id, events.c.start_time)
+        )
+        slots = result.all()
+        reopened = [leg.intent_id for leg in legs if leg.intent_id and leg.accepted]
+        withdrawn = [leg.intent_id for leg in legs if leg.intent_id and not leg.accepted]
+        if reopened:
+            await db.execute(
+                update(intents)
+                .where(intents.c.id.in_(reopened), intents.c.status == SwapIntentStatus.MATCHED)
+                .values(status=SwapIntentStatus.OPEN, version=intents.c.version + 1, updated_at=now)
+            )
+        if withdrawn:
+            await db.execute(delete(intents).where(intents.c.id.in_(withdrawn)))
+    await db.commit()
+    return cycle_ids, legs, slots
+
+
+async def _notify_expired_cycles(cycle_ids: Sequence[int], legs: Sequence[Row], slots: Sequence[Row]) -> None:
+    for cycle_id in cycle_ids:
+        cycle_legs = [SwapCycleLeg(**leg._mapping) for leg in legs if leg.cycle_id == cycle_id]
+        await notify_swap_cycle("expired", SwapCycle(id=cycle_id, status=SwapCycleStatus.EXPIRED), cycle_legs)
+    if slots:
+        await invalidate_slots([slot.start_time for slot in slots])
+        await notify_slots(
+            "updated", [slot.id for slot in slots], EventStatus.SWAPPABLE,
+            owner_ids={slot.user_id for slot in slots}, marketplace=True
+        )
+
+
+async def expire_stale_swap_cycles(
+    db: AsyncSession, ttl: timedelta, batch_size: int, now: Optional[datetime] = None
+) -> int:
+    """
+    Expire every cycle still PROPOSED `ttl` after it was proposed, one batch
+    per transaction. Stops after a short batch. Returns how many expired.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - ttl
+    total = 0
+    while True:
+        started = time.perf_counter()
+        cycle_ids, legs, slots = await _expire_cycle_batch(db, cutoff, batch_size, now)
+        expiry_batch_duration.observe(time.perf_counter() - started)
+        expired_cycles.inc(len(cycle_ids))
+        released_slots.inc(len(slots))
+        await _notify_expired_cycles(cycle_ids, legs, slots)
+        total += len(cycle_ids)
+        if len(cycle_ids) < batch_size:
+            return total
+
+
+class SwapExpiryScheduler(PeriodicJob):
+    """
+    Runs expire_stale_swap_requests, then expire_stale_swap_cycles, every
+    `interval` seconds on the worker's event loop. A TTL of 0 disables either.
+    """
+
+    description = "Swap expiry"
+
+    def __init__(self, ttl_hours: float, interval: float, batch_size: int, cycle_ttl_hours: float = 0):
+        super().__init__(interval, expiry_runs)
+        self.ttl = timedelta(hours=ttl_hours)
+        self.cycle_ttl = timedelta(hours=cycle_ttl_hours)
+        self.batch_size = batch_size
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > timedelta(0) or self.cycle_ttl > timedelta(0)
+
+    async def run(self, db: AsyncSession) -> int:
+        expired = 0
+        if self.ttl > timedelta(0):
+            expired += await expire_stale_swap_requests(db, self.ttl, self.batch_size)
+        if self.cycle_ttl > timedelta(0):
+            expired += await expire_stale_swap_cycles(db, self.cycle_ttl, self.batch_size)
+        return expired
+
+
+@lru_cache(maxsize=None)
+def get_swap_expiry() -> SwapExpiryScheduler:
+    """The process's expiry job, configured from the settings on first use."""
+    return SwapExpiryScheduler(
+        settings.SWAP_REQUEST_TTL_HOURS,
+        settings.SWAP_EXPIRY_INTERVAL_SECONDS,
+        settings.SWAP_EXPIRY_BATCH_SIZE,
+        settings.SWAP_CYCLE_TTL_HOURS,
+    )
@@ -0,0 +1,237 @@
+"""
+Matching of swap intents into multi-party swap cycles.
+
+Matching reads the whole open intent graph and can propose cycles for any
+user, so it is not something a request should trigger. Every worker runs it
+every SWAP_CYCLE_MATCH_INTERVAL_SECONDS instead. On Postgres a transaction
+advisory lock lets one worker match at a time, and the others skip the run.
+"""
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.slot_cache import invalidate_slots
+from app.models.event import Event, EventStatus
+from app.models.swap_cycle import SwapCycle, SwapCycleLeg, SwapCycleStatus, SwapIntent, SwapIntentStatus
+from app.schemas.swap_cycle import SwapCycleMatchResponse
+from app.api.notifications import notify_slots, notify_swap_cycle
+from app.api.periodic import PeriodicJob
+from app.utils.cycles import IntentGraph
+from app.utils.locking import execute_versioned, lock_rows
+
+# pg_try_advisory_xact_lock key held by the worker matching intents
+MATCH_LOCK_KEY = 0x534C4F54
+
+proposed_cycles = registry.counter(
+    "slotswapper_swap_cycles_proposed_total",
+    "Swap cycles proposed by intent matching.",
+)
+match_runs = registry.counter(
+    "slotswapper_swap_cycle_match_runs_total",
+    "Swap intent matching runs, by outcome.",
+    ("outcome",),
+)
+match_duration = registry.histogram(
+    "slotswapper_swap_cycle_match_seconds",
+    "Time taken by one swap intent matching run, including its commit.",
+)
+
+
+async def _claim_matching(db: AsyncSession) -> bool:
+    """Take the matching lock for this transaction; False when another worker holds it."""
+    if db.bind.dialect.name != "postgresql":
+        return True
+    return bool(await db.scalar(select(func.pg_try_advisory_xact_lock(MATCH_LOCK_KEY))))
+
+
+async def _load_intent_graph(db: AsyncSession):
+    """
+    Load every OPEN intent whose slots can still be swapped, oldest first.
+
+    Intents whose offered slot changed owner or left the marketplace are
+    skipped rather than deleted, so they come back if the slot returns.
+    """
+    offered = aliased(Event)
+    wanted = aliased(Event)
+    result = await db.execute(
+        select(
+            SwapIntent.id,
+            SwapIntent.version,
+            SwapIntent.user_id,
+            SwapIntent.offered_slot_id,
+            SwapIntent.wanted_slot_id,
+            offered.version,
+            offered.start_time,
+        )
+        .join(offered, offered.id == SwapIntent.offered_slot_id)
+        .join(wanted, wanted.id == SwapIntent.wanted_slot_id)
+        .where(
+            SwapIntent.status == SwapIntentStatus.OPEN,
+            offered.status == EventStatus.SWAPPABLE,
+            offered.user_id == SwapIntent.user_id,
+            wanted.status == EventStatus.SWAPPABLE,
+            wanted.user_id != SwapIntent.user_id,
+        )
+        .order_by(SwapIntent.id)
+    )
+    graph = IntentGraph()
+    intents = {}
+    for row in result:
+        intents[row[0]] = row
+        graph.add_intent(row[0], row[3], row[4])
+    return graph, intents
+
+
+async def _still_matchable(db: AsyncSession, cycles: List[list], intents: dict) -> List[list]:
+    """
+    Lock the slots and intents of `cycles` and keep the cycles none of them moved on in.
+
+    The graph is read without locks, so a pairwise swap request or an edit
+    may have taken a slot since; the versioned writes alone would not
+    notice on drivers that cannot count executemany rows.
+    """
+    matched = [intents[intent_id] for cycle in cycles for intent_id in cycle]
+    slots = await lock_rows(db, Event, [intent[3] for intent in matched])
+    locked = await lock_rows(db, SwapIntent, [intent[0] for intent in matched])
+
+    def unchanged(intent) -> bool:
+        slot, current = slots.get(intent[3]), locked.get(intent[0])
+        return (
+            slot is not None and current is not None
+            and slot.status == EventStatus.SWAPPABLE and slot.version == intent[5]
+            and slot.user_id == intent[2]
+            and current.status == SwapIntentStatus.OPEN and current.version == intent[1]
+        )
+
+    return [cycle for cycle in cycles if all(unchanged(intents[intent_id]) for intent_id in cycle)]
+
+
+async def _insert_cycles(db: AsyncSession, count: int, now: datetime) -> List[int]:
+    """Insert `count` PROPOSED cycles and return their ids in insertion order."""
+    rows = [{"status": SwapCycleStatus.PROPOSED, "created_at": now, "updated_at": now} for _ in range(count)]
+    if db.bind.dialect.name == "sqlite":
+        # SQLite cannot order a batched INSERT ... RETURNING, and falls back to
+        # one round trip per row. It has a single writer, so rows inserted by
+        # one executemany get consecutive ids ending at the current maximum.
+        await db.execute(insert(SwapCycle.__table__), rows)
+        last = await db.scalar(select(func.max(SwapCycle.id)))
+        return list(range(last - count + 1, last + 1))
+    result = await db.scalars(insert(SwapCycle).returning(SwapCycle.id, sort_by_parameter_order=True), rows)
+    return result.all()
+
+
+async def propose_swap_cycles(
+    db: AsyncSession,
+    max_length: Optional[int] = None,
+    max_expansions: Optional[int] = None,
+) -> SwapCycleMatchResponse:
+    """
+    Match open intents into disjoint swap cycles and propose them.
+
+    Cycles of up to `max_length` participants are found greedily, shortest
+    first, and each slot joins at most one cycle. Before writing, the slots
+    and intents involved are locked and re-checked, and cycles touching
+    anything a concurrent request changed are dropped; they are found again
+    on the next run if still valid. All proposals are written in one
+    transaction with a handful of executemany statements.
+    """
+    if not await _claim_matching(db):
+        await db.rollback()
+        return SwapCycleMatchResponse(intents=0, proposed=[])
+    graph, intents = await _load_intent_graph(db)
+    cycles = graph.find_cycles(
+        max_length or settings.SWAP_CYCLE_MAX_LENGTH,
+        max_expansions or settings.SWAP_CYCLE_MAX_EXPANSIONS,
+    )
+    if cycles:
+        cycles = await _still_matchable(db, cycles, intents)
+    if not cycles:
+        await db.rollback()
+        return SwapCycleMatchResponse(intents=len(intents), proposed=[])
+
+    now = datetime.utcnow()
+    cycle_ids = await _insert_cycles(db, len(cycles), now)
+
+    legs = []
+    for cycle_id, cycle in zip(cycle_ids, cycles):
+        for position, intent_id in enumerate(cycle):
+            intent = intents[intent_id]
+            legs.append({
+                "cycle_id": cycle_id,
+                "position": position,
+                "intent_id": intent_id,
+                "user_id": intent[2],
+                "give_slot_id": intent[3],
+                "take_slot_id": intent[4],
+                "accepted": False,
+            })
+    await db.execute(insert(SwapCycleLeg), legs)
+
+    matched = [intents[intent_id] for cycle in cycles for intent_id in cycle]
+    intent_table = SwapIntent.__table__
+    await execute_versioned(
+        db,
+        update(intent_table)
+        .where(intent_table.c.id == bindparam("b_id"), intent_table.c.version == bindparam("b_version"))
+        .values({"status": SwapIntentStatus.MATCHED, "version": intent_table.c.version + 1, "updated_at": now}),
+        [{"b_id": intent[0], "b_version": intent[1]} for intent in matched]
+    )
+    event_table = Event.__table__
+    await execute_versioned(
+        db,
+        update(event_table)
+        .where(event_table.c.id == bindparam("b_id"), event_table.c.version == bindparam("b_version"))
+        .values({"status": EventStatus.SWAP_PENDING, "version": event_table.c.version + 1, "updated_at": now}),
+        [{"b_id": intent[3], "b_version": intent[5]} for intent in matched]
+    )
+    await db.commit()
+
+    await invalidate_slots([intent[6] for intent in matched])
+    await notify_slots(
+        "updated", [intent[3] for intent in matched], EventStatus.SWAP_PENDING,
+        owner_ids=sorted({intent[2] for intent in matched}), marketplace=True
+    )
+    position = 0
+    for cycle_id, cycle in zip(cycle_ids, cycles):
+        cycle_legs = [SwapCycleLeg(**leg) for leg in legs[position:position + len(cycle)]]
+        position += len(cycle)
+        await notify_swap_cycle("proposed", SwapCycle(id=cycle_id, status=SwapCycleStatus.PROPOSED), cycle_legs)
+
+    return SwapCycleMatchResponse(intents=len(intents), proposed=list(cycle_ids))
+
+
+class SwapCycleMatcher(PeriodicJob):
+    """Runs propose_swap_cycles every `interval` seconds on the worker's event loop."""
+
+    description = "Swap intent matching"
+
+    def __init__(self, interval: float, max_length: int, max_expansions: int):
+        super().__init__(interval, match_runs)
+        self.max_length = max_length
+        self.max_expansions = max_expansions
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    async def run(self, db: AsyncSession) -> int:
+        started = time.perf_counter()
+        result = await propose_swap_cycles(db, self.max_length, self.max_expansions)
+        match_duration.observe(time.perf_counter() - started)
+        proposed_cycles.inc(len(result.proposed))
+        return len(result.proposed)
+
+
+@lru_cache(maxsize=None)
+def get_swap_cycle_matcher() -> SwapCycleMatcher:
+    """The process's matching job, configured from the settings on first use."""
+    return SwapCycleMatcher(
+        settings.SWAP_CYCLE_MATCH_INTERVAL_SECONDS,
+        settings.SWAP_CYCLE_MAX_LENGTH,
+        settings.SWAP_CYCLE_MAX_EXPANSIONS,
+    )
@@ -0,0 +1,53 @@
+from typing import Iterable, Sequence
+from app.core.broker import publish
+from app.models.event import EventStatus
+from app.models.swap_cycle import SwapCycle, SwapCycleLeg
+from app.models.swap_request import SwapRequest
+
+
+async def notify_swap_request(action: str, swap_request: SwapRequest) -> None:
+    """Tell both parties that a swap request was created, accepted, rejected or cancelled."""
+    await publish(
+        f"swap_request.{action}",
+        {
+            "id": swap_request.id,
+            "requester_slot_id": swap_request.requester_slot_id,
+            "requested_slot_id": swap_request.requested_slot_id,
+            "status": swap_request.status.value,
+        },
+        user_ids=[swap_request.requester_id, swap_request.receiver_id],
+    )
+
+
+async def notify_swap_cycle(action: str, cycle: SwapCycle, legs: Sequence[SwapCycleLeg]) -> None:
+    """Tell every participant that a swap cycle was proposed, updated, accepted or rejected."""
+    await publish(
+        f"swap_cycle.{action}",
+        {
+            "id": cycle.id,
+            "status": cycle.status.value,
+            "slot_ids": [leg.give_slot_id for leg in legs],
+            "accepted_user_ids": sorted({leg.user_id for leg in legs if leg.accepted}),
+        },
+        user_ids=sorted({leg.user_id for leg in legs}),
+    )
+
+
+async def notify_slots(
+    action: str,
+    slot_ids: Iterable[int],
+    status: EventStatus,
+    owner_ids: Iterable[int],
+    marketplace: bool,
+) -> None:
+    """
+    Announce slot status changes.
+
+    Changes that move slots into or out of the marketplace go to everyone;
+    the rest only to the slots' owners.
+    """
+    await publish(
+        f"slot.{action}",
+        {"ids": sorted(slot_ids), "status": status.value},
+        user_ids=None if marketplace else owner_ids,
+    )
@@ -0,0 +1,63 @@
+"""
+Background database jobs run by every worker.
+
+A PeriodicJob runs `run(db)` every `interval` seconds on the worker's event
+loop, from startup to shutdown, counting each run's outcome. Jobs must be
+safe to run on several workers at once (claim rows with SKIP LOCKED).
+"""
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager, suppress
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.metrics import Counter
+from app.database import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """Base class for background jobs; subclasses implement run() and may override enabled."""
+
+    description = "Background job"
+
+    def __init__(self, interval: float, runs: Counter):
+        self.interval = interval
+        self.runs = runs
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    async def run(self, db: AsyncSession) -> int:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def run_once(self) -> int:
+        async with asynccontextmanager(get_db)() as db:
+            return await self.run(db)
+
+    async def _loop(self) -> None:
+        # Workers started together spread their runs over the interval
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                self.runs.inc(labels=("error",))
+                logger.exception("%s failed", self.description)
+            else:
+                self.runs.inc(labels=("ok",))
+            await asyncio.sleep(self.interval)
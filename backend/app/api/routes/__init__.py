@@ -1,3 +1,3 @@
-from app.api.routes import auth, events, swaps
+from app.api.routes import auth, calendar, events, stream, swaps
 
-__all__ = ["auth", "events", "swaps"]
\ No newline at end of file
+__all__ = ["auth", "calendar", "events", "stream", "swaps"]
\ No newline at end of file
@@ -1,30 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse
 from app.schemas.token import TokenResponse
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.config import settings
+from app.core.security import (
+    HashingQueueFull,
+    verify_password_async,
+    get_password_hash_async,
+    create_access_token
+)
 from app.api.deps import get_current_user
+from app.core.principal_cache import Principal
 
 router = APIRouter()
 
 
+def _hashing_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, please retry shortly",
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
 @router.post("/signup", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user.
     """
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    result = await db.execute(select(User).where(User.email == user_data.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
+    # Hand the connection back to the pool while Argon2 runs
+    await db.rollback()
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = await get_password_hash_async(user_data.password)
+    except HashingQueueFull:
+        raise _hashing_unavailable()
     new_user = User(
         name=user_data.name,
         email=user_data.email,
@@ -32,8 +54,8 @@ def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Create access token
     access_token = create_access_token(subject=new_user.id)
@@ -46,15 +68,27 @@ def signup(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """
     Authenticate a user and return a JWT token.
     """
     # Find user
-    user = db.query(User).filter(User.email == user_data.email).first()
+    result = await db.execute(select(User).where(User.email == user_data.email))
+    user = result.scalars().first()
+    account = UserResponse.model_validate(user) if user is not None else None
+    hashed_password = user.hashed_password if user is not None else None
+    # Hand the connection back to the pool while Argon2 runs
+    await db.rollback()
     
     # Verify credentials
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    try:
+        password_ok = account is not None and await verify_password_async(
+            user_data.password, hashed_password
+        )
+    except HashingQueueFull:
+        raise _hashing_unavailable()
+    
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -62,18 +96,18 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
         )
     
     # Create access token
-    access_token = create_access_token(subject=user.id)
+    access_token = create_access_token(subject=account.id)
     
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
-        user=user
+        user=account
     )
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: Principal = Depends(get_current_user)):
     """
     Get current user information.
     """
-    return current_user
\ No newline at end of file
+    return current_user
@@ -0,0 +1,159 @@
+import codecs
+from typing import Tuple
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.core.config import settings
+from app.core.principal_cache import Principal
+from app.models.event import Event, EventStatus
+from app.schemas.event import CalendarImportResponse
+from app.api.conditional import CACHE_CONTROL, not_modified, user_events_etag
+from app.api.deps import get_current_user, get_token_user_id
+from app.utils.overlaps import Placement, find_overlaps, overlapping_placements
+from app.utils.ical import (
+    ICalendarError,
+    ICalendarParser,
+    calendar_footer,
+    calendar_header,
+    format_event,
+)
+
+router = APIRouter()
+
+# Rows fetched per round trip while streaming the feed
+FEED_BATCH_SIZE = 500
+# Upload bytes read per chunk, and parsed events per INSERT
+IMPORT_CHUNK_SIZE = 64 * 1024
+IMPORT_BATCH_SIZE = 500
+
+FEED_COLUMNS = (
+    Event.id,
+    Event.title,
+    Event.start_time,
+    Event.end_time,
+    Event.status,
+    Event.created_at,
+    Event.updated_at,
+)
+
+
+@router.get("/feed.ics")
+async def calendar_feed(
+    request: Request,
+    user_id: int = Depends(get_token_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Export the current user's events as an iCalendar feed.
+
+    Calendar apps cannot send headers, so the token may be passed as
+    `?token=`. The feed carries an ETag; polling with If-None-Match costs a
+    single aggregate query and returns 304 while nothing changed.
+    """
+    etag = await user_events_etag(db, user_id, "feed")
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    statement = (
+        select(*FEED_COLUMNS)
+        .where(Event.user_id == user_id)
+        .order_by(Event.start_time, Event.id)
+        .execution_options(yield_per=FEED_BATCH_SIZE)
+    )
+    uid_domain = settings.PROJECT_NAME.lower()
+
+    async def body():
+        # Runs while the request's session is still open (dependencies with
+        # yield are finalized after the response has been sent)
+        yield calendar_header(settings.PROJECT_NAME)
+        result = await db.stream(statement)
+        async for partition in result.partitions():
+            yield "".join(format_event(row, uid_domain) for row in partition)
+        yield calendar_footer()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/calendar; charset=utf-8",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+async def _insert_parsed_events(db: AsyncSession, parser: ICalendarParser, user_id: int) -> Tuple[int, int]:
+    """Insert the parsed events that fit the calendar; returns (imported, skipped as overlapping)."""
+    events = parser.take_events()
+    placements = [Placement(user_id, event.start_time, event.end_time) for event in events]
+    # Earlier batches are already inserted, so the database check covers them
+    overlapping = set(await find_overlaps(db, placements)) if placements else set()
+    kept = [index for index in range(len(placements)) if index not in overlapping]
+    clashing = overlapping_placements([placements[index] for index in kept])
+    events = [events[index] for position, index in enumerate(kept) if position not in clashing]
+    if events:
+        await db.execute(insert(Event), [
+            {
+                "title": event.title,
+                "start_time": event.start_time,
+                "end_time": event.end_time,
+                "status": EventStatus.BUSY,
+                "user_id": user_id
+            }
+            for event in events
+        ])
+    return len(events), len(placements) - len(events)
+
+
+@router.post("/import", response_model=CalendarImportResponse, status_code=status.HTTP_201_CREATED)
+async def import_calendar(
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import the events of an uploaded .ics file as BUSY events.
+
+    The upload is parsed as it is read and inserted in batches, all in one
+    transaction. Events that cannot be placed in time (no end, or ending
+    before they start) or that overlap one of the user's events (including
+    one imported earlier from the same file) are skipped and counted.
+    """
+    parser = ICalendarParser()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    remainder = ""
+    imported = 0
+    overlapping = 0
+    try:
+        while True:
+            chunk = await file.read(IMPORT_CHUNK_SIZE)
+            text = remainder + decoder.decode(chunk, final=not chunk)
+            *lines, remainder = text.split("\n")
+            for line in lines:
+                parser.feed(line)
+            if not chunk:
+                parser.feed(remainder)
+                parser.close()
+            if imported + overlapping + parser.ready > settings.CALENDAR_IMPORT_MAX_EVENTS:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Calendar has more than {settings.CALENDAR_IMPORT_MAX_EVENTS} events"
+                )
+            if parser.ready >= IMPORT_BATCH_SIZE or not chunk:
+                inserted, skipped = await _insert_parsed_events(db, parser, current_user.id)
+                imported += inserted
+                overlapping += skipped
+            if not chunk:
+                break
+    except (ICalendarError, UnicodeDecodeError) as exc:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid calendar file: {exc}"
+        )
+    except HTTPException:
+        await db.rollback()
+        raise
+
+    await db.commit()
+
+    return CalendarImportResponse(imported=imported, skipped=parser.skipped + overlapping)
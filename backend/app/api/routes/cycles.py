@@ -0,0 +1,280 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.database import get_db
+from app.core.principal_cache import Principal
+from app.core.slot_cache import invalidate_slots
+from app.models.event import Event, EventStatus
+from app.models.swap_cycle import SwapCycle, SwapCycleLeg, SwapCycleStatus, SwapIntent, SwapIntentStatus
+from app.schemas.swap_cycle import (
+    SwapIntentCreate,
+    SwapIntentResponse,
+    SwapCycleResponse,
+    SwapCycleRespond
+)
+from app.api.deps import get_current_user
+from app.api.notifications import notify_slots, notify_swap_cycle
+from app.api.routes.swaps import _require_swap_pending
+from app.utils.locking import lock_rows
+from app.utils.overlaps import EventOverlap, Placement, find_overlaps, overlapping_placements
+
+router = APIRouter()
+
+
+def _cycle_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Swap cycle not found"
+    )
+
+
+@router.post("/swap-intents", response_model=SwapIntentResponse, status_code=status.HTTP_201_CREATED)
+async def create_swap_intent(
+    intent_data: SwapIntentCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Declare that you would give one of your SWAPPABLE slots for another user's.
+
+    Unlike a swap request, an intent does not reserve either slot. Intents
+    are matched into multi-party cycles by a background job (app.api.matching).
+    """
+    slots = await lock_rows(db, Event, [intent_data.offered_slot_id, intent_data.wanted_slot_id])
+    offered_slot = slots.get(intent_data.offered_slot_id)
+    wanted_slot = slots.get(intent_data.wanted_slot_id)
+
+    if not offered_slot or offered_slot.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Your slot not found"
+        )
+
+    if offered_slot.status != EventStatus.SWAPPABLE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Your slot must be marked as SWAPPABLE"
+        )
+
+    if not wanted_slot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Requested slot not found"
+        )
+
+    if wanted_slot.user_id == current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot swap with your own slot"
+        )
+
+    if wanted_slot.status != EventStatus.SWAPPABLE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Requested slot is not available for swapping"
+        )
+
+    existing = await db.scalar(select(SwapIntent.id).where(
+        SwapIntent.status == SwapIntentStatus.OPEN,
+        SwapIntent.offered_slot_id == offered_slot.id,
+        SwapIntent.wanted_slot_id == wanted_slot.id
+    ))
+    if existing is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You already offered this slot for that one"
+        )
+
+    intent = SwapIntent(
+        user_id=current_user.id,
+        offered_slot_id=offered_slot.id,
+        wanted_slot_id=wanted_slot.id,
+        status=SwapIntentStatus.OPEN
+    )
+    db.add(intent)
+    await db.commit()
+    await db.refresh(intent)
+
+    return intent
+
+
+@router.get("/swap-intents", response_model=List[SwapIntentResponse])
+async def get_my_swap_intents(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the current user's open and matched intents, oldest first.
+    """
+    result = await db.scalars(
+        select(SwapIntent).where(SwapIntent.user_id == current_user.id).order_by(SwapIntent.id)
+    )
+    return result.all()
+
+
+@router.delete("/swap-intents/{intent_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_swap_intent(
+    intent_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Withdraw an open intent.
+    """
+    intent = (await lock_rows(db, SwapIntent, [intent_id])).get(intent_id)
+
+    if not intent or intent.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Swap intent not found"
+        )
+
+    if intent.status != SwapIntentStatus.OPEN:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Intent is part of a proposed swap cycle; reject the cycle instead"
+        )
+
+    await db.delete(intent)
+    await db.commit()
+
+    return None
+
+
+@router.get("/swap-cycles", response_model=List[SwapCycleResponse])
+async def get_my_swap_cycles(
+    cycle_status: Optional[SwapCycleStatus] = Query(None, alias="status"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the swap cycles the current user takes part in, newest first.
+    """
+    statement = (
+        select(SwapCycle)
+        .options(selectinload(SwapCycle.legs))
+        .where(SwapCycle.id.in_(select(SwapCycleLeg.cycle_id).where(SwapCycleLeg.user_id == current_user.id)))
+        .order_by(SwapCycle.id.desc())
+    )
+    if cycle_status is not None:
+        statement = statement.where(SwapCycle.status == cycle_status)
+    result = await db.scalars(statement)
+    return result.all()
+
+
+async def _require_cycle_fits(db: AsyncSession, legs, slots, user_id: int) -> None:
+    """
+    Ensure no participant ends up with overlapping events once the cycle is applied.
+
+    The caller is told which of their own events are in the way, and only
+    that someone else has a clash otherwise.
+    """
+    vacated = frozenset(slots)
+    placements = [
+        Placement(
+            leg.user_id, slots[leg.take_slot_id].start_time, slots[leg.take_slot_id].end_time,
+            event_id=leg.take_slot_id, ignore=vacated
+        )
+        for leg in legs
+    ]
+    conflicts = await find_overlaps(db, placements)
+    clashing = overlapping_placements(placements)
+    mine = [
+        event_id
+        for index, event_ids in conflicts.items() if placements[index].user_id == user_id
+        for event_id in event_ids
+    ]
+    for pair in clashing.items():
+        mine.extend(placements[i].event_id for i in pair if placements[i].user_id == user_id)
+    if mine:
+        raise EventOverlap(mine, detail="A slot in this cycle overlaps another of your events")
+    if conflicts or clashing:
+        raise EventOverlap(detail="A slot in this cycle overlaps another participant's events")
+
+
+@router.post("/swap-cycles/{cycle_id}/respond", response_model=SwapCycleResponse)
+async def respond_to_swap_cycle(
+    cycle_id: int,
+    response_data: SwapCycleRespond,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Accept or reject a proposed swap cycle.
+
+    The swap happens atomically once every participant has accepted: each
+    receives the slot they asked for and all slots become BUSY. A single
+    rejection cancels the cycle; the slots return to the marketplace, the
+    rejecting user's intents in it are withdrawn and the others reopen.
+    """
+    cycle = (await lock_rows(db, SwapCycle, [cycle_id])).get(cycle_id)
+    if not cycle:
+        raise _cycle_not_found()
+    legs = (await db.scalars(
+        select(SwapCycleLeg).where(SwapCycleLeg.cycle_id == cycle_id).order_by(SwapCycleLeg.position)
+    )).all()
+    if current_user.id not in {leg.user_id for leg in legs}:
+        raise _cycle_not_found()
+
+    if cycle.status != SwapCycleStatus.PROPOSED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Swap cycle has already been processed"
+        )
+
+    slots = await lock_rows(db, Event, [leg.give_slot_id for leg in legs])
+    if len(slots) < len(legs):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="One or more slots not found"
+        )
+    _require_swap_pending(*slots.values())
+
+    # Touching the cycle bumps its version, so concurrent responses serialize
+    cycle.updated_at = datetime.utcnow()
+    action = "updated"
+    if response_data.accept:
+        for leg in legs:
+            if leg.user_id == current_user.id:
+                leg.accepted = True
+        if all(leg.accepted for leg in legs):
+            await _require_cycle_fits(db, legs, slots, current_user.id)
+            action = "accepted"
+            cycle.status = SwapCycleStatus.ACCEPTED
+            for leg in legs:
+                slots[leg.take_slot_id].user_id = leg.user_id
+            for slot in slots.values():
+                slot.status = EventStatus.BUSY
+    else:
+        action = "rejected"
+        cycle.status = SwapCycleStatus.REJECTED
+        for slot in slots.values():
+            slot.status = EventStatus.SWAPPABLE
+        intents = await lock_rows(db, SwapIntent, [leg.intent_id for leg in legs if leg.intent_id])
+        for intent in intents.values():
+            if intent.user_id == current_user.id:
+                await db.delete(intent)
+            else:
+                intent.status = SwapIntentStatus.OPEN
+
+    await db.commit()
+    await db.refresh(cycle, ["legs"])
+
+    await notify_swap_cycle(action, cycle, legs)
+    if action == "accepted":
+        # SWAP_PENDING slots were not listed, so the marketplace is unchanged
+        await notify_slots(
+            "updated", list(slots), EventStatus.BUSY,
+            owner_ids=[leg.user_id for leg in legs], marketplace=False
+        )
+    elif action == "rejected":
+        await invalidate_slots([slot.start_time for slot in slots.values()])
+        await notify_slots(
+            "updated", list(slots), EventStatus.SWAPPABLE,
+            owner_ids=[slot.user_id for slot in slots.values()], marketplace=True
+        )
+
+    return cycle
@@ -1,59 +1,242 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, bindparam, delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 from app.database import get_db
-from app.models.user import User
+from app.core.principal_cache import Principal
+from app.core.slot_cache import invalidate_slots
 from app.models.event import Event, EventStatus
-from app.schemas.event import EventCreate, EventUpdate, EventResponse, EventWithOwner
+from app.schemas.event import (
+    EventCreate, EventUpdate, EventResponse,
+    EventBatchRequest, EventBatchResult, EventBatchResponse
+)
+from app.api.conditional import event_etag, not_modified, require_if_match, set_etag, user_events_etag
 from app.api.deps import get_current_user
+from app.api.notifications import notify_slots
+from app.api.serialization import JSON, list_response, response_format, row_encoder
+from app.utils.intervals import IntervalSet
+from app.utils.locking import execute_versioned, lock_rows
+from app.utils.overlaps import Placement, check_overlaps
 
 router = APIRouter()
 
+# Rows of list responses are encoded straight from the ORM objects
+_encode_event = row_encoder(EventResponse)
+
+# Candidates examined per suggestions request before settling for a short page
+SUGGESTION_SCAN_LIMIT = 2000
+# Rows in a suggestions scan's first batch; each later batch doubles
+SUGGESTION_SCAN_BATCH = 16
+
+
+def _event_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Event not found"
+    )
+
+
+def _require_update_allowed(current_status: EventStatus, new_status: Optional[EventStatus]) -> None:
+    # Check if event is in SWAP_PENDING status
+    if current_status == EventStatus.SWAP_PENDING and new_status != EventStatus.SWAP_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot modify event with pending swap request"
+        )
+
+
+def _require_delete_allowed(current_status: EventStatus) -> None:
+    # Check if event is in SWAP_PENDING status
+    if current_status == EventStatus.SWAP_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot delete event with pending swap request"
+        )
+
 
 @router.get("", response_model=List[EventResponse])
-def get_my_events(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_my_events(
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get all events for the current user.
+    
+    Send the ETag back as If-None-Match to get a 304 while nothing changed.
     """
-    events = db.query(Event).filter(Event.user_id == current_user.id).order_by(Event.start_time).all()
-    return events
+    media_type = response_format(request)
+    # Tag first: a write landing in between makes the body newer, never staler
+    etag = await user_events_etag(db, current_user.id, "events" if media_type == JSON else "events.msgpack")
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    
+    result = await db.execute(
+        select(Event).where(Event.user_id == current_user.id).order_by(Event.start_time)
+    )
+    response = list_response(request, result.scalars(), _encode_event, media_type=media_type)
+    set_etag(response, etag)
+    return response
 
 
 @router.get("/{event_id}", response_model=EventResponse)
-def get_event(
+async def get_event(
     event_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific event by ID.
     """
-    event = db.query(Event).filter(
+    result = await db.execute(select(Event).where(
         Event.id == event_id,
         Event.user_id == current_user.id
-    ).first()
+    ))
+    event = result.scalars().first()
     
     if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event not found"
-        )
+        raise _event_not_found()
+    
+    etag = event_etag(event)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    set_etag(response, etag)
     
     return event
 
 
+class _SlotScan:
+    """
+    Other users' SWAPPABLE slots read outward from `around`, in one direction.
+
+    Rows come off the swappable-slots index (start_time, id) a batch at a
+    time, using the last row seen as the keyset position for the next batch.
+    Batches double in size, so a run of slots the caller cannot take costs
+    a logarithmic number of queries rather than one per page.
+    """
+
+    def __init__(self, db: AsyncSession, user_id: int, around: datetime, later: bool, batch: int):
+        self._db = db
+        self._later = later
+        self._batch = batch
+        self._buffer = deque()
+        self._position = None
+        self._exhausted = False
+        query = select(Event).where(Event.status == EventStatus.SWAPPABLE, Event.user_id != user_id)
+        if later:
+            self._query = query.where(Event.start_time >= around).order_by(Event.start_time, Event.id)
+        else:
+            self._query = query.where(Event.start_time < around).order_by(Event.start_time.desc(), Event.id.desc())
+
+    async def peek(self) -> Optional[Event]:
+        """The nearest slot not yet taken, or None once this direction runs out."""
+        if not self._buffer and not self._exhausted:
+            await self._fetch()
+        return self._buffer[0] if self._buffer else None
+
+    def pop(self) -> Event:
+        return self._buffer.popleft()
+
+    async def _fetch(self) -> None:
+        query = self._query
+        if self._position:
+            last_start, last_id = self._position
+            if self._later:
+                query = query.where(or_(
+                    Event.start_time > last_start,
+                    and_(Event.start_time == last_start, Event.id > last_id)
+                ))
+            else:
+                query = query.where(or_(
+                    Event.start_time < last_start,
+                    and_(Event.start_time == last_start, Event.id < last_id)
+                ))
+        rows = (await self._db.scalars(query.limit(self._batch))).all()
+        self._buffer.extend(rows)
+        self._exhausted = len(rows) < self._batch
+        if rows:
+            self._position = (rows[-1].start_time, rows[-1].id)
+        self._batch = min(self._batch * 2, SUGGESTION_SCAN_LIMIT)
+
+
+@router.get("/{event_id}/suggestions", response_model=List[EventResponse])
+async def get_slot_suggestions(
+    event_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Suggest other users' swappable slots to trade this event for.
+    
+    Slots overlapping any of the caller's other events, whatever their
+    status, are left out, since the swap would be rejected as an overlap
+    (this event itself would be given away). The rest are ranked by how
+    close they start to this event. Candidates are read outward from the
+    event's start time in both directions along the swappable-slots index,
+    so the cost follows the size of the page, not of the marketplace.
+    """
+    result = await db.execute(select(Event).where(
+        Event.id == event_id,
+        Event.user_id == current_user.id
+    ))
+    event = result.scalars().first()
+    
+    if not event:
+        raise _event_not_found()
+    
+    result = await db.execute(select(Event.start_time, Event.end_time).where(
+        Event.user_id == current_user.id,
+        Event.id != event.id
+    ))
+    busy = IntervalSet(result.all())
+    
+    batch = max(limit, SUGGESTION_SCAN_BATCH)
+    scans = [
+        _SlotScan(db, current_user.id, event.start_time, later=True, batch=batch),
+        _SlotScan(db, current_user.id, event.start_time, later=False, batch=batch),
+    ]
+    suggestions = []
+    for _ in range(SUGGESTION_SCAN_LIMIT):
+        heads = []
+        for scan in scans:
+            slot = await scan.peek()
+            if slot is not None:
+                heads.append((abs(slot.start_time - event.start_time), slot.id, scan))
+        if not heads:
+            break
+        scan = min(heads, key=lambda head: head[:2])[2]
+        slot = scan.pop()
+        if not busy.overlaps(slot.start_time, slot.end_time):
+            suggestions.append(slot)
+            if len(suggestions) == limit:
+                break
+    
+    return suggestions
+
+
 @router.post("", response_model=EventResponse, status_code=status.HTTP_201_CREATED)
-def create_event(
+async def create_event(
     event_data: EventCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new event for the current user.
+    
+    Answers 409 with the conflicting event ids if it overlaps one of the
+    user's events.
     """
+    await check_overlaps(db, [Placement(current_user.id, event_data.start_time, event_data.end_time)])
+    
     new_event = Event(
         title=event_data.title,
         start_time=event_data.start_time,
@@ -63,79 +246,327 @@ def create_event(
     )
     
     db.add(new_event)
-    db.commit()
-    db.refresh(new_event)
+    await db.commit()
+    await db.refresh(new_event)
     
+    set_etag(response, event_etag(new_event))
     return new_event
 
 
+def _stage_batch_operation(
+    operation, event: Optional[Event], changes: Dict[str, object], deleted: Set[int]
+) -> None:
+    """
+    Check one update, status or delete operation and merge it into the event's pending changes.
+
+    Raises HTTPException before staging anything, so a failed operation
+    leaves the rest of the batch intact.
+    """
+    if event is None or event.id in deleted:
+        raise _event_not_found()
+    current_status = changes.get("status", event.status)
+
+    if operation.op == "delete":
+        _require_delete_allowed(current_status)
+        deleted.add(event.id)
+        return
+
+    if operation.op == "status":
+        update_data = {"status": operation.status}
+    else:
+        update_data = operation.model_dump(exclude_unset=True, exclude={"op", "id"})
+    _require_update_allowed(current_status, update_data.get("status"))
+    changes.update(update_data)
+
+
+@router.post("/batch", response_model=EventBatchResponse)
+async def batch_events(
+    batch: EventBatchRequest,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply create, update, status and delete operations in one transaction.
+    
+    Operations run in request order and several may target the same event.
+    Results are reported per operation. By default the batch is
+    all-or-nothing: if any operation fails nothing is written, the response
+    is 400 and the operations that would have succeeded report 424. With
+    `atomic: false` failed operations are skipped and the rest commit.
+    
+    Events are checked for overlaps once all operations are staged; a batch
+    leaving two of the user's events overlapping is rejected as a whole with
+    409 and the conflicting event ids, in either mode.
+    """
+    target_ids = [operation.id for operation in batch.operations if operation.op != "create"]
+    locked = await lock_rows(db, Event, target_ids) if target_ids else {}
+    events = {event_id: event for event_id, event in locked.items() if event.user_id == current_user.id}
+
+    changes: Dict[int, Dict[str, object]] = defaultdict(dict)
+    deleted: Set[int] = set()
+    creates = []
+    failures = {}
+    for index, operation in enumerate(batch.operations):
+        if operation.op == "create":
+            creates.append(index)
+            continue
+        try:
+            _stage_batch_operation(operation, events.get(operation.id), changes[operation.id], deleted)
+        except HTTPException as exc:
+            failures[index] = exc
+
+    applied = not (failures and batch.atomic)
+    if not applied:
+        await db.rollback()
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        created = []
+    else:
+        previous = {
+            event_id: (events[event_id].status, events[event_id].start_time)
+            for event_id in deleted.union(event_id for event_id, staged in changes.items() if staged)
+        }
+        await _check_batch_overlaps(
+            db, events, changes, deleted, [batch.operations[index] for index in creates], current_user.id
+        )
+        await _write_batch_changes(db, events, changes, deleted)
+        created = await _insert_batch_events(db, [batch.operations[index] for index in creates], current_user.id)
+        await db.commit()
+
+    created_by_index = dict(zip(creates, created))
+    results = [
+        _batch_result(index, operation, failures.get(index), applied, created_by_index.get(index), events)
+        for index, operation in enumerate(batch.operations)
+    ]
+
+    if applied:
+        await _notify_batch(events, deleted, previous, current_user.id)
+
+    return EventBatchResponse(applied=applied, results=results)
+
+
+def _batch_result(index, operation, failure, applied, created, events) -> EventBatchResult:
+    result = EventBatchResult(index=index, op=operation.op, status_code=status.HTTP_200_OK)
+    if operation.op != "create":
+        result.id = operation.id
+    if failure is not None:
+        result.status_code, result.detail = failure.status_code, failure.detail
+    elif not applied:
+        result.status_code = status.HTTP_424_FAILED_DEPENDENCY
+        result.detail = "Not applied because another operation in the batch failed"
+    elif operation.op == "delete":
+        result.status_code = status.HTTP_204_NO_CONTENT
+    else:
+        event = created if operation.op == "create" else events[operation.id]
+        if operation.op == "create":
+            result.status_code = status.HTTP_201_CREATED
+        result.id = event.id
+        result.event = EventResponse.model_validate(event)
+    return result
+
+
+async def _check_batch_overlaps(
+    db, events: Dict[int, Event], changes: Dict[int, Dict[str, object]], deleted: Set[int], creates, user_id: int
+) -> None:
+    """
+    Check the batch's new and moved events against the calendar and each other.
+
+    Events the batch moves or deletes no longer hold their old times.
+    """
+    moved = [
+        event_id for event_id, staged in changes.items()
+        if event_id not in deleted and ("start_time" in staged or "end_time" in staged)
+    ]
+    vacated = frozenset(deleted.union(moved))
+    placements = [
+        Placement(
+            user_id,
+            changes[event_id].get("start_time", events[event_id].start_time),
+            changes[event_id].get("end_time", events[event_id].end_time),
+            event_id=event_id,
+            ignore=vacated
+        )
+        for event_id in moved
+    ]
+    placements.extend(Placement(user_id, operation.start_time, operation.end_time, ignore=vacated) for operation in creates)
+    if placements:
+        await check_overlaps(db, placements)
+
+
+async def _write_batch_changes(
+    db, events: Dict[int, Event], changes: Dict[int, Dict[str, object]], deleted: Set[int]
+) -> None:
+    """
+    Write staged updates and deletes as one executemany per statement shape.
+
+    Each row is matched on its version and the version bumped, so the
+    batch conflicts with concurrent writers exactly like single-row updates.
+    The loaded events are brought up to date for the response.
+    """
+    table = Event.__table__
+    now = datetime.utcnow()
+    deletes = [{"b_id": event_id, "b_version": events[event_id].version} for event_id in sorted(deleted)]
+    updates_by_columns = defaultdict(list)
+    for event_id, event_changes in changes.items():
+        if event_changes and event_id not in deleted:
+            columns = tuple(sorted(event_changes))
+            updates_by_columns[columns].append(
+                {"b_id": event_id, "b_version": events[event_id].version, **event_changes}
+            )
+
+    for columns, params in updates_by_columns.items():
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.version == bindparam("b_version"))
+            .values({
+                **{column: bindparam(column) for column in columns},
+                "version": table.c.version + 1,
+                "updated_at": now,
+            })
+        )
+        await execute_versioned(db, statement, params)
+        for row in params:
+            event = events[row["b_id"]]
+            for column in columns:
+                set_committed_value(event, column, row[column])
+            set_committed_value(event, "version", row["b_version"] + 1)
+            set_committed_value(event, "updated_at", now)
+
+    if deletes:
+        statement = delete(table).where(table.c.id == bindparam("b_id"), table.c.version == bindparam("b_version"))
+        await execute_versioned(db, statement, deletes)
+
+
+async def _insert_batch_events(db, operations, user_id: int) -> List[Event]:
+    """Insert new events with one bulk INSERT ... RETURNING, in request order."""
+    if not operations:
+        return []
+    rows = [
+        {
+            "title": operation.title,
+            "start_time": operation.start_time,
+            "end_time": operation.end_time,
+            "status": EventStatus.BUSY,
+            "user_id": user_id
+        }
+        for operation in operations
+    ]
+    # populate_existing: a reused id may still map to a row deleted earlier in the batch
+    statement = insert(Event).returning(Event, sort_by_parameter_order=True)
+    result = await db.scalars(statement.execution_options(populate_existing=True), rows)
+    return result.all()
+
+
+async def _notify_batch(events, deleted, previous, user_id: int) -> None:
+    """Publish the batch's slot changes, one message per action and status, and refresh the marketplace cache."""
+    grouped = defaultdict(list)
+    marketplace_times = []
+    for event_id, (previous_status, previous_start) in previous.items():
+        event = events[event_id]
+        if event_id in deleted:
+            grouped[("deleted", previous_status, previous_status == EventStatus.SWAPPABLE)].append(event_id)
+            if previous_status == EventStatus.SWAPPABLE:
+                marketplace_times.append(previous_start)
+        elif event.status != previous_status or previous_status == EventStatus.SWAPPABLE:
+            marketplace = EventStatus.SWAPPABLE in (previous_status, event.status)
+            grouped[("updated", event.status, marketplace)].append(event_id)
+            if marketplace:
+                marketplace_times.extend((previous_start, event.start_time))
+    await invalidate_slots(marketplace_times)
+    for (action, event_status, marketplace), event_ids in grouped.items():
+        await notify_slots(action, event_ids, event_status, owner_ids=[user_id], marketplace=marketplace)
+
+
 @router.put("/{event_id}", response_model=EventResponse)
-def update_event(
+async def update_event(
     event_id: int,
     event_data: EventUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update an event.
+    
+    Send the event's ETag as If-Match to get a 412 instead of overwriting a
+    change made since it was fetched. Moving the event onto another of the
+    user's events answers 409 with the conflicting event ids.
     """
-    event = db.query(Event).filter(
+    result = await db.execute(select(Event).where(
         Event.id == event_id,
         Event.user_id == current_user.id
-    ).first()
+    ))
+    event = result.scalars().first()
     
     if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event not found"
-        )
+        raise _event_not_found()
     
-    # Check if event is in SWAP_PENDING status
-    if event.status == EventStatus.SWAP_PENDING and event_data.status != EventStatus.SWAP_PENDING:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot modify event with pending swap request"
-        )
+    require_if_match(request, event_etag(event))
+    _require_update_allowed(event.status, event_data.status)
     
     # Update fields
+    previous_status, previous_start = event.status, event.start_time
     update_data = event_data.model_dump(exclude_unset=True)
+    if "start_time" in update_data or "end_time" in update_data:
+        await check_overlaps(db, [Placement(
+            event.user_id,
+            update_data.get("start_time", event.start_time),
+            update_data.get("end_time", event.end_time),
+            event_id=event.id
+        )])
     for field, value in update_data.items():
         setattr(event, field, value)
     
-    db.commit()
-    db.refresh(event)
+    # The UPDATE is matched on the version read above, so a write racing
+    # in after the If-Match check still fails (409) without holding locks
+    await db.commit()
+    await db.refresh(event)
+    set_etag(response, event_etag(event))
+    
+    if event.status != previous_status or previous_status == EventStatus.SWAPPABLE:
+        marketplace = EventStatus.SWAPPABLE in (previous_status, event.status)
+        if marketplace:
+            await invalidate_slots([previous_start, event.start_time])
+        await notify_slots(
+            "updated", [event.id], event.status, owner_ids=[event.user_id], marketplace=marketplace
+        )
     
     return event
 
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_event(
+async def delete_event(
     event_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete an event.
+    
+    Honors If-Match like update_event.
     """
-    event = db.query(Event).filter(
+    result = await db.execute(select(Event).where(
         Event.id == event_id,
         Event.user_id == current_user.id
-    ).first()
+    ))
+    event = result.scalars().first()
     
     if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event not found"
-        )
+        raise _event_not_found()
     
-    # Check if event is in SWAP_PENDING status
-    if event.status == EventStatus.SWAP_PENDING:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot delete event with pending swap request"
-        )
+    require_if_match(request, event_etag(event))
+    _require_delete_allowed(event.status)
+    
+    await db.delete(event)
+    await db.commit()
     
-    db.delete(event)
-    db.commit()
+    if event.status == EventStatus.SWAPPABLE:
+        await invalidate_slots([event.start_time])
+    await notify_slots(
+        "deleted", [event.id], event.status, owner_ids=[event.user_id],
+        marketplace=event.status == EventStatus.SWAPPABLE
+    )
     
     return None
\ No newline at end of file
@@ -0,0 +1,53 @@
+import asyncio
+import json
+from typing import AsyncIterator
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from app.api.deps import get_token_user_id
+from app.core.broker import Message, Subscription, get_broker
+from app.core.config import settings
+
+router = APIRouter()
+
+
+def format_sse(message: Message) -> str:
+    return f"event: {message.type}\ndata: {json.dumps(message.data)}\n\n"
+
+
+async def event_stream(subscription: Subscription, keepalive_seconds: float) -> AsyncIterator[str]:
+    """Render a subscription as Server-Sent Events, with keepalive comments while idle."""
+    yield "retry: 5000\n\n"
+    while True:
+        if subscription.overflowed:
+            yield "event: resync\ndata: {}\n\n"
+            return
+        try:
+            message = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive_seconds)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+        yield format_sse(message)
+
+
+@router.get("/stream")
+async def stream_changes(user_id: int = Depends(get_token_user_id)):
+    """
+    Stream swap request and slot changes relevant to the current user.
+    
+    Authentication never touches the database, so an open stream holds no
+    pooled connection.
+    
+    Events: swap_request.created/accepted/rejected/cancelled and
+    slot.updated/deleted. A `resync` event means the client fell behind and
+    should refetch its lists.
+    """
+    async def body():
+        async with get_broker().subscribe(user_id) as subscription:
+            async for chunk in event_stream(subscription, settings.STREAM_KEEPALIVE_SECONDS):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,54 +1,243 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.user import User
+import itertools
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Literal, Optional, Set, Tuple, Union
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, bindparam, func, null, or_, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.database import get_db, use_primary
+from app.core.config import settings
+from app.core.principal_cache import Principal
+from app.core.slot_cache import CachedSlot, CachedWindow, SlotWindow, get_slot_cache, invalidate_slots
 from app.models.event import Event, EventStatus
-from app.models.swap_request import SwapRequest, SwapRequestStatus
+from app.models.swap_request import SwapRequest, SwapRequestArchive, SwapRequestStatus
+from app.models.user import User
 from app.schemas.event import EventResponse
 from app.schemas.swap_request import (
     SwapRequestCreate,
     SwapResponseUpdate,
     SwapRequestResponse,
-    SwapRequestDetailed
+    SwapRequestDetailed,
+    SwapRequestHistoryItem,
+    SwapDecision,
+    SwapDecisionBatch,
+    SwapDecisionResult,
+    SwapDecisionBatchResponse
 )
+from app.api.conditional import not_modified, set_etag
 from app.api.deps import get_current_user
+from app.api.notifications import notify_slots, notify_swap_request
+from app.api.serialization import (
+    JSON, encode_row_json, items_response, list_response, response_format, row_encoder
+)
+from app.utils.etags import make_etag
+from app.utils.locking import execute_versioned, lock_rows
+from app.utils.overlaps import EventOverlap, Placement, find_overlaps, overlapping_placements
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter()
 
+# Rows of list responses are encoded straight from the ORM objects
+_encode_event = row_encoder(EventResponse)
+_encode_swap_request = row_encoder(SwapRequestResponse)
+_encode_history_item = row_encoder(SwapRequestHistoryItem)
+
+
+def _min_duration_clause(db: AsyncSession, minutes: int):
+    """Filter events lasting at least `minutes`, using the dialect's date arithmetic."""
+    if db.bind.dialect.name == "sqlite":
+        duration = (func.julianday(Event.end_time) - func.julianday(Event.start_time)) * 1440
+        return duration >= minutes
+    return Event.end_time - Event.start_time >= timedelta(minutes=minutes)
+
+
+def _require_swap_pending(*slots: Optional[Event]) -> None:
+    """
+    Ensure the slots of a pending request are still SWAP_PENDING.
+
+    Every transition then changes both slots, so their version checks always
+    run and a request read just before a concurrent change cannot commit.
+    """
+    if any(slot is not None and slot.status != EventStatus.SWAP_PENDING for slot in slots):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Swap request was modified by a concurrent request, please retry"
+        )
+
+
+def _position(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """The keyset position a cursor stands for; 400 when it is not one of ours."""
+    if not cursor:
+        return None
+    position = decode_cursor(cursor)
+    if position is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return position
+
+
+def _after(created_at, id_, position: Tuple[datetime, int], descending: bool = True):
+    """Rows past `position` in (created_at, id) order."""
+    last_created, last_id = position
+    if descending:
+        return or_(created_at < last_created, and_(created_at == last_created, id_ < last_id))
+    return or_(created_at > last_created, and_(created_at == last_created, id_ > last_id))
+
+
+def _next_page(rows, limit: int):
+    """Trim the extra row fetched past `limit`; the X-Next-Cursor header when there was one."""
+    if len(rows) <= limit:
+        return rows, {}
+    rows = rows[:limit]
+    return rows, {"X-Next-Cursor": encode_cursor(rows[-1].created_at, rows[-1].id)}
+
 
 @router.get("/swappable-slots", response_model=List[EventResponse])
-def get_swappable_slots(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_swappable_slots(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    from_: Optional[datetime] = Query(None, alias="from", description="Only slots starting at or after this time"),
+    to: Optional[datetime] = Query(None, description="Only slots starting before this time"),
+    min_duration: Optional[int] = Query(None, ge=1, description="Minimum slot length in minutes"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get all swappable slots from other users.
+    Get swappable slots from other users, one page at a time.
+    
+    Slots are ordered by (start_time, id). When more slots are available the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    
+    The page's ETag is derived from its rows' ids and versions, so a
+    matching If-None-Match returns 304 without serializing anything.
     """
-    slots = db.query(Event).filter(
-        Event.status == EventStatus.SWAPPABLE,
-        Event.user_id != current_user.id
-    ).order_by(Event.start_time).all()
+    position = _position(cursor)
+    
+    window = SlotWindow.of(from_, to, min_duration)
+    cached = None
+    slot_cache = get_slot_cache()
+    if slot_cache.enabled:
+        cached = await slot_cache.get(window)
+        if cached is None:
+            epoch = await slot_cache.epoch()
+            # The window is shared by every worker until it expires; a lagging
+            # replica could fill it with slots invalidated since the epoch
+            use_primary(db)
+            cached = await _load_window(db, window, settings.SLOT_CACHE_MAX_SLOTS)
+            await slot_cache.store(window, cached, epoch)
+    
+    from_cache = cached is not None and cached.slots is not None
+    if from_cache:
+        page, next_cursor = _page_from_window(cached.slots, current_user.id, position, limit)
+        versions = [(slot.id, slot.version) for slot in page]
+    else:
+        query = _window_query(db, window).where(Event.user_id != current_user.id)
+        if position:
+            last_start, last_id = position
+            query = query.where(or_(
+                Event.start_time > last_start,
+                and_(Event.start_time == last_start, Event.id > last_id)
+            ))
+        
+        # Fetch one extra row to find out whether there is a next page
+        result = await db.execute(query.order_by(Event.start_time, Event.id).limit(limit + 1))
+        page = result.scalars().all()
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(page[-1].start_time, page[-1].id)
+        versions = [(slot.id, slot.version) for slot in page]
+    
+    media_type = response_format(request)
+    representation = "swappable-slots" if media_type == JSON else "swappable-slots.msgpack"
+    etag = make_etag(representation, next_cursor, *(f"{slot_id}:{version}" for slot_id, version in versions))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    cached_response = not_modified(request, etag)
+    if cached_response is not None:
+        cached_response.headers.update(headers)
+        return cached_response
     
-    return slots
+    if not from_cache:
+        response = list_response(request, page, _encode_event, headers=headers, media_type=media_type)
+    elif media_type == JSON:
+        # Cached slots are already serialized; splice them into the list
+        response = Response(content="[" + ",".join(slot.json for slot in page) + "]", media_type=JSON, headers=headers)
+        response.headers["Vary"] = "Accept"
+    else:
+        response = items_response([orjson.loads(slot.json) for slot in page], media_type, headers)
+    set_etag(response, etag)
+    return response
+
+
+def _window_query(db: AsyncSession, window: SlotWindow):
+    query = select(Event).where(Event.status == EventStatus.SWAPPABLE)
+    if window.start:
+        query = query.where(Event.start_time >= window.start)
+    if window.end:
+        query = query.where(Event.start_time < window.end)
+    if window.min_duration:
+        query = query.where(_min_duration_clause(db, window.min_duration))
+    return query
+
+
+async def _load_window(db: AsyncSession, window: SlotWindow, max_slots: int) -> CachedWindow:
+    """Load and serialize every owner's slots in a window, or mark it too large to cache."""
+    result = await db.execute(_window_query(db, window).order_by(Event.start_time, Event.id).limit(max_slots + 1))
+    slots = result.scalars().all()
+    if len(slots) > max_slots:
+        return CachedWindow(slots=None)
+    return CachedWindow(slots=tuple(
+        CachedSlot(
+            start_time=slot.start_time,
+            id=slot.id,
+            user_id=slot.user_id,
+            version=slot.version,
+            json=encode_row_json(slot, _encode_event),
+        )
+        for slot in slots
+    ))
+
+
+def _page_from_window(
+    slots: Tuple[CachedSlot, ...], user_id: int, position: Optional[Tuple[datetime, int]], limit: int
+) -> Tuple[List[CachedSlot], Optional[str]]:
+    """Page through a cached window, skipping the caller's own slots."""
+    start = 0
+    if position:
+        start = bisect_right(slots, position, key=lambda slot: (slot.start_time, slot.id))
+    page = []
+    for slot in itertools.islice(slots, start, None):
+        if slot.user_id == user_id:
+            continue
+        if len(page) == limit:
+            last = page[-1]
+            return page, encode_cursor(last.start_time, last.id)
+        page.append(slot)
+    return page, None
 
 
 @router.post("/swap-request", response_model=SwapRequestResponse, status_code=status.HTTP_201_CREATED)
-def create_swap_request(
+async def create_swap_request(
     swap_data: SwapRequestCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a swap request.
     """
+    # Lock both slots up front so concurrent requests for them serialize here
+    slots = await lock_rows(db, Event, [swap_data.my_slot_id, swap_data.their_slot_id])
+    
     # Verify requester's slot
-    my_slot = db.query(Event).filter(
-        Event.id == swap_data.my_slot_id,
-        Event.user_id == current_user.id
-    ).first()
+    my_slot = slots.get(swap_data.my_slot_id)
     
-    if not my_slot:
+    if not my_slot or my_slot.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Your slot not found"
@@ -61,9 +250,7 @@ def create_swap_request(
         )
     
     # Verify requested slot
-    their_slot = db.query(Event).filter(
-        Event.id == swap_data.their_slot_id
-    ).first()
+    their_slot = slots.get(swap_data.their_slot_id)
     
     if not their_slot:
         raise HTTPException(
@@ -84,7 +271,7 @@ def create_swap_request(
         )
     
     # Check for existing pending swap request with these slots
-    existing_request = db.query(SwapRequest).filter(
+    result = await db.execute(select(SwapRequest).where(
         SwapRequest.status == SwapRequestStatus.PENDING,
         (
             (SwapRequest.requester_slot_id == my_slot.id) |
@@ -92,7 +279,8 @@ def create_swap_request(
             (SwapRequest.requester_slot_id == their_slot.id) |
             (SwapRequest.requested_slot_id == their_slot.id)
         )
-    ).first()
+    ))
+    existing_request = result.scalars().first()
     
     if existing_request:
         raise HTTPException(
@@ -114,27 +302,75 @@ def create_swap_request(
     their_slot.status = EventStatus.SWAP_PENDING
     
     db.add(swap_request)
-    db.commit()
-    db.refresh(swap_request)
+    await db.commit()
+    await db.refresh(swap_request)
+    
+    await invalidate_slots([my_slot.start_time, their_slot.start_time])
+    await notify_swap_request("created", swap_request)
+    await notify_slots(
+        "updated", [my_slot.id, their_slot.id], EventStatus.SWAP_PENDING,
+        owner_ids=[my_slot.user_id, their_slot.user_id], marketplace=True
+    )
     
     return swap_request
 
 
+def _swap_placements(requester_slot: Event, receiver_slot: Event, vacated=()) -> List[Placement]:
+    """
+    Where both slots land once their owners are exchanged, the receiver's first.
+
+    `vacated` lists other slots changing hands in the same transaction.
+    """
+    ignore = frozenset((requester_slot.id, receiver_slot.id, *vacated))
+    return [
+        Placement(
+            receiver_slot.user_id, requester_slot.start_time, requester_slot.end_time,
+            event_id=requester_slot.id, ignore=ignore
+        ),
+        Placement(
+            requester_slot.user_id, receiver_slot.start_time, receiver_slot.end_time,
+            event_id=receiver_slot.id, ignore=ignore
+        ),
+    ]
+
+
+def _swap_overlap(receiver_conflicts: List[int], requester_conflicts: bool) -> Optional[EventOverlap]:
+    """
+    The error for a swap that would double-book either party, if any.
+
+    Only the receiver (the caller) is told which of their events are in the
+    way; the requester's calendar stays private.
+    """
+    if receiver_conflicts:
+        return EventOverlap(receiver_conflicts, detail="The offered slot overlaps another of your events")
+    if requester_conflicts:
+        return EventOverlap(detail="Your slot overlaps another of the requester's events")
+    return None
+
+
+async def _require_swap_fits(db: AsyncSession, requester_slot: Event, receiver_slot: Event) -> None:
+    """Ensure neither party ends up with overlapping events once the owners are exchanged."""
+    conflicts = await find_overlaps(db, _swap_placements(requester_slot, receiver_slot))
+    overlap = _swap_overlap(conflicts.get(0), 1 in conflicts)
+    if overlap:
+        raise overlap
+
+
 @router.post("/swap-response/{request_id}", response_model=SwapRequestResponse)
-def respond_to_swap_request(
+async def respond_to_swap_request(
     request_id: int,
     response_data: SwapResponseUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Accept or reject a swap request.
     """
-    # Find the swap request
-    swap_request = db.query(SwapRequest).filter(
-        SwapRequest.id == request_id,
-        SwapRequest.receiver_id == current_user.id
-    ).first()
+    # Find and lock the swap request
+    swap_request = (await lock_rows(db, SwapRequest, [request_id])).get(request_id)
+    
+    if swap_request and swap_request.receiver_id != current_user.id:
+        swap_request = None
     
     if not swap_request:
         raise HTTPException(
@@ -148,13 +384,10 @@ def respond_to_swap_request(
             detail="Swap request has already been processed"
         )
     
-    # Get both slots
-    requester_slot = db.query(Event).filter(
-        Event.id == swap_request.requester_slot_id
-    ).first()
-    receiver_slot = db.query(Event).filter(
-        Event.id == swap_request.requested_slot_id
-    ).first()
+    # Lock both slots
+    slots = await lock_rows(db, Event, [swap_request.requester_slot_id, swap_request.requested_slot_id])
+    requester_slot = slots.get(swap_request.requester_slot_id)
+    receiver_slot = slots.get(swap_request.requested_slot_id)
     
     if not requester_slot or not receiver_slot:
         raise HTTPException(
@@ -162,7 +395,11 @@ def respond_to_swap_request(
             detail="One or both slots not found"
         )
     
+    _require_swap_pending(requester_slot, receiver_slot)
+    
     if response_data.accept:
+        await _require_swap_fits(db, requester_slot, receiver_slot)
+        
         # ACCEPT: Swap the owners
         swap_request.status = SwapRequestStatus.ACCEPTED
         
@@ -180,98 +417,450 @@ def respond_to_swap_request(
         requester_slot.status = EventStatus.SWAPPABLE
         receiver_slot.status = EventStatus.SWAPPABLE
     
-    db.commit()
-    db.refresh(swap_request)
+    await db.commit()
+    await db.refresh(swap_request)
+    
+    if not response_data.accept:
+        # Accepted slots go from SWAP_PENDING to BUSY and were never listed
+        await invalidate_slots([requester_slot.start_time, receiver_slot.start_time])
+    await notify_swap_request("accepted" if response_data.accept else "rejected", swap_request)
+    await notify_slots(
+        "updated", [requester_slot.id, receiver_slot.id], requester_slot.status,
+        owner_ids=[requester_slot.user_id, receiver_slot.user_id], marketplace=not response_data.accept
+    )
     
     return swap_request
 
 
+def _stage_swap_decision(
+    swap_request: Optional[SwapRequest], slots: Dict[int, Event], claimed: Set[int]
+) -> None:
+    """
+    Run the checks of respond_to_swap_request for one decision of a batch.
+
+    Raises HTTPException like the single-request endpoint does, plus 409 when
+    an earlier decision in the batch already touches one of the slots.
+    """
+    if not swap_request:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Swap request not found"
+        )
+    
+    if swap_request.status != SwapRequestStatus.PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Swap request has already been processed"
+        )
+    
+    slot_ids = (swap_request.requester_slot_id, swap_request.requested_slot_id)
+    if any(slot_id not in slots for slot_id in slot_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="One or both slots not found"
+        )
+    
+    _require_swap_pending(*(slots[slot_id] for slot_id in slot_ids))
+    
+    if claimed.intersection(slot_ids):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another decision in this batch already touches one of these slots"
+        )
+    claimed.update(slot_ids)
+
+
+async def _fail_overlapping_accepts(
+    db: AsyncSession,
+    accepted: Dict[int, SwapRequest],
+    slots: Dict[int, Event],
+    failures: Dict[int, Union[HTTPException, EventOverlap]],
+) -> None:
+    """
+    Fail the accepted decisions that would double-book either party.
+
+    All accepted swaps are checked together, since a slot handed over by one
+    frees its time for the others. A decision failing here keeps its slots,
+    so the remaining ones are checked again until none fails.
+    """
+    accepted = dict(accepted)
+    while accepted:
+        indexes = list(accepted)
+        vacated = frozenset(
+            slot_id
+            for swap_request in accepted.values()
+            for slot_id in (swap_request.requester_slot_id, swap_request.requested_slot_id)
+        )
+        placements = []
+        for index in indexes:
+            swap_request = accepted[index]
+            placements.extend(_swap_placements(
+                slots[swap_request.requester_slot_id], slots[swap_request.requested_slot_id], vacated
+            ))
+        conflicts = await find_overlaps(db, placements)
+        clashing = overlapping_placements(placements)
+        
+        failed = False
+        for position, index in enumerate(indexes):
+            mine, theirs = 2 * position, 2 * position + 1
+            receiver_conflicts = list(conflicts.get(mine, []))
+            if mine in clashing:
+                receiver_conflicts.append(placements[clashing[mine]].event_id)
+            overlap = _swap_overlap(receiver_conflicts, theirs in conflicts or theirs in clashing)
+            if overlap:
+                failures[index] = overlap
+                del accepted[index]
+                failed = True
+        if not failed:
+            return
+
+
+async def _write_swap_decisions(db, decided: Dict[int, Tuple[SwapRequest, bool]], slots: Dict[int, Event]) -> None:
+    """
+    Apply the decisions with one executemany per table.
+
+    Rows are matched on their versions like the ORM's own updates, and the
+    loaded objects are brought up to date for the response.
+    """
+    now = datetime.utcnow()
+    request_params = []
+    slot_params = []
+    for swap_request, accept in decided.values():
+        requester_slot = slots[swap_request.requester_slot_id]
+        receiver_slot = slots[swap_request.requested_slot_id]
+        request_params.append({
+            "b_id": swap_request.id,
+            "b_version": swap_request.version,
+            "status": SwapRequestStatus.ACCEPTED if accept else SwapRequestStatus.REJECTED,
+        })
+        for slot, new_owner in ((requester_slot, receiver_slot.user_id), (receiver_slot, requester_slot.user_id)):
+            slot_params.append({
+                "b_id": slot.id,
+                "b_version": slot.version,
+                "user_id": new_owner if accept else slot.user_id,
+                "status": EventStatus.BUSY if accept else EventStatus.SWAPPABLE,
+            })
+    
+    requests = {swap_request.id: swap_request for swap_request, _ in decided.values()}
+    for table, params, loaded in (
+        (SwapRequest.__table__, request_params, requests),
+        (Event.__table__, slot_params, slots),
+    ):
+        columns = [column for column in params[0] if not column.startswith("b_")]
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.version == bindparam("b_version"))
+            .values({
+                **{column: bindparam(column) for column in columns},
+                "version": table.c.version + 1,
+                "updated_at": now,
+            })
+        )
+        await execute_versioned(db, statement, params)
+        for row in params:
+            instance = loaded[row["b_id"]]
+            for column in columns:
+                set_committed_value(instance, column, row[column])
+            set_committed_value(instance, "version", row["b_version"] + 1)
+            set_committed_value(instance, "updated_at", now)
+
+
+@router.post("/swap-responses", response_model=SwapDecisionBatchResponse)
+async def respond_to_swap_requests(
+    batch: SwapDecisionBatch,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Accept or reject many incoming swap requests in one transaction.
+    
+    The requests, then all their slots, are locked with one query each and
+    accepted swaps are checked for overlaps together, so the cost does not
+    grow with the number of decisions. Results are reported per decision.
+    Like POST /events/batch the batch is all-or-nothing by default (400,
+    the other decisions report 424); with `atomic: false` failed decisions
+    are skipped. Two decisions touching the same slot fail with 409.
+    """
+    locked = await lock_rows(db, SwapRequest, [decision.request_id for decision in batch.decisions])
+    requests = {
+        request_id: swap_request for request_id, swap_request in locked.items()
+        if swap_request.receiver_id == current_user.id
+    }
+    slot_ids = [
+        slot_id
+        for swap_request in requests.values()
+        for slot_id in (swap_request.requester_slot_id, swap_request.requested_slot_id)
+    ]
+    slots = await lock_rows(db, Event, slot_ids) if slot_ids else {}
+    
+    failures: Dict[int, Union[HTTPException, EventOverlap]] = {}
+    decided: Dict[int, Tuple[SwapRequest, bool]] = {}
+    claimed: Set[int] = set()
+    for index, decision in enumerate(batch.decisions):
+        swap_request = requests.get(decision.request_id)
+        try:
+            _stage_swap_decision(swap_request, slots, claimed)
+        except HTTPException as exc:
+            failures[index] = exc
+        else:
+            decided[index] = (swap_request, decision.accept)
+    
+    accepted = {index: swap_request for index, (swap_request, accept) in decided.items() if accept}
+    if accepted:
+        await _fail_overlapping_accepts(db, accepted, slots, failures)
+    for index in failures:
+        decided.pop(index, None)
+    
+    applied = not (failures and batch.atomic)
+    if not applied:
+        await db.rollback()
+        response.status_code = status.HTTP_400_BAD_REQUEST
+    elif decided:
+        await _write_swap_decisions(db, decided, slots)
+    
+    results = [
+        _decision_result(index, decision, failures.get(index), applied, decided.get(index))
+        for index, decision in enumerate(batch.decisions)
+    ]
+    
+    if applied and decided:
+        await db.commit()
+        await _notify_swap_decisions(decided, slots)
+    
+    return SwapDecisionBatchResponse(applied=applied, results=results)
+
+
+def _decision_result(index, decision: SwapDecision, failure, applied, decided) -> SwapDecisionResult:
+    result = SwapDecisionResult(index=index, request_id=decision.request_id, status_code=status.HTTP_200_OK)
+    if isinstance(failure, EventOverlap):
+        result.status_code, result.detail = status.HTTP_409_CONFLICT, failure.detail
+        result.conflicting_event_ids = failure.event_ids
+    elif failure is not None:
+        result.status_code, result.detail = failure.status_code, failure.detail
+    elif not applied:
+        result.status_code = status.HTTP_424_FAILED_DEPENDENCY
+        result.detail = "Not applied because another decision in the batch failed"
+    else:
+        result.swap_request = SwapRequestResponse.model_validate(decided[0])
+    return result
+
+
+async def _notify_swap_decisions(decided, slots: Dict[int, Event]) -> None:
+    """Publish each decision, then the slot changes in one message per outcome."""
+    accepted_slots, rejected_slots = [], []
+    for swap_request, accept in decided.values():
+        await notify_swap_request("accepted" if accept else "rejected", swap_request)
+        pair = [slots[swap_request.requester_slot_id], slots[swap_request.requested_slot_id]]
+        (accepted_slots if accept else rejected_slots).extend(pair)
+    if accepted_slots:
+        # Accepted slots go from SWAP_PENDING to BUSY and were never listed
+        await notify_slots(
+            "updated", [slot.id for slot in accepted_slots], EventStatus.BUSY,
+            owner_ids={slot.user_id for slot in accepted_slots}, marketplace=False
+        )
+    if rejected_slots:
+        await invalidate_slots([slot.start_time for slot in rejected_slots])
+        await notify_slots(
+            "updated", [slot.id for slot in rejected_slots], EventStatus.SWAPPABLE,
+            owner_ids={slot.user_id for slot in rejected_slots}, marketplace=True
+        )
+
+
+def _detailed_item(req: SwapRequest, requester_name: str, receiver_name: str) -> dict:
+    """The SwapRequestDetailed view of a swap request, from its eager-loaded slots."""
+    item = _encode_swap_request(req)
+    item.update(
+        requester_slot_title=req.requester_slot.title if req.requester_slot else "Unknown",
+        requested_slot_title=req.requested_slot.title if req.requested_slot else "Unknown",
+        requester_name=requester_name,
+        receiver_name=receiver_name,
+    )
+    return item
+
+
 @router.get("/swap-requests/incoming", response_model=List[SwapRequestDetailed])
-def get_incoming_swap_requests(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_incoming_swap_requests(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get all incoming swap requests for the current user.
+    Get the pending swap requests waiting for the current user's answer, oldest first.
+    
+    Pages are ordered by (created_at, id); the next page's cursor comes in
+    the X-Next-Cursor header. Decided requests are listed by /history.
     """
-    requests = db.query(SwapRequest).filter(
+    position = _position(cursor)
+    # Slots and requester are joined into the same query to avoid N+1 lookups
+    query = select(SwapRequest).options(
+        joinedload(SwapRequest.requester_slot),
+        joinedload(SwapRequest.requested_slot),
+        joinedload(SwapRequest.requester)
+    ).where(
         SwapRequest.receiver_id == current_user.id,
         SwapRequest.status == SwapRequestStatus.PENDING
-    ).all()
+    )
+    if position:
+        query = query.where(_after(SwapRequest.created_at, SwapRequest.id, position, descending=False))
+    result = await db.execute(query.order_by(SwapRequest.created_at, SwapRequest.id).limit(limit + 1))
+    requests, headers = _next_page(result.scalars().all(), limit)
     
-    detailed_requests = []
-    for req in requests:
-        requester_slot = db.query(Event).filter(Event.id == req.requester_slot_id).first()
-        requested_slot = db.query(Event).filter(Event.id == req.requested_slot_id).first()
-        requester = db.query(User).filter(User.id == req.requester_id).first()
-        
-        detailed_requests.append(SwapRequestDetailed(
-            id=req.id,
-            requester_slot_id=req.requester_slot_id,
-            requested_slot_id=req.requested_slot_id,
-            requester_id=req.requester_id,
-            receiver_id=req.receiver_id,
-            status=req.status,
-            created_at=req.created_at,
-            updated_at=req.updated_at,
-            requester_slot_title=requester_slot.title if requester_slot else "Unknown",
-            requested_slot_title=requested_slot.title if requested_slot else "Unknown",
-            requester_name=requester.name if requester else "Unknown",
+    return items_response([
+        _detailed_item(
+            req,
+            requester_name=req.requester.name if req.requester else "Unknown",
             receiver_name=current_user.name
-        ))
-    
-    return detailed_requests
+        )
+        for req in requests
+    ], response_format(request), headers)
 
 
 @router.get("/swap-requests/outgoing", response_model=List[SwapRequestDetailed])
-def get_outgoing_swap_requests(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_outgoing_swap_requests(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get all outgoing swap requests for the current user.
+    Get the current user's swap requests that are not archived yet, newest first.
+    
+    Pages are ordered by (created_at, id) descending; the next page's cursor
+    comes in the X-Next-Cursor header.
     """
-    requests = db.query(SwapRequest).filter(
+    position = _position(cursor)
+    # Slots and receiver are joined into the same query to avoid N+1 lookups
+    query = select(SwapRequest).options(
+        joinedload(SwapRequest.requester_slot),
+        joinedload(SwapRequest.requested_slot),
+        joinedload(SwapRequest.receiver)
+    ).where(
         SwapRequest.requester_id == current_user.id
-    ).order_by(SwapRequest.created_at.desc()).all()
+    )
+    if position:
+        query = query.where(_after(SwapRequest.created_at, SwapRequest.id, position))
+    result = await db.execute(
+        query.order_by(SwapRequest.created_at.desc(), SwapRequest.id.desc()).limit(limit + 1)
+    )
+    requests, headers = _next_page(result.scalars().all(), limit)
     
-    detailed_requests = []
-    for req in requests:
-        requester_slot = db.query(Event).filter(Event.id == req.requester_slot_id).first()
-        requested_slot = db.query(Event).filter(Event.id == req.requested_slot_id).first()
-        receiver = db.query(User).filter(User.id == req.receiver_id).first()
-        
-        detailed_requests.append(SwapRequestDetailed(
-            id=req.id,
-            requester_slot_id=req.requester_slot_id,
-            requested_slot_id=req.requested_slot_id,
-            requester_id=req.requester_id,
-            receiver_id=req.receiver_id,
-            status=req.status,
-            created_at=req.created_at,
-            updated_at=req.updated_at,
-            requester_slot_title=requester_slot.title if requester_slot else "Unknown",
-            requested_slot_title=requested_slot.title if requested_slot else "Unknown",
+    return items_response([
+        _detailed_item(
+            req,
             requester_name=current_user.name,
-            receiver_name=receiver.name if receiver else "Unknown"
-        ))
+            receiver_name=req.receiver.name if req.receiver else "Unknown"
+        )
+        for req in requests
+    ], response_format(request), headers)
+
+
+def _history_columns(table, requester_slot_title, requested_slot_title, archived_at):
+    """The SwapRequestHistoryItem columns of `table`, labelled so a UNION ALL can be ordered by name."""
+    columns = [
+        table.c.id, table.c.requester_slot_id, table.c.requested_slot_id, table.c.requester_id,
+        table.c.receiver_id, table.c.status, table.c.created_at, table.c.updated_at,
+        requester_slot_title, requested_slot_title, archived_at,
+    ]
+    names = [
+        "id", "requester_slot_id", "requested_slot_id", "requester_id", "receiver_id", "status",
+        "created_at", "updated_at", "requester_slot_title", "requested_slot_title", "archived_at",
+    ]
+    return [column.label(name) for column, name in zip(columns, names)]
+
+
+def _history_branch(table, role: str, user_id: int, position: Optional[Tuple[datetime, int]]):
+    """
+    One role's finished requests in `table` after `position`, with both
+    users' names. Requests not archived yet take their slot titles from
+    the events and have no archived_at.
+    """
+    requester = User.__table__.alias("requester")
+    receiver = User.__table__.alias("receiver")
+    if table is SwapRequestArchive.__table__:
+        columns = _history_columns(
+            table, table.c.requester_slot_title, table.c.requested_slot_title, table.c.archived_at
+        )
+        query = select(*columns)
+    else:
+        requester_slot = Event.__table__.alias("requester_slot")
+        requested_slot = Event.__table__.alias("requested_slot")
+        columns = _history_columns(
+            table, requester_slot.c.title, requested_slot.c.title,
+            null().cast(SwapRequestArchive.__table__.c.archived_at.type),
+        )
+        query = (
+            select(*columns)
+            .join(requester_slot, requester_slot.c.id == table.c.requester_slot_id)
+            .join(requested_slot, requested_slot.c.id == table.c.requested_slot_id)
+            .where(table.c.status != SwapRequestStatus.PENDING)
+        )
+    role_column = table.c.requester_id if role == "sent" else table.c.receiver_id
+    query = (
+        query.add_columns(requester.c.name.label("requester_name"), receiver.c.name.label("receiver_name"))
+        .join(requester, requester.c.id == table.c.requester_id)
+        .join(receiver, receiver.c.id == table.c.receiver_id)
+        .where(role_column == user_id)
+    )
+    if position:
+        query = query.where(_after(table.c.created_at, table.c.id, position))
+    return query
+
+
+@router.get("/swap-requests/history", response_model=List[SwapRequestHistoryItem])
+async def get_swap_request_history(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    role: Optional[Literal["sent", "received"]] = Query(None, description="Only requests sent or received"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the current user's finished (accepted, rejected or expired) swap
+    requests, newest first.
     
-    return detailed_requests
+    Covers requests decided moments ago as well as those already moved to
+    the archive (which have archived_at set). Pages are ordered by
+    (created_at, id) descending; the next page's cursor comes in the
+    X-Next-Cursor header.
+    """
+    position = _position(cursor)
+    
+    # Each role reads its own index of each table newest first, and the
+    # streams are merged; one extra row tells whether there is a next page.
+    # Archiving moves a row in one transaction, so no request appears twice
+    branches = [
+        _history_branch(table, name, current_user.id, position)
+        for table in (SwapRequest.__table__, SwapRequestArchive.__table__)
+        for name in ("sent", "received") if role in (None, name)
+    ]
+    query = union_all(*branches)
+    columns = query.selected_columns
+    result = await db.execute(
+        query.order_by(columns.created_at.desc(), columns.id.desc()).limit(limit + 1)
+    )
+    rows, headers = _next_page(result.all(), limit)
+    
+    return list_response(request, rows, _encode_history_item, headers=headers)
 
 
 @router.delete("/swap-request/{request_id}", status_code=status.HTTP_204_NO_CONTENT)
-def cancel_swap_request(
+async def cancel_swap_request(
     request_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Cancel a pending swap request (only by requester).
     """
-    swap_request = db.query(SwapRequest).filter(
-        SwapRequest.id == request_id,
-        SwapRequest.requester_id == current_user.id
-    ).first()
+    swap_request = (await lock_rows(db, SwapRequest, [request_id])).get(request_id)
+    
+    if swap_request and swap_request.requester_id != current_user.id:
+        swap_request = None
     
     if not swap_request:
         raise HTTPException(
@@ -285,16 +874,27 @@ def cancel_swap_request(
             detail="Can only cancel pending requests"
         )
     
-    # Get both slots and reset to SWAPPABLE
-    requester_slot = db.query(Event).filter(Event.id == swap_request.requester_slot_id).first()
-    receiver_slot = db.query(Event).filter(Event.id == swap_request.requested_slot_id).first()
+    # Lock both slots and reset to SWAPPABLE
+    slots = await lock_rows(db, Event, [swap_request.requester_slot_id, swap_request.requested_slot_id])
+    requester_slot = slots.get(swap_request.requester_slot_id)
+    receiver_slot = slots.get(swap_request.requested_slot_id)
+    
+    _require_swap_pending(requester_slot, receiver_slot)
     
     if requester_slot:
         requester_slot.status = EventStatus.SWAPPABLE
     if receiver_slot:
         receiver_slot.status = EventStatus.SWAPPABLE
     
-    db.delete(swap_request)
-    db.commit()
+    await db.delete(swap_request)
+    await db.commit()
+    
+    released = [slot for slot in (requester_slot, receiver_slot) if slot]
+    await invalidate_slots([slot.start_time for slot in released])
+    await notify_swap_request("cancelled", swap_request)
+    await notify_slots(
+        "updated", [slot.id for slot in released], EventStatus.SWAPPABLE,
+        owner_ids=[slot.user_id for slot in released], marketplace=True
+    )
     
     return None
\ No newline at end of file
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional, Set
+from sqlalchemy.engine import make_url
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel shared by every worker
+NOTIFY_CHANNEL = "slotswapper_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_BYTES = 7999
+
+
+@dataclass(frozen=True)
+class Message:
+    """A change notification; `user_ids` of None means every subscriber."""
+    type: str
+    data: Dict[str, Any]
+    user_ids: Optional[FrozenSet[int]] = None
+
+    def visible_to(self, user_id: int) -> bool:
+        return self.user_ids is None or user_id in self.user_ids
+
+    def to_json(self) -> str:
+        user_ids = sorted(self.user_ids) if self.user_ids is not None else None
+        return json.dumps({"type": self.type, "data": self.data, "user_ids": user_ids})
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Message":
+        payload = json.loads(raw)
+        user_ids = payload.get("user_ids")
+        return cls(
+            type=payload["type"],
+            data=payload["data"],
+            user_ids=frozenset(user_ids) if user_ids is not None else None,
+        )
+
+
+# Notified in place of a message too large to send even in parts
+RESYNC_MESSAGE = Message(type="resync", data={})
+
+
+def split_for_notify(message: Message, max_bytes: int = MAX_NOTIFY_BYTES) -> List[Message]:
+    """
+    Split a message into parts whose JSON fits in one NOTIFY payload.
+
+    The `ids` list or the recipients, whichever is longer, are halved until
+    every part fits; each part is a complete notification for its ids and
+    users. A part that still does not fit becomes RESYNC_MESSAGE.
+    """
+    if len(message.to_json().encode()) <= max_bytes:
+        return [message]
+    ids = message.data.get("ids")
+    ids = ids if isinstance(ids, list) else []
+    user_ids = sorted(message.user_ids) if message.user_ids is not None else []
+    if len(ids) > 1 and len(ids) >= len(user_ids):
+        half = len(ids) // 2
+        parts = [replace(message, data={**message.data, "ids": part}) for part in (ids[:half], ids[half:])]
+    elif len(user_ids) > 1:
+        half = len(user_ids) // 2
+        parts = [replace(message, user_ids=frozenset(part)) for part in (user_ids[:half], user_ids[half:])]
+    else:
+        return [RESYNC_MESSAGE]
+    return [piece for part in parts for piece in split_for_notify(part, max_bytes)]
+
+
+@dataclass(eq=False)
+class Subscription:
+    """A subscriber's bounded inbox, owned by the event loop that created it."""
+    user_id: int
+    queue: asyncio.Queue
+    loop: asyncio.AbstractEventLoop
+    overflowed: bool = field(default=False)
+
+    def offer(self, message: Message) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A consumer this far behind has to resync from the REST endpoints
+            self.overflowed = True
+
+    def resync(self) -> None:
+        """Make the consumer refetch its state, as if it had fallen behind."""
+        self.overflowed = True
+
+
+class InMemoryBroker:
+    """
+    In-process pub/sub broker.
+
+    Messages fan out to the subscribers of this worker only. Delivery hops
+    onto each subscriber's event loop, so publishing is safe from any loop.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscriptions: Set[Subscription] = set()
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    async def publish(self, message: Message) -> None:
+        self.deliver(message)
+
+    def deliver(self, message: Message) -> None:
+        for subscription in list(self._subscriptions):
+            if subscription.overflowed or not message.visible_to(subscription.user_id):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The subscriber's loop is closed; it will unsubscribe on its own
+                pass
+
+    def resync_subscribers(self) -> None:
+        """Tell every local subscriber to refetch, for when messages may have been lost."""
+        for subscription in list(self._subscriptions):
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.resync)
+            except RuntimeError:
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[Subscription]:
+        subscription = Subscription(
+            user_id=user_id,
+            queue=asyncio.Queue(maxsize=self.queue_size),
+            loop=asyncio.get_running_loop(),
+        )
+        self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscriptions.discard(subscription)
+
+
+class PostgresBroker(InMemoryBroker):
+    """
+    Broker that fans messages out across workers with LISTEN/NOTIFY.
+
+    Each worker holds one listening and one notifying asyncpg connection,
+    however many streams it serves. Published messages only reach local
+    subscribers via the notification, so every worker sees the same order.
+
+    A background task owns the listening connection. When the connection
+    drops (a Postgres restart or failover), or cannot be opened at startup,
+    the task logs it and reconnects with exponential backoff, then re-issues
+    LISTEN. Notifications sent in the meantime are lost, so local
+    subscribers are told to resync once it is back. The notifying
+    connection is reopened by the next publish.
+
+    Messages too large for one NOTIFY payload are sent in parts (see
+    split_for_notify).
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        queue_size: int = 100,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+        health_check_interval: float = 30.0,
+    ):
+        super().__init__(queue_size)
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.health_check_interval = health_check_interval
+        self._listen_conn = None
+        self._notify_conn = None
+        self._notify_lock = asyncio.Lock()
+        self._listener: Optional[asyncio.Task] = None
+
+    async def _connect(self):
+        import asyncpg
+
+        return await asyncpg.connect(self.dsn)
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+        if self._notify_conn is not None:
+            await _close_quietly(self._notify_conn)
+            self._notify_conn = None
+
+    async def _listen(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            lost = asyncio.Event()
+            conn = None
+            try:
+                conn = await self._connect()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+            except Exception:
+                logger.warning("Could not LISTEN on %s, retrying in %.1fs", NOTIFY_CHANNEL, delay, exc_info=True)
+                if conn is not None:
+                    await _close_quietly(conn)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            delay = self.reconnect_delay
+            self._listen_conn = conn
+            # Streams opened before LISTEN (re)started may have missed messages
+            self.resync_subscribers()
+            try:
+                await self._watch(conn, lost)
+            finally:
+                self._listen_conn = None
+                await _close_quietly(conn)
+            logger.warning("Lost the LISTEN connection on %s, reconnecting", NOTIFY_CHANNEL)
+
+    async def _watch(self, conn, lost: asyncio.Event) -> None:
+        """Return once the connection is gone; an idle one is pinged, since a dead peer may never close it."""
+        while not lost.is_set():
+            try:
+                await asyncio.wait_for(lost.wait(), timeout=self.health_check_interval)
+            except asyncio.TimeoutError:
+                try:
+                    await asyncio.wait_for(conn.execute("SELECT 1"), timeout=self.health_check_interval)
+                except Exception:
+                    return
+
+    async def publish(self, message: Message) -> None:
+        async with self._notify_lock:
+            if self._notify_conn is None or self._notify_conn.is_closed():
+                self._notify_conn = await self._connect()
+            for part in split_for_notify(message):
+                await self._notify_conn.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, part.to_json())
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            message = Message.from_json(payload)
+        except (ValueError, KeyError):
+            logger.warning("Ignoring malformed notification on %s", channel)
+            return
+        if message == RESYNC_MESSAGE:
+            self.resync_subscribers()
+        else:
+            self.deliver(message)
+
+
+async def _close_quietly(conn) -> None:
+    with suppress(Exception):
+        await conn.close()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """The process's broker, chosen by BROKER_BACKEND on first use."""
+    if settings.BROKER_BACKEND == "postgres":
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+        return PostgresBroker(dsn.render_as_string(hide_password=False), settings.STREAM_QUEUE_SIZE)
+    return InMemoryBroker(settings.STREAM_QUEUE_SIZE)
+
+
+def __getattr__(name: str):
+    # `broker` is built on first use, so importing reads no settings
+    if name == "broker":
+        return get_broker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def publish(type: str, data: Dict[str, Any], user_ids=None) -> None:
+    """Publish a change notification; pass user_ids to limit who receives it."""
+    message = Message(
+        type=type,
+        data=data,
+        user_ids=frozenset(user_ids) if user_ids is not None else None,
+    )
+    try:
+        await get_broker().publish(message)
+    except Exception:
+        # Notifications are best effort; the write they describe is committed
+        logger.exception("Failed to publish %s", type)
@@ -1,5 +1,6 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal, cast
 import os
 
 
@@ -11,11 +12,83 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    # Use the async driver (asyncpg/aiosqlite); False runs the sync driver in the threadpool
+    DB_ASYNC: bool = True
+    # Connection pools (ignored for SQLite). Without pre-ping, connections
+    # are replaced after DB_POOL_RECYCLE_SECONDS instead of tested on checkout
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    # Behind PgBouncer in transaction mode: no local pool, no prepared statements
+    DB_PGBOUNCER: bool = False
+    # Connections each pool opens at startup, before the first request
+    DB_POOL_WARMUP_CONNECTIONS: int = 2
+    # Create missing tables at startup (development only; deploy with Alembic)
+    DB_CREATE_SCHEMA: bool = False
+    # /health/ready gives up on a database that takes longer to answer
+    DB_READY_TIMEOUT_SECONDS: float = 2.0
+    # Read replicas (JSON list of URLs): GET/HEAD requests read from one of
+    # them, unless the client wrote within REPLICA_MAX_LAG_SECONDS
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    # Row locks taken by swap transitions: "wait", "nowait" or "skip_locked"
+    ROW_LOCK_MODE: Literal["wait", "nowait", "skip_locked"] = "wait"
     
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
+    # Verified token -> principal cache used by get_current_user (0 disables)
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    # Argon2 runs on its own bounded pool; excess logins get 503 + Retry-After
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+    
+    # Change stream (/api/stream): "memory" is per worker, "postgres" uses LISTEN/NOTIFY
+    BROKER_BACKEND: Literal["memory", "postgres"] = "memory"
+    STREAM_QUEUE_SIZE: int = 100
+    STREAM_KEEPALIVE_SECONDS: float = 15.0
+    
+    # /swappable-slots window cache: "memory" is per worker, "redis" is shared
+    SLOT_CACHE_BACKEND: Literal["none", "memory", "redis"] = "memory"
+    SLOT_CACHE_TTL_SECONDS: int = 10
+    SLOT_CACHE_MAX_WINDOWS: int = 256
+    # Windows holding more slots than this are served from the database
+    SLOT_CACHE_MAX_SLOTS: int = 5000
+    REDIS_URL: str = "redis://localhost:6379/0"
+    
+    # Pending swap requests older than this are expired (0 disables), checked
+    # every interval by each worker in batches of at most SWAP_EXPIRY_BATCH_SIZE
+    SWAP_REQUEST_TTL_HOURS: float = 72.0
+    SWAP_EXPIRY_INTERVAL_SECONDS: float = 60.0
+    SWAP_EXPIRY_BATCH_SIZE: int = 500
+    
+    # Finished swap requests move to swap_requests_archive once they have not
+    # changed for SWAP_ARCHIVE_AFTER_HOURS (0 disables), in batches per transaction
+    SWAP_ARCHIVE_AFTER_HOURS: float = 24.0
+    SWAP_ARCHIVE_INTERVAL_SECONDS: float = 300.0
+    SWAP_ARCHIVE_BATCH_SIZE: int = 1000
+    
+    # Multi-party swaps: longest cycle proposed, and search effort per slot
+    SWAP_CYCLE_MAX_LENGTH: int = 4
+    SWAP_CYCLE_MAX_EXPANSIONS: int = 10000
+    # Open intents are matched into cycles by a background job (0 disables)
+    SWAP_CYCLE_MATCH_INTERVAL_SECONDS: float = 60.0
+    # Proposed cycles not accepted by everyone within this expire (0 disables);
+    # run by the swap request expiry job
+    SWAP_CYCLE_TTL_HOURS: float = 72.0
+    
+    # Calendar (.ics) import: events accepted per upload
+    CALENDAR_IMPORT_MAX_EVENTS: int = 5000
+    
+    # Prometheus metrics on /metrics: per-route latency and DB usage
+    METRICS_ENABLED: bool = True
+    # Development only: X-Query-Count / X-Query-Duplicates headers on every response
+    QUERY_DEBUG_HEADERS: bool = False
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000"]
@@ -29,4 +102,24 @@ class Settings(BaseSettings):
         case_sensitive = True
 
 
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The process settings, read from the environment and .env on first use."""
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Stands in for the Settings instance until a setting is first read, so
+    importing this module (and everything importing `settings`) does not
+    read the environment or fail when it is incomplete.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_settings(), name, value)
+
+
+settings = cast(Settings, _LazySettings())
\ No newline at end of file
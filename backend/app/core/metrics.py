@@ -0,0 +1,310 @@
+"""
+Prometheus metrics: per-route latency histograms and per-request DB usage.
+
+Recording is lock-free: every thread writes to its own shard of each
+metric (the event loop, the threadpool and driver threads never contend),
+and shards are only merged when /metrics is scraped. A request allocates
+one small RequestMetrics context; series lists are created once per label
+set and thread.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Label value for requests that matched no route, so scanners cannot blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class _Metric:
+    """Per-thread shards of label values -> list of numbers, merged on collect."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[tuple, list]] = []
+        self._shards_lock = threading.Lock()
+
+    def _series(self, labels: tuple) -> list:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0] * self._width
+        return values
+
+    def _merged(self) -> Dict[tuple, list]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[tuple, list] = {}
+        for shard in shards:
+            # list() copies in one step under the GIL, so a concurrent insert is safe
+            for labels, values in list(shard.items()):
+                total = merged.setdefault(labels, [0] * self._width)
+                for i, value in enumerate(values):
+                    total[i] += value
+        return merged
+
+    def clear(self) -> None:
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, values in sorted(self._merged().items()):
+            lines.extend(self._sample_lines(labels, values))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _width = 1
+
+    def inc(self, amount: float = 1, labels: tuple = ()) -> None:
+        self._series(labels)[0] += amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._merged().get(labels, [0])[0]
+
+    def _sample_lines(self, labels: tuple, values: list) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(values[0])}"]
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram. Each series stores one count per bucket (plus
+    +Inf), the sum and the count; buckets are made cumulative on collect.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._width = len(self.buckets) + 3
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        values = self._series(labels)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def count(self, labels: tuple = ()) -> int:
+        return self._merged().get(labels, [0] * self._width)[-1]
+
+    def _sample_lines(self, labels: tuple, values: list) -> List[str]:
+        names = self.labelnames + ("le",)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), values):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_number(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(values[-2])}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {values[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def clear(self) -> None:
+        for metric in self.metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        """The Prometheus text exposition of every registered metric."""
+        return "\n".join(line for metric in self.metrics for line in metric.collect()) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LABELS = ("method", "route")
+
+http_request_duration = registry.histogram(
+    "slotswapper_http_request_duration_seconds",
+    "Time from receiving a request until its response was sent.",
+    REQUEST_LABELS + ("status",),
+)
+request_db_queries = registry.histogram(
+    "slotswapper_http_request_db_queries",
+    "SQL statements executed while handling a request.",
+    REQUEST_LABELS,
+    QUERY_COUNT_BUCKETS,
+)
+request_db_time = registry.histogram(
+    "slotswapper_http_request_db_seconds",
+    "Time spent executing SQL while handling a request.",
+    REQUEST_LABELS,
+    DB_TIME_BUCKETS,
+)
+request_pool_wait = registry.histogram(
+    "slotswapper_http_request_pool_wait_seconds",
+    "Time spent waiting for pooled connections while handling a request.",
+    REQUEST_LABELS,
+    POOL_WAIT_BUCKETS,
+)
+db_queries = registry.counter("slotswapper_db_queries_total", "SQL statements executed.")
+db_query_time = registry.counter("slotswapper_db_query_seconds_total", "Time spent executing SQL.")
+pool_checkouts = registry.counter("slotswapper_db_pool_checkouts_total", "Connections checked out of the pool.")
+pool_wait_time = registry.counter("slotswapper_db_pool_wait_seconds_total", "Time spent waiting for pooled connections.")
+
+
+class RequestMetrics:
+    """DB usage of the request being handled, filled in by the engine hooks."""
+    __slots__ = ("queries", "db_seconds", "pool_wait_seconds", "status")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.status = 500
+
+
+# Task-local, so concurrent requests on one loop never mix their numbers; the
+# threadpool and SQLAlchemy's greenlets run with the caller's context
+_current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    return _current_request.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # A connection runs one statement at a time, so one slot is enough
+    conn.info["metrics_query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("metrics_query_started", time.perf_counter())
+    db_queries.inc()
+    db_query_time.inc(elapsed)
+    request = _current_request.get()
+    if request is not None:
+        request.queries += 1
+        request.db_seconds += elapsed
+
+
+def _record_pool_wait(elapsed: float) -> None:
+    pool_checkouts.inc()
+    pool_wait_time.inc(elapsed)
+    request = _current_request.get()
+    if request is not None:
+        request.pool_wait_seconds += elapsed
+
+
+_timed_pool_classes: Dict[type, type] = {}
+
+
+def _timed_pool_class(pool_class: type) -> type:
+    """Subclass of a pool class that times Pool.connect()."""
+    timed = _timed_pool_classes.get(pool_class)
+    if timed is None:
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                return pool_class.connect(self)
+            finally:
+                _record_pool_wait(time.perf_counter() - started)
+
+        timed = _timed_pool_classes[pool_class] = type(f"Timed{pool_class.__name__}", (pool_class,), {"connect": connect})
+    return timed
+
+
+def instrument_engine(engine) -> None:
+    """
+    Record statement counts, SQL time and pool checkout waits of an engine.
+
+    Accepts sync and async engines. SQLAlchemy has no event before a
+    checkout starts waiting, so the pool's class is swapped for a subclass
+    timing connect(); Pool.recreate() on dispose keeps the subclass.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    pool = sync_engine.pool
+    pool.__class__ = _timed_pool_class(type(pool))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording each HTTP request under its route template
+    (e.g. /api/events/{event_id}), method and status code.
+
+    Pure ASGI rather than BaseHTTPMiddleware, so streaming responses pass
+    through untouched. Streams are recorded once they end.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics()
+        token = _current_request.set(request)
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                request.status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            # FastAPI's router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            labels: Tuple[str, str] = (scope["method"], getattr(route, "path_format", None) or UNMATCHED_ROUTE)
+            http_request_duration.observe(elapsed, labels + (str(request.status),))
+            request_db_queries.observe(request.queries, labels)
+            request_db_time.observe(request.db_seconds, labels)
+            request_pool_wait.observe(request.pool_wait_seconds, labels)
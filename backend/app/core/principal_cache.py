@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Lightweight, session-independent view of an authenticated user."""
+    id: int
+    name: str
+    email: str
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, name=user.name, email=user.email, created_at=user.created_at)
+
+
+class PrincipalCache:
+    """
+    Bounded LRU cache of verified token -> Principal with a TTL.
+
+    Entries never outlive the token's own expiry. A user's entries are
+    dropped once a transaction that updates or deletes their row commits in
+    this process; other workers pick the change up once the TTL runs out.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def set(self, token: str, principal: Principal, token_expires_at: Optional[float] = None) -> None:
+        """Cache a principal; token_expires_at is the token's exp claim (epoch seconds)."""
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (principal, time.monotonic() + ttl)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, token: str) -> None:
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.id]
+
+
+@lru_cache(maxsize=None)
+def get_principal_cache() -> PrincipalCache:
+    """The process's principal cache, sized from the settings on first use."""
+    return PrincipalCache(
+        max_size=settings.AUTH_CACHE_MAX_SIZE,
+        ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    )
+
+
+def __getattr__(name: str):
+    # `principal_cache` is built on first use, so importing reads no settings
+    if name == "principal_cache":
+        return get_principal_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_CHANGED_USERS = "principal_cache.changed_user_ids"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    # Evicting here would let a concurrent request refill the cache from the
+    # still-committed row, so only note the users until the commit lands
+    changed = session.info.setdefault(_CHANGED_USERS, set())
+    changed.update(obj.id for obj in session.deleted if isinstance(obj, User))
+    changed.update(
+        obj.id for obj in session.dirty
+        if isinstance(obj, User) and session.is_modified(obj, include_collections=False)
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_cached_principals(session):
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        get_principal_cache().invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop(_CHANGED_USERS, None)
@@ -0,0 +1,153 @@
+"""
+Statement counting for tests and development.
+
+`QueryBudget` counts the statements an engine executes inside a block and
+fails when the block goes over its budget, listing the statements that
+ran more than once (the usual sign of an N+1 loop). `QueryDebugMiddleware`
+reports the same numbers per request in response headers.
+"""
+import re
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import event
+
+COUNT_HEADER = "X-Query-Count"
+DUPLICATES_HEADER = "X-Query-Duplicates"
+# Statements quoted in the duplicates header are cut to keep headers small
+HEADER_STATEMENT_CHARS = 120
+HEADER_MAX_STATEMENTS = 5
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def duplicated_statements(statements: Iterable[str]) -> Dict[str, int]:
+    """Statements executed more than once, with their counts, most repeated first."""
+    counts = Counter(statements)
+    return {statement: count for statement, count in counts.most_common() if count > 1}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block executed more statements than its budget allows."""
+
+
+class QueryBudget:
+    """
+    Count the statements executed on some engines while the block runs.
+
+    Listens on the engines rather than the caller's context, so statements
+    issued from other threads (the TestClient's event loop, the threadpool)
+    are counted too. An executemany counts as one statement. Pass
+    `max_statements=None` to only count.
+
+        with QueryBudget(engine, max_statements=3):
+            client.get("/api/events")
+    """
+
+    def __init__(self, *engines, max_statements: Optional[int] = None, label: str = "block"):
+        self.engines = [getattr(engine, "sync_engine", engine) for engine in engines]
+        self.max_statements = max_statements
+        self.label = label
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def duplicates(self) -> Dict[str, int]:
+        return duplicated_statements(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(normalize_statement(statement))
+
+    def __enter__(self) -> "QueryBudget":
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._record)
+        if exc_type is None:
+            self.check()
+
+    def check(self) -> None:
+        if self.max_statements is None or self.count <= self.max_statements:
+            return
+        lines = [f"{self.label} executed {self.count} statements, budget is {self.max_statements}:"]
+        lines.extend(f"  {statement}" for statement in self.statements)
+        duplicates = self.duplicates()
+        if duplicates:
+            lines.append("Repeated statements:")
+            lines.extend(f"  {count}x {statement}" for statement, count in duplicates.items())
+        raise QueryBudgetExceeded("\n".join(lines))
+
+
+# Statements of the request being handled, while QueryDebugMiddleware is on
+_request_statements: ContextVar[Optional[List[str]]] = ContextVar("request_statements", default=None)
+
+
+def _record_request_statement(conn, cursor, statement, parameters, context, executemany):
+    statements = _request_statements.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+def track_request_statements(engine) -> None:
+    """Let QueryDebugMiddleware see the statements of an engine (sync or async)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _record_request_statement):
+        event.listen(sync_engine, "before_cursor_execute", _record_request_statement)
+
+
+def _header_value(statement: str) -> str:
+    statement = normalize_statement(statement)
+    if len(statement) > HEADER_STATEMENT_CHARS:
+        statement = statement[:HEADER_STATEMENT_CHARS - 3] + "..."
+    # Header values must be latin-1 and cannot contain the separator
+    return statement.replace("|", "/").encode("latin-1", "replace").decode("latin-1")
+
+
+class QueryDebugMiddleware:
+    """
+    Development-only ASGI middleware adding the request's statement count
+    (X-Query-Count) and its repeated statements (X-Query-Duplicates, as
+    "3x SELECT ... | 2x SELECT ...") to every response.
+
+    Statements run after the response has started (while streaming, or in
+    dependency teardown) are not included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        statements: List[str] = []
+        token = _request_statements.set(statements)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((COUNT_HEADER.lower().encode(), str(len(statements)).encode()))
+                duplicates = duplicated_statements(normalize_statement(s) for s in statements)
+                if duplicates:
+                    value = " | ".join(
+                        f"{count}x {_header_value(statement)}"
+                        for statement, count in list(duplicates.items())[:HEADER_MAX_STATEMENTS]
+                    )
+                    headers.append((DUPLICATES_HEADER.lower().encode(), value.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _request_statements.reset(token)
@@ -0,0 +1,79 @@
+"""
+Read-your-writes routing between the primary and its read replicas.
+
+Requests with a safe method (GET, HEAD) may read from a replica; anything
+else runs on the primary. Every unsafe request answers with a consistency
+token, the time its response started, both as the X-Consistency-Token
+header and as a short-lived cookie. A client presenting a token younger than
+REPLICA_MAX_LAG_SECONDS reads from the primary, so it sees its own writes
+even while the replicas are catching up.
+
+The token is a timestamp rather than a WAL position so that the same rule
+holds for any database, at the price of trusting the configured lag bound.
+"""
+import math
+import time
+from contextvars import ContextVar
+from typing import Optional
+from starlette.requests import HTTPConnection
+
+HEADER = "X-Consistency-Token"
+COOKIE = "consistency_token"
+SAFE_METHODS = frozenset({"GET", "HEAD"})
+
+# Whether the request being handled may read from a replica
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+def replica_reads_allowed() -> bool:
+    """Whether sessions opened for the current request may read from a replica."""
+    return _replica_reads.get()
+
+
+def _parse_token(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    ASGI middleware deciding per request whether reads may go to a replica,
+    and handing out consistency tokens after writes.
+    """
+
+    def __init__(self, app, max_lag: float):
+        self.app = app
+        self.max_lag = max_lag
+
+    def _pinned(self, scope) -> bool:
+        connection = HTTPConnection(scope)
+        written_at = _parse_token(connection.headers.get(HEADER) or connection.cookies.get(COOKIE))
+        # Tokens from the future are ignored rather than pinning forever
+        return written_at is not None and 0 <= time.time() - written_at < self.max_lag
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in SAFE_METHODS:
+            token = _replica_reads.set(not self._pinned(scope))
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _replica_reads.reset(token)
+            return
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start":
+                value = f"{time.time():.3f}"
+                cookie = f"{COOKIE}={value}; Max-Age={math.ceil(self.max_lag)}; Path=/; HttpOnly; SameSite=Lax"
+                headers = list(message.get("headers", []))
+                headers.append((HEADER.lower().encode(), value.encode()))
+                headers.append((b"set-cookie", cookie.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_token)
@@ -1,5 +1,9 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, TypeVar, Union
 from jose import JWTError, jwt
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
@@ -23,6 +27,95 @@ def get_password_hash(password: str) -> str:
     return ph.hash(password)
 
 
+T = TypeVar("T")
+
+
+class HashingQueueFull(Exception):
+    """Raised when the password hashing executor cannot accept more work."""
+
+
+class HashingExecutor:
+    """
+    Dedicated, bounded thread pool for Argon2 work.
+
+    argon2-cffi releases the GIL while hashing, so a small thread pool keeps
+    auth bursts off the shared request threadpool. Submissions beyond
+    `workers + max_queue` in flight are rejected instead of queued.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingQueueFull()
+            self.pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hash",
+                )
+            try:
+                future = self._executor.submit(fn, *args)
+            except RuntimeError:
+                self.pending -= 1
+                raise
+        # A cancelled caller leaves the hash running, so the slot is only
+        # freed once the thread is done with it
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=None)
+def get_hashing_executor() -> HashingExecutor:
+    """The process's password hashing executor, sized from the settings on first use."""
+    return HashingExecutor(
+        workers=settings.PASSWORD_HASH_WORKERS,
+        max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    )
+
+
+def __getattr__(name: str):
+    # `hashing_executor` is built on first use, so importing reads no settings
+    if name == "hashing_executor":
+        return get_hashing_executor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing executor; raises HashingQueueFull when saturated."""
+    return await get_hashing_executor().run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing executor; raises HashingQueueFull when saturated."""
+    return await get_hashing_executor().run(get_password_hash, password)
+
+
 def create_access_token(
     subject: Union[str, int], 
     expires_delta: Optional[timedelta] = None
@@ -49,14 +142,21 @@ def create_access_token(
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[str]:
-    """Decode and verify a JWT token."""
+def decode_access_token_claims(token: str) -> Optional[Dict[str, Any]]:
+    """Decode and verify a JWT token, returning all of its claims."""
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token, 
             settings.SECRET_KEY, 
             algorithms=[settings.ALGORITHM]
         )
-        return payload.get("sub")
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+
+def decode_access_token(token: str) -> Optional[str]:
+    """Decode and verify a JWT token."""
+    payload = decode_access_token_claims(token)
+    if payload is None:
+        return None
+    return payload.get("sub")
\ No newline at end of file
@@ -0,0 +1,312 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Invalidations of more start times than this drop every window instead of
+# testing each window against each time
+INVALIDATE_ALL_THRESHOLD = 1000
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass(frozen=True)
+class SlotWindow:
+    """The filters of a /swappable-slots query that select which slots are listed."""
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    min_duration: Optional[int] = None
+
+    @property
+    def key(self) -> str:
+        return "|".join("" if part is None else str(part) for part in (
+            self.start.isoformat() if self.start else None,
+            self.end.isoformat() if self.end else None,
+            self.min_duration,
+        ))
+
+    @classmethod
+    def from_key(cls, key: str) -> "SlotWindow":
+        start, end, min_duration = key.split("|")
+        return cls(
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None,
+            min_duration=int(min_duration) if min_duration else None,
+        )
+
+    @classmethod
+    def of(cls, start: Optional[datetime], end: Optional[datetime], min_duration: Optional[int]) -> "SlotWindow":
+        """Build a window from query parameters, normalizing aware times to naive UTC like the stored ones."""
+        return cls(start=_naive_utc(start), end=_naive_utc(end), min_duration=min_duration)
+
+    def contains(self, start_time: datetime) -> bool:
+        return (self.start is None or start_time >= self.start) and (self.end is None or start_time < self.end)
+
+
+@dataclass(frozen=True)
+class CachedSlot:
+    """One listed slot: its sort key, owner and version, and its serialized JSON."""
+    start_time: datetime
+    id: int
+    user_id: int
+    version: int
+    json: str
+
+    def to_list(self) -> list:
+        return [self.start_time.isoformat(), self.id, self.user_id, self.version, self.json]
+
+    @classmethod
+    def from_list(cls, values: list) -> "CachedSlot":
+        start_time, slot_id, user_id, version, raw = values
+        return cls(datetime.fromisoformat(start_time), slot_id, user_id, version, raw)
+
+
+@dataclass(frozen=True)
+class CachedWindow:
+    """
+    All slots of a window ordered by (start_time, id), for every owner.
+
+    `slots` is None when the window held too many slots to cache; readers
+    then go to the database without retrying the fill on every request.
+    """
+    slots: Optional[Tuple[CachedSlot, ...]]
+
+
+class MemorySlotCache:
+    """
+    Per-process cache of /swappable-slots windows.
+
+    Bounded LRU with a TTL. Invalidation drops exactly the windows that
+    contain a changed slot's start time. Other workers only see a change
+    once their entry expires; run several workers with the redis backend.
+    """
+
+    def __init__(self, max_windows: int, ttl_seconds: int):
+        self.enabled = max_windows > 0 and ttl_seconds > 0
+        self.max_windows = max_windows
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[SlotWindow, Tuple[CachedWindow, float]]" = OrderedDict()
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, window: SlotWindow) -> Optional[CachedWindow]:
+        with self._lock:
+            entry = self._entries.get(window)
+            if entry is None or entry[1] <= time.monotonic():
+                self._entries.pop(window, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(window)
+            self.hits += 1
+            return entry[0]
+
+    async def epoch(self) -> int:
+        return self._epoch
+
+    async def store(self, window: SlotWindow, cached: CachedWindow, epoch: int) -> bool:
+        """Store a window loaded at `epoch`, unless an invalidation happened since."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if epoch != self._epoch:
+                return False
+            self._entries[window] = (cached, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(window)
+            while len(self._entries) > self.max_windows:
+                self._entries.popitem(last=False)
+            return True
+
+    async def invalidate(self, start_times: Iterable[datetime]) -> None:
+        start_times = list(start_times)
+        with self._lock:
+            self._epoch += 1
+            for window in [w for w in self._entries if any(w.contains(t) for t in start_times)]:
+                del self._entries[window]
+                self.invalidations += 1
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "windows": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+class RedisSlotCache:
+    """
+    /swappable-slots cache shared by all workers through Redis.
+
+    Each window is one string key with a TTL; a set indexes the cached
+    windows so invalidation can find the ones containing a changed slot.
+    Works with any client exposing the redis.asyncio command methods used
+    here (get, set, incr, delete, expire, sadd, srem, smembers).
+    """
+
+    def __init__(self, client, ttl_seconds: int, prefix: str = "slotswapper:slots"):
+        self.enabled = ttl_seconds > 0
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_url(cls, url: str, ttl_seconds: int) -> "RedisSlotCache":
+        import redis.asyncio
+
+        return cls(redis.asyncio.Redis.from_url(url), ttl_seconds)
+
+    def _window_key(self, window: SlotWindow) -> str:
+        return f"{self.prefix}:window:{window.key}"
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self.prefix}:windows"
+
+    @property
+    def _epoch_key(self) -> str:
+        return f"{self.prefix}:epoch"
+
+    async def get(self, window: SlotWindow) -> Optional[CachedWindow]:
+        raw = await self.client.get(self._window_key(window))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        payload = json.loads(raw)
+        if payload is None:
+            return CachedWindow(slots=None)
+        return CachedWindow(slots=tuple(CachedSlot.from_list(values) for values in payload))
+
+    async def epoch(self) -> int:
+        return int(await self.client.get(self._epoch_key) or 0)
+
+    async def store(self, window: SlotWindow, cached: CachedWindow, epoch: int) -> bool:
+        # Check-then-set: an invalidation landing between the two is only
+        # bounded by the TTL, which keeps the client API to plain commands
+        if not self.enabled or await self.epoch() != epoch:
+            return False
+        payload = None if cached.slots is None else [slot.to_list() for slot in cached.slots]
+        await self.client.set(self._window_key(window), json.dumps(payload), ex=self.ttl_seconds)
+        await self.client.sadd(self._index_key, window.key)
+        # Members outlive their windows; the index goes once nothing was stored for a TTL
+        await self.client.expire(self._index_key, self.ttl_seconds)
+        return True
+
+    async def invalidate(self, start_times: Iterable[datetime]) -> None:
+        start_times = list(start_times)
+        await self.client.incr(self._epoch_key)
+        for raw in await self.client.smembers(self._index_key):
+            key = raw.decode() if isinstance(raw, bytes) else raw
+            if any(SlotWindow.from_key(key).contains(t) for t in start_times):
+                await self.client.delete(self._window_key(SlotWindow.from_key(key)))
+                await self.client.srem(self._index_key, key)
+                self.invalidations += 1
+
+    async def clear(self) -> None:
+        await self.client.incr(self._epoch_key)
+        for raw in await self.client.smembers(self._index_key):
+            key = raw.decode() if isinstance(raw, bytes) else raw
+            await self.client.delete(self._window_key(SlotWindow.from_key(key)))
+        await self.client.delete(self._index_key)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+class NullSlotCache:
+    """Cache backend that never stores anything (SLOT_CACHE_BACKEND=none)."""
+
+    enabled = False
+
+    async def get(self, window: SlotWindow) -> Optional[CachedWindow]:
+        return None
+
+    async def epoch(self) -> int:
+        return 0
+
+    async def store(self, window: SlotWindow, cached: CachedWindow, epoch: int) -> bool:
+        return False
+
+    async def invalidate(self, start_times: Iterable[datetime]) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "none"}
+
+
+@lru_cache(maxsize=None)
+def get_slot_cache():
+    """The process's window cache, chosen by SLOT_CACHE_BACKEND on first use."""
+    if settings.SLOT_CACHE_BACKEND == "redis":
+        return RedisSlotCache.from_url(settings.REDIS_URL, settings.SLOT_CACHE_TTL_SECONDS)
+    if settings.SLOT_CACHE_BACKEND == "memory":
+        return MemorySlotCache(settings.SLOT_CACHE_MAX_WINDOWS, settings.SLOT_CACHE_TTL_SECONDS)
+    return NullSlotCache()
+
+
+def __getattr__(name: str):
+    # `slot_cache` is built on first use, so importing reads no settings
+    if name == "slot_cache":
+        return get_slot_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def invalidate_slots(start_times: Iterable[Optional[datetime]]) -> None:
+    """
+    Drop cached windows listing slots that start at any of `start_times`.
+
+    Call after commit whenever a slot enters, leaves or changes while in the
+    marketplace. Pass both the old and new start time of a moved slot.
+    """
+    start_times: List[datetime] = [t for t in start_times if t is not None]
+    if not start_times:
+        return
+    try:
+        if len(start_times) > INVALIDATE_ALL_THRESHOLD:
+            await get_slot_cache().clear()
+        else:
+            await get_slot_cache().invalidate(start_times)
+    except Exception:
+        # The TTL bounds how long a failed invalidation can serve stale slots
+        logger.exception("Failed to invalidate the swappable slot cache")
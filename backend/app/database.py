@@ -1,24 +1,393 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.query_budget import track_request_statements
+from app.core.replicas import replica_reads_allowed
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-)
+# Async drivers used for each sync URL scheme
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Translate a sync DATABASE_URL into the equivalent async driver URL."""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def _prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def pool_options(url: str, async_driver: bool = False) -> dict:
+    """Connection pool arguments for a database URL (SQLite picks its own pool)."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    if settings.DB_PGBOUNCER:
+        # PgBouncer in transaction mode does the pooling, and consecutive
+        # transactions may run on different server connections, so asyncpg
+        # must neither cache prepared statements nor reuse their names
+        options = {"poolclass": NullPool}
+        if async_driver:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _prepared_statement_name,
+            }
+        return options
+    return {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+
+
+class RoutingSession(Session):
+    """
+    Session reading from a replica until its first write.
+
+    `info["replica"]` names the replica engine, if any. Plain SELECTs go
+    there; flushes, DML, locking reads and anything else go to the primary,
+    and once one has, so does every later read of the session, so a
+    transaction always sees its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = self.info.get("replica")
+        if replica is not None:
+            if not self._flushing and _is_plain_read(clause):
+                return replica
+            self.info["replica"] = None
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def use_primary(session) -> None:
+    """Send the rest of a request session's reads to the primary (AsyncSession or ThreadedSession)."""
+    session.sync_session.info["replica"] = None
+
+
+def _is_plain_read(clause) -> bool:
+    return (
+        clause is not None
+        and getattr(clause, "is_select", False)
+        and getattr(clause, "_for_update_arg", None) is None
+    )
+
+
+def _instrument(engine) -> None:
+    if settings.METRICS_ENABLED:
+        instrument_engine(engine)
+    if settings.QUERY_DEBUG_HEADERS:
+        track_request_statements(engine)
+
+
+def replica_session_info(replicas: Sequence[Engine]) -> dict:
+    """Session info sending the current request's reads to a random replica, when it may use one."""
+    if replicas and replica_reads_allowed():
+        return {"replica": random.choice(replicas)}
+    return {}
+
+
+class SyncEngines(NamedTuple):
+    engine: Engine
+    replicas: List[Engine]
+    session_factory: sessionmaker
+
+
+class AsyncEngines(NamedTuple):
+    engine: Optional[AsyncEngine]
+    replicas: List[AsyncEngine]
+    session_factory: Optional[async_sessionmaker]
+
+
+# Engines are built on first use rather than at import, so importing the app
+# (workers, tests, Alembic, tooling) neither loads a driver nor needs a database
+@lru_cache(maxsize=None)
+def sync_engines() -> SyncEngines:
+    """The sync driver's primary and replica engines, and its session factory."""
+    primary = create_engine(settings.DATABASE_URL, **pool_options(settings.DATABASE_URL))
+    replicas = [create_engine(url, **pool_options(url)) for url in settings.DATABASE_REPLICA_URLS]
+    for engine in [primary, *replicas]:
+        _instrument(engine)
+    factory = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=primary)
+    return SyncEngines(primary, replicas, factory)
+
+
+@lru_cache(maxsize=None)
+def async_engines() -> AsyncEngines:
+    """The async driver's primary and replica engines and session factory (all None without DB_ASYNC)."""
+    if not settings.DB_ASYNC:
+        return AsyncEngines(None, [], None)
+    primary = create_async_engine(
+        async_database_url(settings.DATABASE_URL),
+        **pool_options(settings.DATABASE_URL, async_driver=True),
+    )
+    replicas = [
+        create_async_engine(async_database_url(url), **pool_options(url, async_driver=True))
+        for url in settings.DATABASE_REPLICA_URLS
+    ]
+    for engine in [primary, *replicas]:
+        _instrument(engine)
+    factory = async_sessionmaker(
+        primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    return AsyncEngines(primary, replicas, factory)
+
+
+# Module attributes kept for callers that import them by name
+_LAZY_ATTRIBUTES = {
+    "engine": lambda: sync_engines().engine,
+    "replica_engines": lambda: sync_engines().replicas,
+    "SessionLocal": lambda: sync_engines().session_factory,
+    "async_engine": lambda: async_engines().engine,
+    "async_replica_engines": lambda: async_engines().replicas,
+    "AsyncSessionLocal": lambda: async_engines().session_factory,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
-def get_db():
+async def dispose_engines() -> None:
+    """Close the pools of every engine built so far; later use builds fresh ones."""
+    if async_engines.cache_info().currsize:
+        built = async_engines()
+        for engine in [built.engine, *built.replicas]:
+            if engine is not None:
+                await engine.dispose()
+        async_engines.cache_clear()
+    if sync_engines.cache_info().currsize:
+        built = sync_engines()
+        for engine in [built.engine, *built.replicas]:
+            engine.dispose()
+        sync_engines.cache_clear()
+
+
+def engines_in_use() -> Dict[str, object]:
+    """The engines serving requests, by name: the primary, then replica_1, replica_2..."""
+    if settings.DB_ASYNC:
+        primary, replicas, _ = async_engines()
+    else:
+        primary, replicas, _ = sync_engines()
+    engines = {"primary": primary}
+    engines.update((f"replica_{number}", replica) for number, replica in enumerate(replicas, start=1))
+    return engines
+
+
+async def create_schema() -> None:
+    """Create missing tables on the primary; deployments run `alembic upgrade head` instead."""
+    if settings.DB_ASYNC:
+        async with async_engines().engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        await run_in_threadpool(Base.metadata.create_all, sync_engines().engine)
+
+
+def _open_and_close(engine: Engine, count: int) -> None:
+    connections = [engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.close()
+
+
+async def prime_pools(connections: int) -> None:
+    """
+    Open up to `connections` connections per pooled engine and return them
+    to the pool, so the first requests do not pay for connecting.
+    """
+    for engine in engines_in_use().values():
+        pool = getattr(engine, "sync_engine", engine).pool
+        if not isinstance(pool, QueuePool):
+            continue
+        count = min(connections, pool.size())
+        if isinstance(engine, AsyncEngine):
+            opened = await asyncio.gather(*(engine.connect().start() for _ in range(count)))
+            await asyncio.gather(*(connection.close() for connection in opened))
+        else:
+            await run_in_threadpool(_open_and_close, engine, count)
+
+
+def pool_stats(engine) -> dict:
+    """Live occupancy of an engine's connection pool (sync or async engine)."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    # Instrumented pools are "Timed" subclasses of the configured class
+    stats = {"pool": type(pool).__name__.removeprefix("Timed")}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            timeout=pool.timeout(),
+        )
+    return stats
+
+
+def _select_one(sync_engine: Engine) -> None:
+    with sync_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def probe_database(engine, timeout: float) -> dict:
+    """Time a SELECT 1 on an engine, giving up after `timeout` seconds."""
+    started = time.perf_counter()
+    try:
+        if isinstance(engine, AsyncEngine):
+            async def select_one():
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+
+            await asyncio.wait_for(select_one(), timeout)
+        else:
+            # A timed-out probe keeps its thread until the driver gives up
+            await asyncio.wait_for(run_in_threadpool(_select_one, engine), timeout)
+    except Exception as exc:
+        return {"ok": False, "seconds": round(time.perf_counter() - started, 4), "error": type(exc).__name__}
+    return {"ok": True, "seconds": round(time.perf_counter() - started, 4)}
+
+
+async def database_readiness(engines: Dict[str, object], timeout: float) -> Tuple[bool, Dict[str, dict]]:
+    """Probe every engine concurrently; ready only when all of them answer."""
+    probes = await asyncio.gather(*(probe_database(engine, timeout) for engine in engines.values()))
+    report = {
+        name: {**pool_stats(engine), "probe": probe}
+        for (name, engine), probe in zip(engines.items(), probes)
+    }
+    return all(probe["ok"] for probe in probes), report
+
+
+class ThreadedSession:
+    """
+    Awaitable facade over a sync Session.
+
+    Exposes the subset of the AsyncSession API used by the routes, running
+    every database call in the threadpool. This keeps the sync driver path
+    available (DB_ASYNC=False) without duplicating the route code.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @property
+    def bind(self):
+        return self.sync_session.bind
+
+    def get_bind(self, *args, **kwargs):
+        return self.sync_session.get_bind(*args, **kwargs)
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def stream(self, statement, *args, **kwargs) -> "ThreadedResult":
+        result = await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+        return ThreadedResult(result)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self, objects=None) -> None:
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance, *args, **kwargs) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, *args, **kwargs)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+class ThreadedResult:
+    """Awaitable facade over a sync Result, for ThreadedSession.stream()."""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size=None):
+        partitions = self.result.partitions(size)
+        while True:
+            partition = await run_in_threadpool(next, partitions, None)
+            if partition is None:
+                return
+            yield partition
+
+
+@asynccontextmanager
+async def primary_session():
+    """A session on the primary, for work outside a request's own session."""
+    if settings.DB_ASYNC:
+        async with async_engines().session_factory() as db:
+            yield db
+        return
+
+    db = ThreadedSession(sync_engines().session_factory(expire_on_commit=False))
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_db():
     """Dependency for getting database session."""
-    db = SessionLocal()
+    if settings.DB_ASYNC:
+        _, replicas, factory = async_engines()
+        info = replica_session_info([replica.sync_engine for replica in replicas])
+        async with factory(info=info) as db:
+            yield db
+        return
+
+    _, replicas, factory = sync_engines()
+    db = ThreadedSession(factory(expire_on_commit=False, info=replica_session_info(replicas)))
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
@@ -1,38 +1,117 @@
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import anyio
+from fastapi import APIRouter, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
 from app.core.config import settings
-from app.database import engine, Base
-from app.api.routes import auth, events, swaps
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-# Initialize FastAPI app
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    docs_url=f"{settings.API_V1_STR}/docs",
-    redoc_url=f"{settings.API_V1_STR}/redoc",
+from app.database import (
+    create_schema, database_readiness, dispose_engines, engines_in_use, prime_pools, primary_session
 )
+from app.api.archive import get_swap_archive
+from app.api.expiry import get_swap_expiry
+from app.api.matching import get_swap_cycle_matcher
+from app.api.routes import auth, calendar, cycles, events, stream, swaps
+from app.core.broker import get_broker
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, pool_checkouts, pool_wait_time, registry
+from app.core.principal_cache import get_principal_cache
+from app.core.query_budget import QueryDebugMiddleware
+from app.core import replicas
+from app.core.security import get_hashing_executor
+from app.core.slot_cache import get_slot_cache
+from app.utils.locking import RowLockUnavailable
+from app.utils.overlaps import EventOverlap, find_overlaps, is_overlap_violation, violating_placement
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.BACKEND_CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(app: FastAPI) -> None:
+    """
+    Do the work the first requests would otherwise pay for: connecting the
+    pools and building the OpenAPI schema. A database that is not up yet
+    only costs the priming; /health/ready keeps reporting it.
+    """
+    app.openapi()
+    try:
+        await prime_pools(settings.DB_POOL_WARMUP_CONNECTIONS)
+    except Exception:
+        logger.warning("Could not prime the connection pools", exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not settings.DB_ASYNC:
+        # Sync routes hold a worker thread per DB session, so size the
+        # threadpool to the connection pool instead of Starlette's default of 40
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        limiter.total_tokens = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    # The schema belongs to Alembic; this is a shortcut for local databases
+    if settings.DB_CREATE_SCHEMA:
+        await create_schema()
+    await warm_up(app)
+    await get_broker().start()
+    await get_swap_expiry().start()
+    await get_swap_archive().start()
+    await get_swap_cycle_matcher().start()
+    yield
+    await get_swap_cycle_matcher().stop()
+    await get_swap_archive().stop()
+    await get_swap_expiry().stop()
+    await get_broker().stop()
+    await get_slot_cache().close()
+    get_hashing_executor().shutdown()
+    await dispose_engines()
+
+
+async def concurrent_modification_handler(request: Request, exc: Exception):
+    # Another transaction changed or holds the rows; the session is rolled back
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "Resource was modified by a concurrent request, please retry"},
+    )
+
+
+async def event_overlap_handler(request: Request, exc: EventOverlap):
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": exc.detail, "conflicting_event_ids": exc.event_ids},
+    )
 
-# Include routers
-app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["Authentication"])
-app.include_router(events.router, prefix=f"{settings.API_V1_STR}/events", tags=["Events"])
-app.include_router(swaps.router, prefix=f"{settings.API_V1_STR}", tags=["Swaps"])
 
+async def _violation_overlap(exc: IntegrityError) -> EventOverlap:
+    """
+    The EventOverlap an overlap constraint violation stands for. The
+    constraint only fires when a concurrent write slipped past the
+    application's check; the write is rolled back, so its placement is
+    checked again in a fresh session to name the events in the way.
+    """
+    placement = violating_placement(exc)
+    if placement is None:
+        return EventOverlap()
+    try:
+        async with primary_session() as db:
+            conflicts = await find_overlaps(db, [placement])
+    except SQLAlchemyError:
+        logger.warning("Could not look up the events overlapping a rejected write", exc_info=True)
+        return EventOverlap()
+    return EventOverlap(conflicts.get(0, ()))
 
-@app.get("/")
-def root():
+
+async def integrity_error_handler(request: Request, exc: IntegrityError):
+    if is_overlap_violation(exc):
+        return await event_overlap_handler(request, await _violation_overlap(exc))
+    raise exc
+
+
+# Routes outside the API prefix
+root_router = APIRouter()
+
+
+@root_router.get("/")
+async def root():
     return {
         "message": "Welcome to SlotSwapper API",
         "version": settings.VERSION,
@@ -40,11 +119,107 @@ def root():
     }
 
 
-@app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+@root_router.get("/health")
+async def health_check():
+    return {
+        "status": "healthy",
+        "auth_cache": get_principal_cache().stats(),
+        "password_hashing": get_hashing_executor().stats(),
+        "slot_cache": get_slot_cache().stats(),
+    }
+
+
+@root_router.get("/health/ready")
+async def readiness_check():
+    """Ready when every database answers within DB_READY_TIMEOUT_SECONDS; 503 otherwise."""
+    ready, databases = await database_readiness(engines_in_use(), settings.DB_READY_TIMEOUT_SECONDS)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "databases": databases,
+            # Recorded while METRICS_ENABLED, across all engines since start
+            "pool_waits": {
+                "checkouts": int(pool_checkouts.value()),
+                "wait_seconds": round(pool_wait_time.value(), 4),
+            },
+        },
+    )
+
+
+# Mounted only while METRICS_ENABLED
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def create_app() -> FastAPI:
+    """Build the application from the current settings."""
+    app = FastAPI(
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+        title=settings.PROJECT_NAME,
+        version=settings.VERSION,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        docs_url=f"{settings.API_V1_STR}/docs",
+        redoc_url=f"{settings.API_V1_STR}/redoc",
+    )
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.BACKEND_CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", replicas.HEADER],
+    )
+
+    if settings.DATABASE_REPLICA_URLS:
+        app.add_middleware(replicas.ReplicaRoutingMiddleware, max_lag=settings.REPLICA_MAX_LAG_SECONDS)
+
+    if settings.QUERY_DEBUG_HEADERS:
+        app.add_middleware(QueryDebugMiddleware)
+
+    # Outermost, so latency covers every other middleware
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    app.add_exception_handler(StaleDataError, concurrent_modification_handler)
+    app.add_exception_handler(RowLockUnavailable, concurrent_modification_handler)
+    app.add_exception_handler(EventOverlap, event_overlap_handler)
+    app.add_exception_handler(IntegrityError, integrity_error_handler)
+
+    # Include routers
+    app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["Authentication"])
+    app.include_router(events.router, prefix=f"{settings.API_V1_STR}/events", tags=["Events"])
+    app.include_router(swaps.router, prefix=f"{settings.API_V1_STR}", tags=["Swaps"])
+    app.include_router(cycles.router, prefix=f"{settings.API_V1_STR}", tags=["Swap Cycles"])
+    app.include_router(calendar.router, prefix=f"{settings.API_V1_STR}/calendar", tags=["Calendar"])
+    app.include_router(stream.router, prefix=f"{settings.API_V1_STR}", tags=["Stream"])
+    app.include_router(root_router)
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_router)
+    return app
+
+
+@lru_cache(maxsize=None)
+def get_app() -> FastAPI:
+    """The process's app, built on first use."""
+    return create_app()
+
+
+def __getattr__(name: str):
+    # `app` (what `uvicorn app.main:app` loads) is built on first access, so
+    # importing this module reads no settings
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
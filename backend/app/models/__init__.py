@@ -1,5 +1,7 @@
 from app.models.user import User
 from app.models.event import Event, EventStatus
-from app.models.swap_request import SwapRequest, SwapRequestStatus
+from app.models.swap_request import SwapRequest, SwapRequestArchive, SwapRequestStatus
+from app.models.swap_cycle import SwapCycle, SwapCycleLeg, SwapCycleStatus, SwapIntent, SwapIntentStatus
 
-__all__ = ["User", "Event", "EventStatus", "SwapRequest", "SwapRequestStatus"]
\ No newline at end of file
+__all__ = ["User", "Event", "EventStatus", "SwapRequest", "SwapRequestArchive", "SwapRequestStatus",
+           "SwapIntent", "SwapIntentStatus", "SwapCycle", "SwapCycleLeg", "SwapCycleStatus"]
\ No newline at end of file
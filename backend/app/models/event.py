@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey
+from sqlalchemy import DDL, Column, Integer, String, DateTime, Enum, ForeignKey, Index, text
+from sqlalchemy.event import listen
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -13,6 +14,18 @@ class EventStatus(str, enum.Enum):
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # GET /events: user_id = ? ORDER BY start_time
+        Index("ix_events_user_id_start_time", "user_id", "start_time"),
+        # GET /swappable-slots: status = 'SWAPPABLE' ORDER BY start_time, id
+        Index(
+            "ix_events_swappable_start_time",
+            "start_time",
+            "id",
+            postgresql_where=text("status = 'SWAPPABLE'"),
+            sqlite_where=text("status = 'SWAPPABLE'"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -22,9 +35,29 @@ class Event(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Optimistic concurrency: every ORM UPDATE checks and bumps this
+    version = Column(Integer, nullable=False, server_default="1")
     
     # Relationships
     owner = relationship("User", back_populates="events")
     
+    __mapper_args__ = {"version_id_col": version}
+    
     def __repr__(self):
-        return f"<Event {self.title} - {self.status}>"
\ No newline at end of file
+        return f"<Event {self.title} - {self.status}>"
+
+
+# Postgres keeps a user's events from overlapping: a generated tsrange column
+# under a GiST exclusion constraint (btree_gist provides `user_id WITH =`).
+# It is checked at commit, so a swap can trade two slots at the same time.
+# Other databases rely on the checks in app.utils.overlaps.
+OVERLAP_CONSTRAINT = "ex_events_user_id_during"
+POSTGRES_OVERLAP_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    "ALTER TABLE events ADD COLUMN during tsrange "
+    "GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED",
+    f"ALTER TABLE events ADD CONSTRAINT {OVERLAP_CONSTRAINT} "
+    "EXCLUDE USING gist (user_id WITH =, during WITH &&) DEFERRABLE INITIALLY DEFERRED",
+)
+for _statement in POSTGRES_OVERLAP_DDL:
+    listen(Event.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
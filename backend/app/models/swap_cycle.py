@@ -0,0 +1,109 @@
+from sqlalchemy import Boolean, Column, Integer, ForeignKey, DateTime, Enum, Index, text
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import enum
+from app.database import Base
+
+
+class SwapIntentStatus(str, enum.Enum):
+    OPEN = "OPEN"
+    MATCHED = "MATCHED"
+
+
+class SwapCycleStatus(str, enum.Enum):
+    PROPOSED = "PROPOSED"
+    ACCEPTED = "ACCEPTED"
+    REJECTED = "REJECTED"
+    EXPIRED = "EXPIRED"
+
+
+class SwapIntent(Base):
+    """A standing offer: the user would give `offered_slot` to get `wanted_slot`."""
+    __tablename__ = "swap_intents"
+    __table_args__ = (
+        # Matcher: every OPEN intent, oldest first
+        Index(
+            "ix_swap_intents_open",
+            "id",
+            postgresql_where=text("status = 'OPEN'"),
+            sqlite_where=text("status = 'OPEN'"),
+        ),
+        # One open intent per offered/wanted pair
+        Index(
+            "ux_swap_intents_open_pair",
+            "offered_slot_id",
+            "wanted_slot_id",
+            unique=True,
+            postgresql_where=text("status = 'OPEN'"),
+            sqlite_where=text("status = 'OPEN'"),
+        ),
+        Index("ix_swap_intents_user_id", "user_id"),
+        Index("ix_swap_intents_wanted_slot_id", "wanted_slot_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    offered_slot_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    wanted_slot_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    status = Column(Enum(SwapIntentStatus), default=SwapIntentStatus.OPEN, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Optimistic concurrency: every ORM UPDATE checks and bumps this
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    def __repr__(self):
+        return f"<SwapIntent {self.id} - {self.status}>"
+
+
+class SwapCycle(Base):
+    """A proposed multi-party swap; applied once every participant accepts."""
+    __tablename__ = "swap_cycles"
+    __table_args__ = (
+        # Expiry: status = 'PROPOSED' AND created_at < ? ORDER BY created_at
+        Index(
+            "ix_swap_cycles_proposed_created_at",
+            "created_at",
+            postgresql_where=text("status = 'PROPOSED'"),
+            sqlite_where=text("status = 'PROPOSED'"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(Enum(SwapCycleStatus), default=SwapCycleStatus.PROPOSED, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Optimistic concurrency: every ORM UPDATE checks and bumps this
+    version = Column(Integer, nullable=False, server_default="1")
+
+    legs = relationship("SwapCycleLeg", back_populates="cycle", order_by="SwapCycleLeg.position")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    def __repr__(self):
+        return f"<SwapCycle {self.id} - {self.status}>"
+
+
+class SwapCycleLeg(Base):
+    """One participant of a cycle: gives `give_slot` and receives `take_slot`."""
+    __tablename__ = "swap_cycle_legs"
+    __table_args__ = (
+        Index("ix_swap_cycle_legs_cycle_id_position", "cycle_id", "position"),
+        # GET /swap-cycles: the cycles a user takes part in
+        Index("ix_swap_cycle_legs_user_id", "user_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    cycle_id = Column(Integer, ForeignKey("swap_cycles.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)
+    intent_id = Column(Integer, ForeignKey("swap_intents.id", ondelete="SET NULL"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    give_slot_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    take_slot_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    accepted = Column(Boolean, default=False, nullable=False)
+
+    cycle = relationship("SwapCycle", back_populates="legs")
+
+    def __repr__(self):
+        return f"<SwapCycleLeg {self.cycle_id}/{self.position}>"
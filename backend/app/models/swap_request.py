@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, Index, String, text
+from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 from app.database import Base
@@ -8,10 +9,52 @@ class SwapRequestStatus(str, enum.Enum):
     PENDING = "PENDING"
     ACCEPTED = "ACCEPTED"
     REJECTED = "REJECTED"
+    EXPIRED = "EXPIRED"
 
 
 class SwapRequest(Base):
     __tablename__ = "swap_requests"
+    __table_args__ = (
+        # GET /swap-requests/incoming: receiver_id = ? AND status = 'PENDING'
+        # ORDER BY created_at, id
+        Index(
+            "ix_swap_requests_receiver_id_pending",
+            "receiver_id",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
+        ),
+        # GET /swap-requests/history, received and not archived yet
+        Index(
+            "ix_swap_requests_receiver_id_finished",
+            "receiver_id",
+            "created_at",
+            "id",
+            postgresql_where=text("status != 'PENDING'"),
+            sqlite_where=text("status != 'PENDING'"),
+        ),
+        # GET /swap-requests/outgoing and sent history: requester_id = ?
+        # ORDER BY created_at DESC
+        Index("ix_swap_requests_requester_id_created_at", "requester_id", "created_at"),
+        # Expiry: status = 'PENDING' AND created_at < ? ORDER BY created_at
+        Index(
+            "ix_swap_requests_pending_created_at",
+            "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
+        ),
+        # Archiving: status != 'PENDING' AND updated_at < ? ORDER BY updated_at
+        Index(
+            "ix_swap_requests_finished_updated_at",
+            "updated_at",
+            postgresql_where=text("status != 'PENDING'"),
+            sqlite_where=text("status != 'PENDING'"),
+        ),
+        # Pending-request check on both slots, and cascades from events
+        Index("ix_swap_requests_requester_slot_id", "requester_slot_id"),
+        Index("ix_swap_requests_requested_slot_id", "requested_slot_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     requester_slot_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
@@ -21,6 +64,48 @@ class SwapRequest(Base):
     status = Column(Enum(SwapRequestStatus), default=SwapRequestStatus.PENDING, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Optimistic concurrency: every ORM UPDATE checks and bumps this
+    version = Column(Integer, nullable=False, server_default="1")
     
+    # Relationships
+    requester_slot = relationship("Event", foreign_keys=[requester_slot_id])
+    requested_slot = relationship("Event", foreign_keys=[requested_slot_id])
+    requester = relationship("User", foreign_keys=[requester_id])
+    receiver = relationship("User", foreign_keys=[receiver_id])
+    
+    __mapper_args__ = {"version_id_col": version}
+    
+    def __repr__(self):
+        return f"<SwapRequest {self.id} - {self.status}>"
+
+
+class SwapRequestArchive(Base):
+    """
+    Finished swap requests moved out of swap_requests by app.api.archive.
+
+    Rows keep their original id. Slots may be edited, swapped or deleted
+    after a request is decided, so their titles are copied when the row is
+    archived and the slot ids carry no foreign key.
+    """
+    __tablename__ = "swap_requests_archive"
+    __table_args__ = (
+        # GET /swap-requests/history: requester_id = ? or receiver_id = ?,
+        # ORDER BY created_at DESC, id DESC
+        Index("ix_swap_requests_archive_requester_id_created_at", "requester_id", "created_at", "id"),
+        Index("ix_swap_requests_archive_receiver_id_created_at", "receiver_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    requester_slot_id = Column(Integer, nullable=False)
+    requested_slot_id = Column(Integer, nullable=False)
+    requester_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    receiver_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(Enum(SwapRequestStatus), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime)
+    requester_slot_title = Column(String, nullable=False)
+    requested_slot_title = Column(String, nullable=False)
+    archived_at = Column(DateTime, nullable=False)
+
     def __repr__(self):
-        return f"<SwapRequest {self.id} - {self.status}>"
\ No newline at end of file
+        return f"<SwapRequestArchive {self.id} - {self.status}>"
@@ -9,13 +9,30 @@ from app.schemas.event import (
     EventCreate,
     EventUpdate,
     EventResponse,
-    EventWithOwner
+    EventWithOwner,
+    EventBatchRequest,
+    EventBatchResult,
+    EventBatchResponse,
+    CalendarImportResponse
 )
 from app.schemas.swap_request import (
     SwapRequestCreate,
     SwapResponseUpdate,
     SwapRequestResponse,
-    SwapRequestDetailed
+    SwapRequestDetailed,
+    SwapRequestHistoryItem,
+    SwapDecision,
+    SwapDecisionBatch,
+    SwapDecisionResult,
+    SwapDecisionBatchResponse
+)
+from app.schemas.swap_cycle import (
+    SwapIntentCreate,
+    SwapIntentResponse,
+    SwapCycleLegResponse,
+    SwapCycleResponse,
+    SwapCycleRespond,
+    SwapCycleMatchResponse
 )
 from app.schemas.token import Token, TokenData, TokenResponse
 
@@ -29,10 +46,25 @@ __all__ = [
     "EventUpdate",
     "EventResponse",
     "EventWithOwner",
+    "EventBatchRequest",
+    "EventBatchResult",
+    "EventBatchResponse",
+    "CalendarImportResponse",
     "SwapRequestCreate",
     "SwapResponseUpdate",
     "SwapRequestResponse",
     "SwapRequestDetailed",
+    "SwapRequestHistoryItem",
+    "SwapDecision",
+    "SwapDecisionBatch",
+    "SwapDecisionResult",
+    "SwapDecisionBatchResponse",
+    "SwapIntentCreate",
+    "SwapIntentResponse",
+    "SwapCycleLegResponse",
+    "SwapCycleResponse",
+    "SwapCycleRespond",
+    "SwapCycleMatchResponse",
     "Token",
     "TokenData",
     "TokenResponse",
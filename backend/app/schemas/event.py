@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, List, Literal, Optional, Union
 from app.models.event import EventStatus
 
 
@@ -48,4 +48,60 @@ class EventResponse(EventBase):
 
 class EventWithOwner(EventResponse):
     owner_name: str
-    owner_email: str
\ No newline at end of file
+    owner_email: str
+
+
+# Upper bound on operations per POST /events/batch
+MAX_BATCH_OPERATIONS = 500
+
+
+class EventBatchCreate(EventCreate):
+    op: Literal["create"]
+
+
+class EventBatchUpdate(EventUpdate):
+    op: Literal["update"]
+    id: int = Field(..., gt=0)
+
+
+class EventBatchStatus(BaseModel):
+    op: Literal["status"]
+    id: int = Field(..., gt=0)
+    status: EventStatus
+
+
+class EventBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int = Field(..., gt=0)
+
+
+EventBatchOperation = Annotated[
+    Union[EventBatchCreate, EventBatchUpdate, EventBatchStatus, EventBatchDelete],
+    Field(discriminator="op"),
+]
+
+
+class EventBatchRequest(BaseModel):
+    operations: List[EventBatchOperation] = Field(..., min_length=1, max_length=MAX_BATCH_OPERATIONS)
+    # All-or-nothing by default; with atomic=false failed operations are skipped
+    atomic: bool = True
+
+
+class EventBatchResult(BaseModel):
+    index: int
+    op: str
+    status_code: int
+    id: Optional[int] = None
+    event: Optional[EventResponse] = None
+    detail: Optional[str] = None
+
+
+class EventBatchResponse(BaseModel):
+    applied: bool
+    results: List[EventBatchResult]
+
+
+
+class CalendarImportResponse(BaseModel):
+    imported: int
+    skipped: int
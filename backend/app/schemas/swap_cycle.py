@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field, ConfigDict
+from datetime import datetime
+from typing import List, Optional
+from app.models.swap_cycle import SwapCycleStatus, SwapIntentStatus
+
+
+class SwapIntentCreate(BaseModel):
+    offered_slot_id: int = Field(..., gt=0)
+    wanted_slot_id: int = Field(..., gt=0)
+
+
+class SwapIntentResponse(BaseModel):
+    id: int
+    user_id: int
+    offered_slot_id: int
+    wanted_slot_id: int
+    status: SwapIntentStatus
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SwapCycleLegResponse(BaseModel):
+    position: int
+    user_id: int
+    give_slot_id: int
+    take_slot_id: int
+    accepted: bool
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SwapCycleResponse(BaseModel):
+    id: int
+    status: SwapCycleStatus
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    legs: List[SwapCycleLegResponse]
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SwapCycleRespond(BaseModel):
+    accept: bool
+
+
+class SwapCycleMatchResponse(BaseModel):
+    intents: int
+    proposed: List[int]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
+from typing import List, Optional
 from app.models.swap_request import SwapRequestStatus
 
 
@@ -29,4 +30,38 @@ class SwapRequestDetailed(SwapRequestResponse):
     requester_slot_title: str
     requested_slot_title: str
     requester_name: str
-    receiver_name: str
\ No newline at end of file
+    receiver_name: str
+
+
+class SwapRequestHistoryItem(SwapRequestDetailed):
+    """A finished swap request, as listed by GET /swap-requests/history (archived_at once archived)."""
+    archived_at: Optional[datetime] = None
+
+
+# Upper bound on decisions per POST /swap-responses
+MAX_SWAP_DECISIONS = 200
+
+
+class SwapDecision(BaseModel):
+    request_id: int = Field(..., gt=0)
+    accept: bool
+
+
+class SwapDecisionBatch(BaseModel):
+    decisions: List[SwapDecision] = Field(..., min_length=1, max_length=MAX_SWAP_DECISIONS)
+    # All-or-nothing by default; with atomic=false failed decisions are skipped
+    atomic: bool = True
+
+
+class SwapDecisionResult(BaseModel):
+    index: int
+    request_id: int
+    status_code: int
+    swap_request: Optional[SwapRequestResponse] = None
+    detail: Optional[str] = None
+    conflicting_event_ids: Optional[List[int]] = None
+
+
+class SwapDecisionBatchResponse(BaseModel):
+    applied: bool
+    results: List[SwapDecisionResult]
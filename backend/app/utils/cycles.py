@@ -0,0 +1,217 @@
+"""
+Disjoint cycle search for multi-party swaps.
+
+Nodes are slots; an edge a -> b means "the owner of a would take b in
+exchange for a". A cycle a -> b -> c -> a is a swap in which every owner
+gives their slot and receives the next one.
+
+Finding a maximum set of disjoint cycles of bounded length is NP-hard
+(it is the kidney exchange problem), so `find_disjoint_cycles` is greedy:
+
+1. Edges that cannot lie on any cycle (between strongly connected
+   components) are dropped, which removes most of a sparse intent graph.
+2. Cycles are taken shortest first: every 2-way swap, then 3-way, and so
+   on up to `max_length`. Short cycles need fewer people to agree.
+3. Each cycle is searched from its smallest node, through larger nodes
+   only, so it is explored once. A reverse breadth-first search bounds the
+   forward search to nodes that can still get back to the start in time,
+   and `max_expansions` caps the work per start node on dense graphs.
+
+Nodes are numbered in priority order (e.g. by their oldest intent) and
+edges are tried in the order given, so older intents win ties.
+"""
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_MAX_EXPANSIONS = 10000
+
+
+def strongly_connected_components(adjacency: Sequence[Sequence[int]]) -> List[int]:
+    """Component number of every node (iterative Tarjan, safe for deep graphs)."""
+    count = len(adjacency)
+    index = [-1] * count
+    lowlink = [0] * count
+    on_stack = [False] * count
+    component = [-1] * count
+    stack: List[int] = []
+    next_index = 0
+    next_component = 0
+
+    for root in range(count):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, edge = work[-1]
+            if edge == 0:
+                index[node] = lowlink[node] = next_index
+                next_index += 1
+                stack.append(node)
+                on_stack[node] = True
+            neighbours = adjacency[node]
+            while edge < len(neighbours):
+                target = neighbours[edge]
+                edge += 1
+                if index[target] == -1:
+                    work[-1] = (node, edge)
+                    work.append((target, 0))
+                    break
+                if on_stack[target] and index[target] < lowlink[node]:
+                    lowlink[node] = index[target]
+            else:
+                work.pop()
+                if work and lowlink[node] < lowlink[work[-1][0]]:
+                    lowlink[work[-1][0]] = lowlink[node]
+                if lowlink[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component[member] = next_component
+                        if member == node:
+                            break
+                    next_component += 1
+    return component
+
+
+def _distances_back(
+    start: int,
+    reverse: Sequence[Sequence[int]],
+    used: List[bool],
+    depth: int,
+) -> Dict[int, int]:
+    """Nodes (greater than start, unused) that reach start within `depth` edges, with their distance."""
+    distances = {start: 0}
+    frontier = [start]
+    for distance in range(1, depth + 1):
+        following = []
+        for node in frontier:
+            for source in reverse[node]:
+                if source > start and not used[source] and source not in distances:
+                    distances[source] = distance
+                    following.append(source)
+        if not following:
+            break
+        frontier = following
+    return distances
+
+
+def _cycle_from(
+    start: int,
+    adjacency: Sequence[Sequence[int]],
+    reverse: Sequence[Sequence[int]],
+    used: List[bool],
+    length: int,
+    max_expansions: int,
+) -> Optional[List[int]]:
+    """A cycle of at most `length` nodes through start, using unused nodes greater than start."""
+    distances = _distances_back(start, reverse, used, length - 1)
+    if len(distances) == 1:
+        return None
+    path = [start]
+    on_path = {start}
+    # Depth-first over (node, next edge to try)
+    work = [(start, 0)]
+    expansions = 0
+    while work:
+        node, edge = work[-1]
+        neighbours = adjacency[node]
+        remaining = length - len(path)
+        while edge < len(neighbours):
+            target = neighbours[edge]
+            edge += 1
+            if target == start:
+                if len(path) >= 2:
+                    return path
+                continue
+            if target in on_path or distances.get(target, length) > remaining:
+                continue
+            expansions += 1
+            if expansions > max_expansions:
+                return None
+            work[-1] = (node, edge)
+            work.append((target, 0))
+            path.append(target)
+            on_path.add(target)
+            break
+        else:
+            work.pop()
+            on_path.discard(path.pop())
+    return None
+
+
+def find_disjoint_cycles(
+    node_count: int,
+    edges: Iterable[Tuple[int, int]],
+    max_length: int,
+    max_expansions: int = DEFAULT_MAX_EXPANSIONS,
+) -> List[List[int]]:
+    """
+    Greedily pick node-disjoint cycles of 2 to `max_length` nodes.
+
+    Nodes are 0..node_count-1. Each cycle is returned as [n0, n1, ...],
+    meaning n0 -> n1 -> ... -> n0.
+    """
+    adjacency: List[List[int]] = [[] for _ in range(node_count)]
+    for source, target in edges:
+        if source != target:
+            adjacency[source].append(target)
+
+    component = strongly_connected_components(adjacency)
+    reverse: List[List[int]] = [[] for _ in range(node_count)]
+    for source in range(node_count):
+        kept = [target for target in adjacency[source] if component[target] == component[source]]
+        adjacency[source] = kept
+        for target in kept:
+            reverse[target].append(source)
+
+    candidates = [node for node in range(node_count) if adjacency[node]]
+    used = [False] * node_count
+    cycles: List[List[int]] = []
+    for length in range(2, max_length + 1):
+        for start in candidates:
+            if used[start]:
+                continue
+            cycle = _cycle_from(start, adjacency, reverse, used, length, max_expansions)
+            if cycle is not None:
+                for node in cycle:
+                    used[node] = True
+                cycles.append(cycle)
+        candidates = [node for node in candidates if not used[node]]
+    return cycles
+
+
+class IntentGraph:
+    """
+    Maps arbitrary slot ids onto the dense node numbers used by
+    find_disjoint_cycles, remembering which intent created each edge.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[Hashable, int] = {}
+        self._keys: List[Hashable] = []
+        self._edges: List[Tuple[int, int]] = []
+        self._intents: Dict[Tuple[int, int], Hashable] = {}
+
+    def _node(self, key: Hashable) -> int:
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = len(self._keys)
+            self._keys.append(key)
+        return node
+
+    def add_intent(self, intent: Hashable, offered: Hashable, wanted: Hashable) -> None:
+        """Add an "I'd give `offered` for `wanted`" edge; the first intent for an edge wins."""
+        edge = (self._node(offered), self._node(wanted))
+        if edge not in self._intents:
+            self._intents[edge] = intent
+            self._edges.append(edge)
+
+    def __len__(self) -> int:
+        return len(self._edges)
+
+    def find_cycles(self, max_length: int, max_expansions: int = DEFAULT_MAX_EXPANSIONS) -> List[List[Hashable]]:
+        """Disjoint cycles as lists of the intents forming them, in cycle order."""
+        cycles = find_disjoint_cycles(len(self._keys), self._edges, max_length, max_expansions)
+        return [
+            [self._intents[(node, cycle[(i + 1) % len(cycle)])] for i, node in enumerate(cycle)]
+            for cycle in cycles
+        ]
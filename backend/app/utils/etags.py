@@ -0,0 +1,30 @@
+import hashlib
+from typing import Optional
+
+
+def make_etag(*parts) -> str:
+    """Strong entity tag over the given version parts."""
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    Compare an If-None-Match / If-Match header against an entity tag.
+
+    If-None-Match uses weak comparison; If-Match must pass weak=False, under
+    which W/ tags never match.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
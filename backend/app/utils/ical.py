@@ -0,0 +1,260 @@
+"""
+Minimal iCalendar (RFC 5545) support for the calendar feed and import.
+
+Only what SlotSwapper events need is handled: VEVENT blocks with SUMMARY,
+DTSTART and DTEND or DURATION. Times are exported in UTC, matching how
+they are stored. Recurrence rules are not expanded; only the first
+occurrence of a recurring event is imported.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+CRLF = "\r\n"
+# Content lines are folded at 75 octets
+MAX_LINE_OCTETS = 75
+PRODID = "-//SlotSwapper//Calendar Feed//EN"
+
+# RFC 5545 durations: the common forms, e.g. PT1H30M, P1D, P1W
+_DURATION_RE = re.compile(
+    r"^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+
+
+class ICalendarError(ValueError):
+    """Raised for input that is not a usable iCalendar stream."""
+
+    def __init__(self, message: str, line: int):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+
+
+@dataclass(frozen=True)
+class ParsedEvent:
+    title: str
+    start_time: datetime
+    end_time: datetime
+
+
+def escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def unescape_text(value: str) -> str:
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line into CRLF-terminated chunks of at most 75 octets."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + CRLF
+    chunks = []
+    limit = MAX_LINE_OCTETS
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        chunks.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        # Continuation lines start with a space, which counts toward the limit
+        limit = MAX_LINE_OCTETS - 1
+    return (CRLF + " ").join(chunks) + CRLF
+
+
+def format_datetime(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def calendar_header(name: str) -> str:
+    return "".join(fold_line(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ))
+
+
+def calendar_footer() -> str:
+    return "END:VCALENDAR" + CRLF
+
+
+def format_event(event, uid_domain: str) -> str:
+    """Render an Event row as a VEVENT block."""
+    modified = format_datetime(event.updated_at or event.created_at)
+    return "".join(fold_line(line) for line in (
+        "BEGIN:VEVENT",
+        f"UID:event-{event.id}@{uid_domain}",
+        f"DTSTAMP:{modified}",
+        f"LAST-MODIFIED:{modified}",
+        f"DTSTART:{format_datetime(event.start_time)}",
+        f"DTEND:{format_datetime(event.end_time)}",
+        f"SUMMARY:{escape_text(event.title)}",
+        f"X-SLOTSWAPPER-STATUS:{event.status.value}",
+        "END:VEVENT",
+    ))
+
+
+def parse_duration(value: str) -> Optional[timedelta]:
+    match = _DURATION_RE.match(value)
+    if not match or value.rstrip("T").endswith("P"):
+        return None
+    parts = {key: int(number) for key, number in match.groupdict().items() if key != "sign" and number}
+    duration = timedelta(**parts)
+    return -duration if match.group("sign") == "-" else duration
+
+
+def parse_datetime(value: str, params: Dict[str, str]) -> Tuple[datetime, bool]:
+    """
+    Parse a DTSTART/DTEND value into a naive UTC datetime.
+
+    Returns the datetime and whether it was a DATE (all-day) value.
+    Floating times are taken as UTC.
+    """
+    if params.get("VALUE") == "DATE" or re.fullmatch(r"\d{8}", value):
+        parsed = datetime.strptime(value, "%Y%m%d")
+        return parsed, True
+
+    utc = value.endswith("Z")
+    parsed = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+    if not utc and "TZID" in params:
+        try:
+            zone = ZoneInfo(params["TZID"].strip('"'))
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"unknown time zone {params['TZID']}")
+        parsed = parsed.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed, False
+
+
+def _split_content_line(line: str) -> Tuple[str, Dict[str, str], str]:
+    """Split NAME;PARAM=VALUE:value into its parts (quoted parameter values may contain ':')."""
+    in_quotes = False
+    for position, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ":" and not in_quotes:
+            head, value = line[:position], line[position + 1:]
+            break
+    else:
+        raise ValueError("missing ':'")
+    name, *raw_params = head.split(";")
+    params = {}
+    for raw_param in raw_params:
+        key, _, param_value = raw_param.partition("=")
+        params[key.upper()] = param_value
+    return name.upper(), params, value
+
+
+class ICalendarParser:
+    """
+    Push parser: feed physical lines, collect completed events.
+
+    Lines may be fed as they arrive, so an upload never has to be held in
+    memory. Events without a usable end (or ending before they start) are
+    counted in `skipped` rather than rejected.
+    """
+
+    def __init__(self):
+        self.skipped = 0
+        self._line_number = 0
+        self._pending: Optional[str] = None
+        self._pending_line = 0
+        self._properties: Optional[Dict[str, Tuple[Dict[str, str], str]]] = None
+        self._depth = 0
+        self._events: List[ParsedEvent] = []
+
+    def feed(self, line: str) -> None:
+        self._line_number += 1
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if self._pending is None:
+                raise ICalendarError("continuation line without a property", self._line_number)
+            self._pending += line[1:]
+            return
+        self._flush()
+        if line:
+            self._pending = line
+            self._pending_line = self._line_number
+
+    def close(self) -> None:
+        self._flush()
+        if self._properties is not None:
+            raise ICalendarError("unterminated VEVENT", self._line_number)
+
+    @property
+    def ready(self) -> int:
+        """Number of completed events waiting to be taken."""
+        return len(self._events)
+
+    def take_events(self) -> List[ParsedEvent]:
+        """Return and forget the events completed so far."""
+        events, self._events = self._events, []
+        return events
+
+    def _flush(self) -> None:
+        if self._pending is None:
+            return
+        line, number = self._pending, self._pending_line
+        self._pending = None
+        try:
+            name, params, value = _split_content_line(line)
+        except ValueError as exc:
+            raise ICalendarError(str(exc), number)
+
+        if name == "BEGIN":
+            if value.upper() == "VEVENT":
+                if self._properties is not None:
+                    raise ICalendarError("nested VEVENT", number)
+                self._properties = {}
+                self._depth = 0
+            elif self._properties is not None:
+                # VALARM and friends: ignore their properties
+                self._depth += 1
+        elif name == "END":
+            if self._properties is None:
+                return
+            if self._depth:
+                self._depth -= 1
+            elif value.upper() == "VEVENT":
+                self._finish_event(number)
+        elif self._properties is not None and not self._depth:
+            self._properties.setdefault(name, (params, value))
+
+    def _finish_event(self, number: int) -> None:
+        properties, self._properties = self._properties, None
+        if "DTSTART" not in properties:
+            raise ICalendarError("VEVENT without DTSTART", number)
+        try:
+            start_time, all_day = parse_datetime(properties["DTSTART"][1], properties["DTSTART"][0])
+            if "DTEND" in properties:
+                end_time, _ = parse_datetime(properties["DTEND"][1], properties["DTEND"][0])
+            elif "DURATION" in properties:
+                duration = parse_duration(properties["DURATION"][1])
+                if duration is None:
+                    raise ValueError(f"invalid DURATION {properties['DURATION'][1]}")
+                end_time = start_time + duration
+            else:
+                # RFC 5545: an all-day event without an end lasts one day
+                end_time = start_time + timedelta(days=1) if all_day else start_time
+        except ValueError as exc:
+            raise ICalendarError(str(exc), number)
+
+        title = unescape_text(properties.get("SUMMARY", ({}, ""))[1]).strip()[:200] or "Untitled"
+        if end_time <= start_time:
+            self.skipped += 1
+            return
+        self._events.append(ParsedEvent(title=title, start_time=start_time, end_time=end_time))
@@ -0,0 +1,39 @@
+"""
+Sorted-array interval index.
+
+Intervals are half-open, [start, end): one ending exactly when another
+starts does not overlap it. Overlapping or touching intervals are merged
+when the set is built, leaving disjoint runs sorted by start, so an overlap
+query is a single binary search.
+"""
+from bisect import bisect_right
+from typing import Iterable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class IntervalSet:
+    """Union of intervals, answering overlap queries in O(log n)."""
+
+    def __init__(self, intervals: Iterable[Tuple[T, T]] = ()):
+        starts: List[T] = []
+        ends: List[T] = []
+        for start, end in sorted(interval for interval in intervals if interval[0] < interval[1]):
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlaps(self, start: T, end: T) -> bool:
+        """Whether [start, end) shares any instant with the set."""
+        if start >= end:
+            return False
+        # The only run that can overlap is the first one ending after `start`
+        index = bisect_right(self._ends, start)
+        return index < len(self._starts) and self._starts[index] < end
@@ -0,0 +1,75 @@
+from typing import Dict, Iterable, List
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+from app.core.config import settings
+
+# Postgres SQLSTATE for "could not obtain lock" (FOR UPDATE NOWAIT)
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+class RowLockUnavailable(Exception):
+    """Raised when rows are locked by another transaction and we chose not to wait."""
+
+
+def for_update_options() -> dict:
+    """Keyword arguments for with_for_update() matching settings.ROW_LOCK_MODE."""
+    mode = settings.ROW_LOCK_MODE
+    return {"nowait": mode == "nowait", "skip_locked": mode == "skip_locked"}
+
+
+def _is_lock_not_available(exc: DBAPIError) -> bool:
+    orig = exc.orig
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    return code == LOCK_NOT_AVAILABLE
+
+
+async def lock_rows(db: AsyncSession, model, ids: Iterable[int]) -> Dict[int, object]:
+    """
+    SELECT ... FOR UPDATE the rows of `model` with the given ids.
+
+    Rows are locked in primary key order so concurrent transactions touching
+    the same rows cannot deadlock. Returns the rows found, keyed by id; ids
+    that do not exist are simply missing. Raises RowLockUnavailable when a
+    row is held by another transaction in NOWAIT or SKIP LOCKED mode.
+    SQLite has no row locks and relies on the version columns instead.
+    """
+    ids = sorted(set(ids))
+    statement = select(model).where(model.id.in_(ids)).order_by(model.id)
+    try:
+        result = await db.execute(statement.with_for_update(**for_update_options()))
+    except DBAPIError as exc:
+        if _is_lock_not_available(exc):
+            raise RowLockUnavailable() from exc
+        raise
+    rows = {row.id: row for row in result.scalars().all()}
+
+    if len(rows) < len(ids) and settings.ROW_LOCK_MODE == "skip_locked":
+        # Tell rows skipped because they are locked apart from rows that do not exist
+        existing = await db.scalar(
+            select(func.count()).select_from(model).where(model.id.in_(ids))
+        )
+        if existing > len(rows):
+            raise RowLockUnavailable()
+
+    return rows
+
+
+async def execute_versioned(db: AsyncSession, statement, params: List[dict]) -> None:
+    """
+    executemany a versioned UPDATE/DELETE, failing like the ORM does when a row moved on.
+
+    Drivers that cannot count the rows an executemany matched (asyncpg,
+    psycopg2) get one statement per row instead, so the check still runs.
+    """
+    if db.bind.dialect.supports_sane_multi_rowcount:
+        matched = (await db.execute(statement, params)).rowcount
+    else:
+        matched = 0
+        for row in params:
+            matched += (await db.execute(statement, row)).rowcount
+    if matched != len(params):
+        raise StaleDataError(
+            f"{statement.table.name}: expected to match {len(params)} row(s), matched {matched}"
+        )
@@ -0,0 +1,151 @@
+"""
+Keeping each user's events from overlapping in time.
+
+Postgres enforces the rule itself with an exclusion constraint (see
+app.models.event), whatever writes the rows. Write paths also check first
+with find_overlaps(): that gives SQLite the same rule and turns a conflict
+into a 409 naming the events in the way rather than a constraint error.
+
+Both checks lean on the rule already holding for stored events: sorted by
+start, a user's events also end in order, so the only stored events a new
+one can overlap are those starting inside it plus the single event starting
+last before it. That is two seeks on (user_id, start_time), however long
+the calendar is.
+"""
+import re
+from datetime import datetime
+from typing import Collection, Dict, Iterable, List, NamedTuple, Optional, Sequence
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.event import OVERLAP_CONSTRAINT, Event
+
+# Placements per query: two SELECTs each, and SQLite allows 500 per compound SELECT
+QUERY_CHUNK_SIZE = 200
+
+# The first key in the constraint's error detail is the row being written:
+# Key (user_id, during)=(5, ["2030-01-01 09:00:00","2030-01-01 10:00:00")) conflicts with ...
+_VIOLATING_KEY = re.compile(r'Key \(user_id, during\)=\((\d+), [\[(]"?([^",]+)"?,"?([^",)\]]+)"?[)\]]\)')
+
+
+class EventOverlap(Exception):
+    """Raised when a write would give a user two events overlapping in time."""
+
+    def __init__(self, event_ids: Iterable[int] = (), detail: Optional[str] = None):
+        self.event_ids = sorted(set(event_ids))
+        self.detail = detail or "Event overlaps another of your events"
+        super().__init__(self.detail)
+
+
+class Placement(NamedTuple):
+    """
+    An event a user is about to hold.
+
+    `event_id` is the event itself when it already exists; `ignore` lists
+    stored events that will be gone or moved by the time the write commits.
+    """
+    user_id: int
+    start_time: datetime
+    end_time: datetime
+    event_id: Optional[int] = None
+    ignore: Collection[int] = ()
+
+
+def is_overlap_violation(exc: IntegrityError) -> bool:
+    """Whether a database error comes from the overlap exclusion constraint."""
+    return OVERLAP_CONSTRAINT in str(exc.orig)
+
+
+def _violation_detail(exc: IntegrityError) -> str:
+    orig = exc.orig
+    # psycopg2 exposes the DETAIL field as diag; asyncpg's error is the adapter's cause
+    diag = getattr(orig, "diag", None)
+    if diag is not None and getattr(diag, "message_detail", None):
+        return diag.message_detail
+    return getattr(orig.__cause__, "detail", None) or str(orig)
+
+
+def violating_placement(exc: IntegrityError) -> Optional[Placement]:
+    """The placement an overlap constraint violation rejected, read from the error detail."""
+    match = _VIOLATING_KEY.search(_violation_detail(exc))
+    if match is None:
+        return None
+    user_id, start_time, end_time = match.groups()
+    try:
+        return Placement(int(user_id), datetime.fromisoformat(start_time), datetime.fromisoformat(end_time))
+    except ValueError:
+        return None
+
+
+def _overlap_selects(index: int, placement: Placement):
+    starting_inside = select(literal(index).label("placement"), Event.id).where(
+        Event.user_id == placement.user_id,
+        Event.start_time >= placement.start_time,
+        Event.start_time < placement.end_time
+    )
+    previous = (
+        select(Event.id, Event.end_time)
+        .where(Event.user_id == placement.user_id, Event.start_time < placement.start_time)
+        .order_by(Event.start_time.desc())
+        .limit(1)
+        .subquery()
+    )
+    running_into = select(literal(index), previous.c.id).where(previous.c.end_time > placement.start_time)
+    return starting_inside, running_into
+
+
+async def find_overlaps(db: AsyncSession, placements: Sequence[Placement]) -> Dict[int, List[int]]:
+    """
+    Map the index of each placement that overlaps stored events to those events' ids.
+
+    Ignored events are filtered out afterwards. That is enough for the event
+    starting last before a placement too: if it is ignored, every earlier
+    event ends before it starts.
+    """
+    conflicts: Dict[int, List[int]] = {}
+    for offset in range(0, len(placements), QUERY_CHUNK_SIZE):
+        chunk = placements[offset:offset + QUERY_CHUNK_SIZE]
+        selects = [
+            statement
+            for index, placement in enumerate(chunk, start=offset)
+            for statement in _overlap_selects(index, placement)
+        ]
+        result = await db.execute(union_all(*selects))
+        for index, event_id in result:
+            placement = placements[index]
+            if event_id != placement.event_id and event_id not in placement.ignore:
+                conflicts.setdefault(index, []).append(event_id)
+    return conflicts
+
+
+def overlapping_placements(placements: Sequence[Placement]) -> Dict[int, int]:
+    """
+    Map each placement overlapping an earlier one for the same user to that earlier one.
+
+    Placements are kept greedily by start time, so dropping the returned
+    ones leaves a set that does not overlap itself.
+    """
+    clashing = {}
+    kept: Dict[int, int] = {}
+    order = sorted(range(len(placements)), key=lambda i: (placements[i].start_time, placements[i].end_time, i))
+    for index in order:
+        placement = placements[index]
+        previous = kept.get(placement.user_id)
+        if previous is not None and placement.start_time < placements[previous].end_time:
+            clashing[index] = previous
+        else:
+            kept[placement.user_id] = index
+    return clashing
+
+
+async def check_overlaps(
+    db: AsyncSession, placements: Sequence[Placement], detail: Optional[str] = None
+) -> None:
+    """Raise EventOverlap if any placement overlaps a stored event or another placement."""
+    conflicts = await find_overlaps(db, placements)
+    clashing = overlapping_placements(placements)
+    if conflicts or clashing:
+        event_ids = [event_id for ids in conflicts.values() for event_id in ids]
+        for pair in clashing.items():
+            event_ids.extend(placements[i].event_id for i in pair if placements[i].event_id is not None)
+        raise EventOverlap(event_ids, detail)
@@ -0,0 +1,20 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def encode_cursor(start_time: datetime, event_id: int) -> str:
+    """Encode a (start_time, id) keyset position as an opaque cursor."""
+    raw = f"{start_time.isoformat()}|{event_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """Decode a cursor produced by encode_cursor, or return None if it is invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        start_time, event_id = raw.split("|", 1)
+        return datetime.fromisoformat(start_time), int(event_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
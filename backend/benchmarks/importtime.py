@@ -0,0 +1,74 @@
+"""
+Worker cold-start benchmark.
+
+Imports the app (--module, default app.main) in fresh interpreters under
+`python -X importtime` and reports the median import time, plus where it
+goes: self time summed per top-level package, and the slowest modules by
+cumulative time. Importing must not touch the database, so any DATABASE_URL
+will do.
+
+    DATABASE_URL=sqlite:///./bench.db SECRET_KEY=x python -m benchmarks.importtime --runs 5
+    python -m benchmarks.importtime --max-ms 1500   # exit 1 above the budget
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_once(module: str) -> List[Tuple[int, int, int, str]]:
+    """(self us, cumulative us, depth, module) for every module the import loaded."""
+    env = {"DATABASE_URL": "sqlite:///./importtime.db", "SECRET_KEY": "importtime", **os.environ}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    records = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return records
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail when the median import takes longer")
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        records = import_once(args.module)
+        # Top-level imports (depth 0) add up to the whole interpreter's imports
+        totals.append(sum(cumulative for _, cumulative, depth, _ in records if depth == 0) / 1000)
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs (min {min(totals):.0f}, max {max(totals):.0f})")
+
+    # The breakdown comes from the last run
+    per_package: Dict[str, int] = defaultdict(int)
+    for self_us, _, _, name in records:
+        per_package[name.split(".")[0]] += self_us
+    print("\nself time by package:")
+    for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:7.1f} ms  {package}")
+    print("\nslowest modules (cumulative):")
+    for _, cumulative, _, name in sorted(records, key=lambda record: -record[1])[:args.top]:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"\nmedian import time {median:.0f} ms exceeds --max-ms {args.max_ms:.0f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Synthetic load benchmark.
+
+Seeds N users with M events each and K pending swap requests, then runs
+concurrent clients issuing a weighted mix of API calls. Reports
+p50/p95/p99 latency and throughput per route, and compares them with a
+saved baseline to flag regressions.
+
+    DATABASE_URL=... SECRET_KEY=... python -m benchmarks.load --mix mixed --seconds 20
+    python -m benchmarks.load --mix read-heavy --save-baseline   # record a new baseline
+
+The exit status is 1 when any route regressed beyond --tolerance.
+Without --base-url the app is served in-process by uvicorn on a free port.
+Seeded users get a unique email prefix, so the run never touches other data.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import httpx
+from sqlalchemy import insert, select, update
+from app.core.security import create_access_token, get_password_hash
+from app.database import Base, SessionLocal, engine
+from app.models.event import Event, EventStatus
+from app.models.swap_request import SwapRequest, SwapRequestStatus
+from app.models.user import User
+from benchmarks.server import running_server
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+# Relative weights of each action per mix
+MIXES = {
+    "read-heavy": {
+        "list_events": 30, "get_event": 20, "swappable_slots": 30, "incoming": 8,
+        "outgoing": 8, "me": 4, "rename_event": 0, "create_swap": 0, "respond": 0,
+    },
+    "mixed": {
+        "list_events": 20, "get_event": 10, "swappable_slots": 25, "incoming": 8,
+        "outgoing": 7, "me": 5, "rename_event": 10, "create_swap": 10, "respond": 5,
+    },
+    "write-heavy": {
+        "list_events": 10, "get_event": 5, "swappable_slots": 15, "incoming": 5,
+        "outgoing": 5, "me": 0, "rename_event": 25, "create_swap": 20, "respond": 15,
+    },
+}
+
+
+class Seed:
+    """Ids and tokens of the seeded data that clients pick from."""
+
+    def __init__(self):
+        self.tokens: Dict[int, str] = {}
+        self.busy_events: Dict[int, List[int]] = defaultdict(list)
+        self.swappable_events: Dict[int, List[int]] = defaultdict(list)
+
+
+def seed(users: int, events_per_user: int, swaps: int, rng: random.Random) -> Seed:
+    """Bulk-insert users, events (half SWAPPABLE) and pending swap requests."""
+    Base.metadata.create_all(bind=engine)
+    prefix = uuid.uuid4().hex[:8]
+    hashed_password = get_password_hash("benchmark")
+    start = datetime.utcnow() + timedelta(days=1)
+    result = Seed()
+
+    with SessionLocal() as db:
+        created = [
+            User(name=f"Load {i}", email=f"load-{prefix}-{i}@example.com", hashed_password=hashed_password)
+            for i in range(users)
+        ]
+        db.add_all(created)
+        db.flush()
+        user_ids = [user.id for user in created]
+
+        rows = [
+            {
+                "title": f"Load event {user_id}-{j}",
+                "start_time": start + timedelta(hours=j, minutes=rng.randrange(0, 60, 15)),
+                "end_time": start + timedelta(hours=j + 1),
+                "status": EventStatus.SWAPPABLE if j % 2 else EventStatus.BUSY,
+                "user_id": user_id,
+            }
+            for user_id in user_ids
+            for j in range(events_per_user)
+        ]
+        db.execute(insert(Event), rows)
+        for event_id, user_id, event_status in db.execute(
+            select(Event.id, Event.user_id, Event.status).where(Event.user_id.in_(user_ids))
+        ):
+            bucket = result.swappable_events if event_status == EventStatus.SWAPPABLE else result.busy_events
+            bucket[user_id].append(event_id)
+
+        # Pair up SWAPPABLE slots of different users into pending requests
+        pool = [(user_id, event_id) for user_id, ids in result.swappable_events.items() for event_id in ids]
+        rng.shuffle(pool)
+        requests, pending = [], []
+        while len(requests) < swaps and len(pool) >= 2:
+            requester, offered = pool.pop()
+            match = next((i for i, (owner, _) in enumerate(pool) if owner != requester), None)
+            if match is None:
+                break
+            receiver, requested = pool.pop(match)
+            requests.append({
+                "requester_slot_id": offered,
+                "requested_slot_id": requested,
+                "requester_id": requester,
+                "receiver_id": receiver,
+                "status": SwapRequestStatus.PENDING,
+            })
+            pending.extend([offered, requested])
+        if requests:
+            db.execute(insert(SwapRequest), requests)
+            db.execute(update(Event).where(Event.id.in_(pending)).values(status=EventStatus.SWAP_PENDING))
+        db.commit()
+
+    pending_ids = set(pending)
+    for user_id in user_ids:
+        result.swappable_events[user_id] = [i for i in result.swappable_events[user_id] if i not in pending_ids]
+        result.tokens[user_id] = create_access_token(subject=user_id)
+    return result
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+class Client(threading.Thread):
+    """One simulated user session issuing the mix's calls until the deadline."""
+
+    def __init__(self, base_url: str, data: Seed, weights: Dict[str, int], deadline: float, seed_value: int):
+        super().__init__(daemon=True)
+        self.http = httpx.Client(base_url=base_url, timeout=30)
+        self.data = data
+        self.deadline = deadline
+        self.random = random.Random(seed_value)
+        self.actions = [name for name, weight in weights.items() if weight]
+        self.weights = [weights[name] for name in self.actions]
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def call(self, route: str, method: str, url: str, user_id: int, **kwargs) -> httpx.Response:
+        headers = {"Authorization": f"Bearer {self.data.tokens[user_id]}"}
+        started = time.perf_counter()
+        response = self.http.request(method, url, headers=headers, **kwargs)
+        self.latencies[route].append((time.perf_counter() - started) * 1000)
+        self.statuses[route][f"{response.status_code // 100}xx"] += 1
+        return response
+
+    def run(self) -> None:
+        user_ids = list(self.data.tokens)
+        while time.monotonic() < self.deadline:
+            action = self.random.choices(self.actions, weights=self.weights)[0]
+            getattr(self, action)(self.random.choice(user_ids))
+        self.http.close()
+
+    def list_events(self, user_id: int) -> None:
+        self.call("GET /api/events", "GET", "/api/events", user_id)
+
+    def get_event(self, user_id: int) -> None:
+        event_id = self.random.choice(self.data.busy_events[user_id])
+        self.call("GET /api/events/{id}", "GET", f"/api/events/{event_id}", user_id)
+
+    def swappable_slots(self, user_id: int) -> Optional[list]:
+        response = self.call("GET /api/swappable-slots", "GET", "/api/swappable-slots", user_id, params={"limit": 50})
+        return response.json() if response.status_code == 200 else None
+
+    def incoming(self, user_id: int) -> Optional[list]:
+        response = self.call("GET /api/swap-requests/incoming", "GET", "/api/swap-requests/incoming", user_id)
+        return response.json() if response.status_code == 200 else None
+
+    def outgoing(self, user_id: int) -> None:
+        self.call("GET /api/swap-requests/outgoing", "GET", "/api/swap-requests/outgoing", user_id)
+
+    def me(self, user_id: int) -> None:
+        self.call("GET /api/auth/me", "GET", "/api/auth/me", user_id)
+
+    def rename_event(self, user_id: int) -> None:
+        event_id = self.random.choice(self.data.busy_events[user_id])
+        body = {"title": f"Renamed {self.random.random():.6f}"}
+        self.call("PUT /api/events/{id}", "PUT", f"/api/events/{event_id}", user_id, json=body)
+
+    def create_swap(self, user_id: int) -> None:
+        mine = self.data.swappable_events[user_id]
+        theirs = self.swappable_slots(user_id)
+        if mine and theirs:
+            body = {"my_slot_id": self.random.choice(mine), "their_slot_id": self.random.choice(theirs)["id"]}
+            self.call("POST /api/swap-request", "POST", "/api/swap-request", user_id, json=body)
+
+    def respond(self, user_id: int) -> None:
+        incoming = self.incoming(user_id)
+        if incoming:
+            request = self.random.choice(incoming)
+            body = {"accept": self.random.random() < 0.5}
+            self.call("POST /api/swap-response/{id}", "POST", f"/api/swap-response/{request['id']}", user_id, json=body)
+
+
+def summarize(clients: List[Client], elapsed: float) -> Dict[str, dict]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for client in clients:
+        for route, samples in client.latencies.items():
+            latencies[route].extend(samples)
+        for route, counts in client.statuses.items():
+            for status_class, count in counts.items():
+                statuses[route][status_class] += count
+    return {
+        route: {
+            "count": len(samples),
+            "rps": len(samples) / elapsed,
+            "p50": percentile(samples, 0.50),
+            "p95": percentile(samples, 0.95),
+            "p99": percentile(samples, 0.99),
+            "statuses": dict(sorted(statuses[route].items())),
+        }
+        for route, samples in sorted(latencies.items())
+    }
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], tolerance: float, min_delta_ms: float) -> Dict[str, List[str]]:
+    """
+    Return the regressions of each route against the baseline.
+
+    A latency percentile regresses when it is more than `tolerance` slower
+    and at least `min_delta_ms` slower (so sub-millisecond noise is
+    ignored). Throughput regresses when it drops by more than `tolerance`.
+    """
+    regressions: Dict[str, List[str]] = {}
+    for route, stats in current.items():
+        before = baseline.get(route)
+        if before is None:
+            continue
+        found = []
+        for key in ("p50", "p95", "p99"):
+            if stats[key] > before[key] * (1 + tolerance) and stats[key] - before[key] >= min_delta_ms:
+                found.append(f"{key} {before[key]:.1f} -> {stats[key]:.1f} ms")
+        if stats["rps"] < before["rps"] * (1 - tolerance):
+            found.append(f"req/s {before['rps']:.1f} -> {stats['rps']:.1f}")
+        if found:
+            regressions[route] = found
+    return regressions
+
+
+def print_report(routes: Dict[str, dict], baseline: Optional[Dict[str, dict]]) -> None:
+    print(f"{'route':<34} {'count':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}  statuses")
+    for route, stats in routes.items():
+        line = (
+            f"{route:<34} {stats['count']:>7} {stats['rps']:>8.1f} "
+            f"{stats['p50']:>8.1f} {stats['p95']:>8.1f} {stats['p99']:>8.1f}  {stats['statuses']}"
+        )
+        if baseline and route in baseline:
+            line += f"  (baseline p95 {baseline[route]['p95']:.1f})"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--events-per-user", type=int, default=20)
+    parser.add_argument("--swaps", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--warmup-seconds", type=float, default=2.0)
+    parser.add_argument("--base-url", help="Benchmark a running server instead of an in-process one")
+    parser.add_argument("--baseline", type=Path, help="Baseline file (default: benchmarks/baselines/<mix>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before flagging")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore latency changes smaller than this")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    data = seed(args.users, args.events_per_user, args.swaps, rng)
+    weights = MIXES[args.mix]
+    baseline_path = args.baseline or BASELINE_DIR / f"{args.mix}.json"
+
+    server = nullcontext(args.base_url) if args.base_url else running_server()
+    with server as base_url:
+        if args.warmup_seconds > 0:
+            warmup = [Client(base_url, data, weights, time.monotonic() + args.warmup_seconds, -1 - i) for i in range(2)]
+            for client in warmup:
+                client.start()
+            for client in warmup:
+                client.join()
+
+        started = time.monotonic()
+        clients = [
+            Client(base_url, data, weights, started + args.seconds, args.seed + i)
+            for i in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - started
+
+    routes = summarize(clients, elapsed)
+    total = sum(stats["count"] for stats in routes.values())
+    print(
+        f"mix={args.mix} clients={args.clients} users={args.users} events/user={args.events_per_user} "
+        f"swaps={args.swaps} elapsed={elapsed:.1f}s total={total / elapsed:.1f} req/s"
+    )
+
+    baseline = None
+    if baseline_path.exists() and not args.save_baseline:
+        baseline = json.loads(baseline_path.read_text())["routes"]
+    print_report(routes, baseline)
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps({
+            "mix": args.mix,
+            "params": {
+                "users": args.users, "events_per_user": args.events_per_user, "swaps": args.swaps,
+                "clients": args.clients, "seconds": args.seconds,
+            },
+            "recorded_at": datetime.utcnow().isoformat(),
+            "routes": routes,
+        }, indent=2) + "\n")
+        print(f"baseline saved to {baseline_path}")
+        return
+
+    if baseline is None:
+        print(f"no baseline at {baseline_path}; run with --save-baseline to record one")
+        return
+
+    regressions = compare(routes, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"REGRESSIONS ({len(regressions)} routes, tolerance {args.tolerance:.0%}):")
+        for route, found in regressions.items():
+            print(f"  - {route}: {', '.join(found)}")
+        raise SystemExit(1)
+    print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
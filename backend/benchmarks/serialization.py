@@ -0,0 +1,91 @@
+"""
+List response serialization benchmark.
+
+Encodes --rows in-memory Event rows the ways a list route can, and reports
+the median time and body size of each:
+
+- response_model: FastAPI's own path (validate every row into
+  EventResponse, dump it, encode with the stdlib JSONResponse)
+- response_model + orjson: the same with ORJSONResponse, the app default
+- row encoder + orjson: what the list routes do now
+- row encoder + msgpack: the same for Accept: application/msgpack
+
+    DATABASE_URL=... SECRET_KEY=... python -m benchmarks.serialization --rows 10000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from app.api.serialization import JSON, MSGPACK, encode_items, row_encoder
+from app.models.event import Event, EventStatus
+from app.schemas.event import EventResponse
+
+
+def make_rows(count: int) -> List[Event]:
+    start = datetime(2030, 1, 1, 9)
+    return [
+        Event(
+            id=i,
+            title=f"Slot {i}",
+            start_time=start + timedelta(minutes=30 * i),
+            end_time=start + timedelta(minutes=30 * i + 30),
+            status=EventStatus.SWAPPABLE,
+            user_id=i % 97 + 1,
+            version=1,
+            created_at=start,
+            updated_at=start,
+        )
+        for i in range(count)
+    ]
+
+
+def time_runs(encode: Callable[[], bytes], repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    field = create_response_field(name="Response", type_=List[EventResponse])
+    encode_event = row_encoder(EventResponse)
+
+    def response_model(response_class):
+        def encode():
+            content = asyncio.run(serialize_response(field=field, response_content=rows, is_coroutine=True))
+            return response_class(content).body
+        return encode
+
+    cases = {
+        "response_model": response_model(JSONResponse),
+        "response_model + orjson": response_model(ORJSONResponse),
+        "row encoder + orjson": lambda: encode_items([encode_event(row) for row in rows], JSON),
+    }
+    try:
+        import msgpack  # noqa: F401
+        cases["row encoder + msgpack"] = lambda: encode_items([encode_event(row) for row in rows], MSGPACK)
+    except ImportError:
+        print("msgpack is not installed; skipping MessagePack")
+
+    baseline = None
+    for name, encode in cases.items():
+        seconds, size = time_runs(encode, args.repeat)
+        baseline = baseline or seconds
+        print(f"{name:>24}: {seconds * 1000:7.1f} ms  {size / 1024:7.0f} KiB  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Swap contention benchmark.
+
+Hammers a small pool of shared slots with concurrent create / accept /
+reject / cancel / re-list calls from N client threads, then reports
+throughput, the conflict rate and whether the final database state still
+satisfies the swap invariants.
+
+    DATABASE_URL=... SECRET_KEY=... python -m benchmarks.swap_contention --clients 16 --seconds 10
+
+Without --base-url the app is served in-process by uvicorn on a free port.
+Seeded users get a unique email prefix, so the run never touches other data.
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Dict, List
+import httpx
+from sqlalchemy import select
+from app.core.security import create_access_token, get_password_hash
+from app.database import Base, SessionLocal, engine
+from app.models.event import Event, EventStatus
+from app.models.swap_request import SwapRequest, SwapRequestStatus
+from app.models.user import User
+from benchmarks.server import running_server
+
+MUTATIONS = ("create", "respond", "cancel", "relist")
+
+
+def seed(users: int, slots_per_user: int) -> Dict[int, str]:
+    """Create users with SWAPPABLE slots; returns user id -> bearer token."""
+    Base.metadata.create_all(bind=engine)
+    prefix = uuid.uuid4().hex[:8]
+    hashed_password = get_password_hash("benchmark")
+    start = datetime.utcnow() + timedelta(days=1)
+
+    with SessionLocal() as db:
+        created = [
+            User(name=f"Bench {i}", email=f"bench-{prefix}-{i}@example.com", hashed_password=hashed_password)
+            for i in range(users)
+        ]
+        db.add_all(created)
+        db.flush()
+        for user in created:
+            for j in range(slots_per_user):
+                slot_start = start + timedelta(hours=j)
+                db.add(Event(
+                    title=f"Bench slot {user.id}-{j}",
+                    start_time=slot_start,
+                    end_time=slot_start + timedelta(hours=1),
+                    status=EventStatus.SWAPPABLE,
+                    user_id=user.id,
+                ))
+        db.commit()
+        return {user.id: create_access_token(subject=user.id) for user in created}
+
+
+def check_invariants(user_ids: List[int], slots_per_user: int) -> List[str]:
+    """Return a description of every swap invariant the final state violates."""
+    violations = []
+    with SessionLocal() as db:
+        slots = db.scalars(select(Event).where(Event.user_id.in_(user_ids))).all()
+        slot_ids = {slot.id for slot in slots}
+        pending = db.scalars(select(SwapRequest).where(
+            SwapRequest.status == SwapRequestStatus.PENDING,
+            SwapRequest.requester_id.in_(user_ids)
+        )).all()
+
+    owners = Counter(slot.user_id for slot in slots)
+    for user_id in user_ids:
+        if owners[user_id] != slots_per_user:
+            violations.append(f"user {user_id} owns {owners[user_id]} slots, expected {slots_per_user}")
+
+    by_id = {slot.id: slot for slot in slots}
+    referenced = Counter()
+    for req in pending:
+        referenced.update([req.requester_slot_id, req.requested_slot_id])
+        requester_slot = by_id.get(req.requester_slot_id)
+        requested_slot = by_id.get(req.requested_slot_id)
+        if requester_slot is None or requester_slot.user_id != req.requester_id:
+            violations.append(f"request {req.id}: requester no longer owns the offered slot")
+        if requested_slot is None or requested_slot.user_id != req.receiver_id:
+            violations.append(f"request {req.id}: receiver no longer owns the requested slot")
+
+    for slot_id in slot_ids:
+        count = referenced[slot_id]
+        is_pending = by_id[slot_id].status == EventStatus.SWAP_PENDING
+        if count > 1:
+            violations.append(f"slot {slot_id} is in {count} pending requests")
+        if is_pending != (count == 1):
+            violations.append(f"slot {slot_id} is {by_id[slot_id].status.value} with {count} pending requests")
+    return violations
+
+
+class Client(threading.Thread):
+    """One simulated user session issuing random swap transitions until the deadline."""
+
+    def __init__(self, base_url: str, tokens: Dict[int, str], deadline: float, seed_value: int):
+        super().__init__(daemon=True)
+        self.http = httpx.Client(base_url=base_url, timeout=30)
+        self.tokens = tokens
+        self.deadline = deadline
+        self.random = random.Random(seed_value)
+        self.outcomes = Counter()
+        self.requests = 0
+
+    def call(self, method: str, url: str, user_id: int, **kwargs) -> httpx.Response:
+        self.requests += 1
+        headers = {"Authorization": f"Bearer {self.tokens[user_id]}"}
+        return self.http.request(method, url, headers=headers, **kwargs)
+
+    def record(self, action: str, response: httpx.Response) -> None:
+        if response.status_code < 300:
+            outcome = "ok"
+        elif response.status_code == 409:
+            outcome = "conflict"
+        elif response.status_code in (400, 404):
+            outcome = "lost_race"
+        else:
+            outcome = "error"
+        self.outcomes[(action, outcome)] += 1
+
+    def run(self) -> None:
+        user_ids = list(self.tokens)
+        actions = {
+            "create": self.create,
+            "respond": self.respond,
+            "cancel": self.cancel,
+            "relist": self.relist,
+        }
+        while time.monotonic() < self.deadline:
+            action = self.random.choices(MUTATIONS, weights=(4, 3, 1, 2))[0]
+            actions[action](self.random.choice(user_ids))
+        self.http.close()
+
+    def create(self, user_id: int) -> None:
+        mine = [e for e in self.call("GET", "/api/events", user_id).json() if e["status"] == "SWAPPABLE"]
+        theirs = [
+            e for e in self.call("GET", "/api/swappable-slots", user_id, params={"limit": 50}).json()
+            if e["user_id"] in self.tokens
+        ]
+        if mine and theirs:
+            body = {"my_slot_id": self.random.choice(mine)["id"], "their_slot_id": self.random.choice(theirs)["id"]}
+            self.record("create", self.call("POST", "/api/swap-request", user_id, json=body))
+
+    def respond(self, user_id: int) -> None:
+        incoming = self.call("GET", "/api/swap-requests/incoming", user_id).json()
+        if incoming:
+            request = self.random.choice(incoming)
+            body = {"accept": self.random.random() < 0.5}
+            self.record("respond", self.call("POST", f"/api/swap-response/{request['id']}", user_id, json=body))
+
+    def cancel(self, user_id: int) -> None:
+        outgoing = [r for r in self.call("GET", "/api/swap-requests/outgoing", user_id).json() if r["status"] == "PENDING"]
+        if outgoing:
+            request = self.random.choice(outgoing)
+            self.record("cancel", self.call("DELETE", f"/api/swap-request/{request['id']}", user_id))
+
+    def relist(self, user_id: int) -> None:
+        busy = [e for e in self.call("GET", "/api/events", user_id).json() if e["status"] == "BUSY"]
+        if busy:
+            event = self.random.choice(busy)
+            body = {"status": "SWAPPABLE"}
+            self.record("relist", self.call("PUT", f"/api/events/{event['id']}", user_id, json=body))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--slots-per-user", type=int, default=3)
+    parser.add_argument("--base-url", help="Benchmark a running server instead of an in-process one")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tokens = seed(args.users, args.slots_per_user)
+
+    server = nullcontext(args.base_url) if args.base_url else running_server()
+    with server as base_url:
+        started = time.monotonic()
+        clients = [
+            Client(base_url, tokens, started + args.seconds, args.seed + i)
+            for i in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - started
+
+    outcomes = sum((client.outcomes for client in clients), Counter())
+    total_requests = sum(client.requests for client in clients)
+    transitions = sum(outcomes.values())
+    conflicts = sum(n for (_, outcome), n in outcomes.items() if outcome == "conflict")
+
+    print(f"clients={args.clients} users={args.users} slots/user={args.slots_per_user} elapsed={elapsed:.1f}s")
+    print(f"throughput: {total_requests / elapsed:.1f} req/s, {transitions / elapsed:.1f} transitions/s")
+    print(f"conflict rate: {conflicts / max(transitions, 1):.1%} ({conflicts}/{transitions})")
+    for action in MUTATIONS:
+        counts = {outcome: n for (name, outcome), n in sorted(outcomes.items()) if name == action}
+        print(f"  {action:<8} {counts}")
+
+    violations = check_invariants(list(tokens), args.slots_per_user)
+    if violations:
+        print(f"INVARIANTS VIOLATED ({len(violations)}):")
+        for violation in violations:
+            print(f"  - {violation}")
+        raise SystemExit(1)
+    print("invariants: ok")
+
+
+if __name__ == "__main__":
+    main()
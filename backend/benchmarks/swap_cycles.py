@@ -0,0 +1,160 @@
+"""
+Multi-party swap matching benchmark.
+
+Builds an intent graph of --intents edges over --slots slots: a share of
+the slots is wired into hidden rings of 2 to --max-length owners and the
+rest of the intents are random noise. Reports how long the cycle search
+takes and how many owners it clears.
+
+    python -m benchmarks.swap_cycles --intents 100000
+    DATABASE_URL=... SECRET_KEY=... python -m benchmarks.swap_cycles --intents 100000 --db
+
+With --db the graph is also seeded into the database (one user per slot)
+and one run of the matching job is timed end to end: loading the intents,
+matching, and writing every proposal (with SWAP_CYCLE_MAX_LENGTH from the
+settings).
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import List, Tuple
+from sqlalchemy import insert, select
+from app.utils.cycles import IntentGraph
+
+
+def generate(slots: int, intents: int, max_length: int, ring_share: float, rng: random.Random) -> List[Tuple[int, int]]:
+    """(offered, wanted) slot pairs: hidden rings plus random noise, shuffled."""
+    nodes = list(range(slots))
+    rng.shuffle(nodes)
+    edges = set()
+    position = 0
+    ring_slots = int(slots * ring_share)
+    while position + 2 <= ring_slots:
+        length = rng.randint(2, max_length)
+        ring = nodes[position:position + length]
+        position += length
+        for i, node in enumerate(ring):
+            edges.add((node, ring[(i + 1) % len(ring)]))
+    while len(edges) < intents:
+        offered, wanted = rng.randrange(slots), rng.randrange(slots)
+        if offered != wanted:
+            edges.add((offered, wanted))
+    edges = list(edges)
+    rng.shuffle(edges)
+    return edges[:intents]
+
+
+def run_in_memory(edges: List[Tuple[int, int]], max_length: int, max_expansions: int) -> None:
+    started = time.perf_counter()
+    graph = IntentGraph()
+    for intent_id, (offered, wanted) in enumerate(edges):
+        graph.add_intent(intent_id, offered, wanted)
+    built = time.perf_counter()
+    cycles = graph.find_cycles(max_length, max_expansions)
+    finished = time.perf_counter()
+
+    lengths = {}
+    for cycle in cycles:
+        lengths[len(cycle)] = lengths.get(len(cycle), 0) + 1
+    print(
+        f"in-memory: {len(edges)} intents, graph {1000 * (built - started):.0f} ms, "
+        f"search {1000 * (finished - built):.0f} ms, {len(cycles)} cycles clearing "
+        f"{sum(len(c) for c in cycles)} owners, by length {dict(sorted(lengths.items()))}"
+    )
+
+
+def seed(edges: List[Tuple[int, int]], slots: int) -> None:
+    """Insert one user and SWAPPABLE slot per graph node plus the intents."""
+    from app.core.security import get_password_hash
+    from app.database import Base, SessionLocal, engine
+    from app.models.event import Event, EventStatus
+    from app.models.swap_cycle import SwapIntent, SwapIntentStatus
+    from app.models.user import User
+
+    Base.metadata.create_all(bind=engine)
+    prefix = uuid.uuid4().hex[:8]
+    hashed_password = get_password_hash("benchmark")
+    start = datetime.utcnow() + timedelta(days=1)
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {"name": f"Cycle {i}", "email": f"cycle-{prefix}-{i}@example.com", "hashed_password": hashed_password}
+            for i in range(slots)
+        ])
+        user_ids = db.scalars(
+            select(User.id).where(User.email.like(f"cycle-{prefix}-%")).order_by(User.id)
+        ).all()
+        db.execute(insert(Event), [
+            {
+                "title": f"Cycle slot {i}",
+                "start_time": start + timedelta(minutes=i),
+                "end_time": start + timedelta(minutes=i + 60),
+                "status": EventStatus.SWAPPABLE,
+                "user_id": user_id,
+            }
+            for i, user_id in enumerate(user_ids)
+        ])
+        slot_ids = dict(db.execute(
+            select(Event.user_id, Event.id).join(User, User.id == Event.user_id)
+            .where(User.email.like(f"cycle-{prefix}-%"))
+        ).all())
+        db.execute(insert(SwapIntent), [
+            {
+                "user_id": user_ids[offered],
+                "offered_slot_id": slot_ids[user_ids[offered]],
+                "wanted_slot_id": slot_ids[user_ids[wanted]],
+                "status": SwapIntentStatus.OPEN,
+            }
+            for offered, wanted in edges
+        ])
+        db.commit()
+
+
+async def match_once():
+    from app.api.matching import propose_swap_cycles
+    from app.database import dispose_engines, get_db
+
+    try:
+        async with asynccontextmanager(get_db)() as db:
+            return await propose_swap_cycles(db)
+    finally:
+        await dispose_engines()
+
+
+def run_against_database(edges: List[Tuple[int, int]], slots: int) -> None:
+    started = time.perf_counter()
+    seed(edges, slots)
+    print(f"seeded {slots} users/slots and {len(edges)} intents in {time.perf_counter() - started:.1f} s")
+
+    started = time.perf_counter()
+    result = asyncio.run(match_once())
+    elapsed = time.perf_counter() - started
+    print(
+        f"matching run: {elapsed * 1000:.0f} ms for {result.intents} open intents, "
+        f"{len(result.proposed)} cycles proposed"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--intents", type=int, default=100000)
+    parser.add_argument("--slots", type=int, help="Slots in the graph (default: 60%% of --intents)")
+    parser.add_argument("--max-length", type=int, default=4)
+    parser.add_argument("--max-expansions", type=int, default=10000)
+    parser.add_argument("--ring-share", type=float, default=0.5, help="Share of slots wired into hidden rings")
+    parser.add_argument("--db", action="store_true", help="Also seed the database and time one matching run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    slots = args.slots or max(2, int(args.intents * 0.6))
+    edges = generate(slots, args.intents, args.max_length, args.ring_share, random.Random(args.seed))
+    run_in_memory(edges, args.max_length, args.max_expansions)
+    if args.db:
+        run_against_database(edges, slots)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,86 @@
+import asyncio
 import pytest
+from datetime import datetime, timedelta
+from fastapi import status
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, ThreadedSession, get_db
+from app.core.metrics import instrument_engine
+from app.core.principal_cache import principal_cache
+from app.core.query_budget import QueryBudget, track_request_statements
+from app.core.slot_cache import slot_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs every request on its own event loop, so async connections
+# must not outlive a request
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine)
+instrument_engine(async_engine)
+track_request_statements(engine)
+track_request_statements(async_engine)
+
+
+def get_auth_header(client, name="Test User", email="test@example.com"):
+    response = client.post(
+        "/api/auth/signup",
+        json={
+            "name": name,
+            "email": email,
+            "password": "testpassword123"
+        }
+    )
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_swappable_slot(client, headers, title, days=1, hours=1):
+    start_time = datetime.utcnow() + timedelta(days=days)
+    end_time = start_time + timedelta(hours=hours)
+
+    response = client.post(
+        "/api/events",
+        json={
+            "title": title,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat()
+        },
+        headers=headers
+    )
+    event_id = response.json()["id"]
+    client.put(f"/api/events/{event_id}", json={"status": "SWAPPABLE"}, headers=headers)
+    return event_id
+
+
+def create_swap_requests(client, alice, bob, count, first_day=1):
+    for i in range(count):
+        my_slot = create_swappable_slot(client, alice, f"Alice slot {i}", days=first_day + i)
+        their_slot = create_swappable_slot(client, bob, f"Bob slot {i}", days=first_day + i)
+        response = client.post(
+            "/api/swap-request",
+            json={"my_slot_id": my_slot, "their_slot_id": their_slot},
+            headers=alice
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
 
 @pytest.fixture(scope="function")
 def db():
+    # User ids restart with every fresh schema, so cached principals and slots must go too
+    principal_cache.clear()
+    asyncio.run(slot_cache.clear())
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
     try:
@@ -26,12 +92,53 @@ def db():
 
 @pytest.fixture(scope="function")
 def client(db):
-    def override_get_db():
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="function")
+def sync_client(db):
+    """Client running the routes on the sync driver path (DB_ASYNC=False)."""
+    async def override_get_db():
+        session = ThreadedSession(TestingSessionLocal(expire_on_commit=False))
         try:
-            yield db
+            yield session
         finally:
-            pass
-    
+            await session.close()
+
     app.dependency_overrides[get_db] = override_get_db
     yield TestClient(app)
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    `with query_budget(n): ...` fails the test when the block executes more
+    than n statements on the test database.
+    """
+    def budget(max_statements, label="block"):
+        return QueryBudget(engine, async_engine, max_statements=max_statements, label=label)
+
+    return budget
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Authorization headers for a freshly signed-up Test User."""
+    return get_auth_header(client)
+
+
+@pytest.fixture
+def alice(client):
+    return get_auth_header(client, "Alice", "alice@example.com")
+
+
+@pytest.fixture
+def bob(client):
+    return get_auth_header(client, "Bob", "bob@example.com")
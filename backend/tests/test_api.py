@@ -1,8 +1,29 @@
+"""
+End-to-end walkthrough against a running server.
+
+Start the server with QUERY_DEBUG_HEADERS=true: every call asserts the
+statement budget of its route from the X-Query-Count response header.
+
+    QUERY_DEBUG_HEADERS=true uvicorn app.main:app
+    python tests/test_api.py
+"""
+import os
 import requests
 from datetime import datetime, timedelta
 import json
 
-BASE_URL = "http://localhost:8000/api"
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000/api")
+
+def check_budget(response, budget):
+    """Fail when the server executed more statements for the call than `budget`."""
+    count = response.headers.get("X-Query-Count")
+    request = f"{response.request.method} {response.request.url}"
+    assert count is not None, f"{request}: no X-Query-Count header, start the server with QUERY_DEBUG_HEADERS=true"
+    assert int(count) <= budget, (
+        f"{request} executed {count} statements, budget is {budget}; "
+        f"repeated: {response.headers.get('X-Query-Duplicates', 'none')}"
+    )
+    return response
 
 def print_section(title):
     print(f"\n{'='*60}")
@@ -12,14 +33,14 @@ def print_section(title):
 # ==================== User A ====================
 print_section("1. Creating User A (Alice)")
 
-user_a = requests.post(
+user_a = check_budget(requests.post(
     f"{BASE_URL}/auth/signup",
     json={
         "name": "Alice",
         "email": "alice@example.com",
         "password": "password123"
     }
-)
+), 3)
 token_a = user_a.json()["access_token"]
 user_a_id = user_a.json()["user"]["id"]
 print(f"✓ User A created: {user_a.json()['user']['name']}")
@@ -29,14 +50,14 @@ print(f"  Email: {user_a.json()['user']['email']}")
 # ==================== User B ====================
 print_section("2. Creating User B (Bob)")
 
-user_b = requests.post(
+user_b = check_budget(requests.post(
     f"{BASE_URL}/auth/signup",
     json={
         "name": "Bob",
         "email": "bob@example.com",
         "password": "password123"
     }
-)
+), 3)
 token_b = user_b.json()["access_token"]
 user_b_id = user_b.json()["user"]["id"]
 print(f"✓ User B created: {user_b.json()['user']['name']}")
@@ -50,7 +71,7 @@ print_section("3. Creating Events")
 start_a = datetime.utcnow() + timedelta(days=1, hours=10)
 end_a = start_a + timedelta(hours=1)
 
-event_a = requests.post(
+event_a = check_budget(requests.post(
     f"{BASE_URL}/events",
     headers={"Authorization": f"Bearer {token_a}"},
     json={
@@ -58,7 +79,7 @@ event_a = requests.post(
         "start_time": start_a.isoformat(),
         "end_time": end_a.isoformat()
     }
-)
+), 4)
 event_a_id = event_a.json()["id"]
 print(f"✓ Alice created event:")
 print(f"  Title: {event_a.json()['title']}")
@@ -69,7 +90,7 @@ print(f"  ID: {event_a_id}")
 start_b = datetime.utcnow() + timedelta(days=2, hours=14)
 end_b = start_b + timedelta(hours=1)
 
-event_b = requests.post(
+event_b = check_budget(requests.post(
     f"{BASE_URL}/events",
     headers={"Authorization": f"Bearer {token_b}"},
     json={
@@ -77,7 +98,7 @@ event_b = requests.post(
         "start_time": start_b.isoformat(),
         "end_time": end_b.isoformat()
     }
-)
+), 4)
 event_b_id = event_b.json()["id"]
 print(f"\n✓ Bob created event:")
 print(f"  Title: {event_b.json()['title']}")
@@ -88,38 +109,38 @@ print(f"  ID: {event_b_id}")
 print_section("4. Making Events Swappable")
 
 # Alice makes her event swappable
-requests.put(
+check_budget(requests.put(
     f"{BASE_URL}/events/{event_a_id}",
     headers={"Authorization": f"Bearer {token_a}"},
     json={"status": "SWAPPABLE"}
-)
+), 3)
 print(f"✓ Alice marked event {event_a_id} as SWAPPABLE")
 
 # Bob makes his event swappable
-requests.put(
+check_budget(requests.put(
     f"{BASE_URL}/events/{event_b_id}",
     headers={"Authorization": f"Bearer {token_b}"},
     json={"status": "SWAPPABLE"}
-)
+), 3)
 print(f"✓ Bob marked event {event_b_id} as SWAPPABLE")
 
 # ==================== View Marketplace ====================
 print_section("5. Viewing Marketplace")
 
 # Alice views swappable slots
-slots_for_alice = requests.get(
+slots_for_alice = check_budget(requests.get(
     f"{BASE_URL}/swappable-slots",
     headers={"Authorization": f"Bearer {token_a}"}
-)
+), 1)
 print(f"✓ Alice sees {len(slots_for_alice.json())} swappable slot(s):")
 for slot in slots_for_alice.json():
     print(f"  - {slot['title']} (ID: {slot['id']})")
 
 # Bob views swappable slots
-slots_for_bob = requests.get(
+slots_for_bob = check_budget(requests.get(
     f"{BASE_URL}/swappable-slots",
     headers={"Authorization": f"Bearer {token_b}"}
-)
+), 1)
 print(f"\n✓ Bob sees {len(slots_for_bob.json())} swappable slot(s):")
 for slot in slots_for_bob.json():
     print(f"  - {slot['title']} (ID: {slot['id']})")
@@ -127,14 +148,14 @@ for slot in slots_for_bob.json():
 # ==================== Create Swap Request ====================
 print_section("6. Creating Swap Request")
 
-swap_request = requests.post(
+swap_request = check_budget(requests.post(
     f"{BASE_URL}/swap-request",
     headers={"Authorization": f"Bearer {token_a}"},
     json={
         "my_slot_id": event_a_id,
         "their_slot_id": event_b_id
     }
-)
+), 6)
 swap_req_id = swap_request.json()["id"]
 print(f"✓ Alice requested a swap:")
 print(f"  Request ID: {swap_req_id}")
@@ -146,19 +167,19 @@ print(f"  Status: {swap_request.json()['status']}")
 print_section("7. Viewing Swap Requests")
 
 # Alice's outgoing requests
-outgoing_alice = requests.get(
+outgoing_alice = check_budget(requests.get(
     f"{BASE_URL}/swap-requests/outgoing",
     headers={"Authorization": f"Bearer {token_a}"}
-)
+), 1)
 print(f"✓ Alice's outgoing requests: {len(outgoing_alice.json())}")
 for req in outgoing_alice.json():
     print(f"  - Request {req['id']}: {req['status']}")
 
 # Bob's incoming requests
-incoming_bob = requests.get(
+incoming_bob = check_budget(requests.get(
     f"{BASE_URL}/swap-requests/incoming",
     headers={"Authorization": f"Bearer {token_b}"}
-)
+), 1)
 print(f"\n✓ Bob's incoming requests: {len(incoming_bob.json())}")
 for req in incoming_bob.json():
     print(f"  - Request {req['id']} from {req['requester_name']}")
@@ -168,11 +189,11 @@ for req in incoming_bob.json():
 # ==================== Accept Swap ====================
 print_section("8. Accepting Swap Request")
 
-accept_response = requests.post(
+accept_response = check_budget(requests.post(
     f"{BASE_URL}/swap-response/{swap_req_id}",
     headers={"Authorization": f"Bearer {token_b}"},
     json={"accept": True}
-)
+), 7)
 print(f"✓ Bob accepted the swap request")
 print(f"  Status: {accept_response.json()['status']}")
 
@@ -180,19 +201,19 @@ print(f"  Status: {accept_response.json()['status']}")
 print_section("9. Verifying Swap Result")
 
 # Check Alice's events
-alice_events = requests.get(
+alice_events = check_budget(requests.get(
     f"{BASE_URL}/events",
     headers={"Authorization": f"Bearer {token_a}"}
-).json()
+), 2).json()
 print(f"✓ Alice's events after swap:")
 for event in alice_events:
     print(f"  - {event['title']} (Status: {event['status']})")
 
 # Check Bob's events
-bob_events = requests.get(
+bob_events = check_budget(requests.get(
     f"{BASE_URL}/events",
     headers={"Authorization": f"Bearer {token_b}"}
-).json()
+), 2).json()
 print(f"\n✓ Bob's events after swap:")
 for event in bob_events:
     print(f"  - {event['title']} (Status: {event['status']})")
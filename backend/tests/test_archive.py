@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta
+from fastapi import status
+from sqlalchemy import delete, func, select, update
+from app.api import archive
+from app.api.archive import DELETED_SLOT_TITLE, SwapArchiveScheduler, archive_finished_swap_requests
+from app.models.event import Event
+from app.models.swap_request import SwapRequest, SwapRequestArchive
+from tests.conftest import TestingAsyncSessionLocal
+from tests.conftest import create_swap_requests, get_auth_header
+
+
+def run_archive(age=timedelta(hours=24), batch_size=1000):
+    async def run():
+        async with TestingAsyncSessionLocal() as session:
+            return await archive_finished_swap_requests(session, age, batch_size)
+
+    return asyncio.run(run())
+
+
+def decided_requests(client, db):
+    """Alice sends three requests; Bob accepts one, rejects one and leaves one pending."""
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 3)
+    accepted, rejected, pending = [r["id"] for r in client.get("/api/swap-requests/incoming", headers=bob).json()]
+    for request_id, accept in [(accepted, True), (rejected, False)]:
+        response = client.post(f"/api/swap-response/{request_id}", json={"accept": accept}, headers=bob)
+        assert response.status_code == status.HTTP_200_OK
+    return alice, bob, accepted, rejected, pending
+
+
+def backdate(db, ids, days=2):
+    db.execute(
+        update(SwapRequest).where(SwapRequest.id.in_(ids))
+        .values(updated_at=datetime.utcnow() - timedelta(days=days))
+    )
+    db.commit()
+
+
+def test_finished_requests_move_to_the_archive(client, db, query_budget):
+    alice, bob, accepted, rejected, pending = decided_requests(client, db)
+    assert run_archive() == 0
+    # Decided requests are in the history straight away, not archived yet
+    history = client.get("/api/swap-requests/history", params={"role": "received"}, headers=bob).json()
+    assert [(item["id"], item["archived_at"]) for item in history] == [(rejected, None), (accepted, None)]
+    assert history[0]["requester_slot_title"] == "Alice slot 1"
+
+    backdate(db, [accepted, rejected, pending])
+    archived_before = archive.archived_requests.value()
+    # Two full batches of one (claim, copy, delete), then an empty claim
+    with query_budget(7, "swap request archiving"):
+        assert run_archive(batch_size=1) == 2
+
+    assert archive.archived_requests.value() - archived_before == 2
+    assert db.scalars(select(SwapRequest.id)).all() == [pending]
+    assert db.scalar(select(func.count()).select_from(SwapRequestArchive)) == 2
+    assert [r["id"] for r in client.get("/api/swap-requests/outgoing", headers=alice).json()] == [pending]
+
+    history = client.get("/api/swap-requests/history", headers=alice)
+    assert history.status_code == status.HTTP_200_OK
+    items = history.json()
+    assert [item["id"] for item in items] == [rejected, accepted]
+    assert {item["id"]: item["status"] for item in items} == {accepted: "ACCEPTED", rejected: "REJECTED"}
+    assert items[0]["requester_name"] == "Alice" and items[0]["receiver_name"] == "Bob"
+    assert items[0]["requester_slot_title"] == "Alice slot 1"
+    assert items[0]["archived_at"]
+
+    received = client.get("/api/swap-requests/history", params={"role": "received"}, headers=bob).json()
+    assert [item["id"] for item in received] == [rejected, accepted]
+    assert client.get("/api/swap-requests/history", params={"role": "sent"}, headers=bob).json() == []
+
+
+def pages(client, path, headers, **params):
+    """Ids on each page of a listing, following X-Next-Cursor."""
+    ids = []
+    while True:
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        ids.append([item["id"] for item in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            return ids
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+
+def test_requests_whose_slot_is_gone_are_archived(client, db):
+    alice, bob, accepted, rejected, pending = decided_requests(client, db)
+    request = db.get(SwapRequest, rejected)
+    # SQLite does not enforce the foreign key, so the slot row can vanish
+    db.execute(delete(Event).where(Event.id == request.requester_slot_id))
+    db.commit()
+    backdate(db, [accepted, rejected])
+
+    assert run_archive() == 2
+
+    assert db.scalars(select(SwapRequest.id)).all() == [pending]
+    titles = dict(db.execute(select(SwapRequestArchive.id, SwapRequestArchive.requester_slot_title)).all())
+    assert titles == {accepted: "Alice slot 0", rejected: DELETED_SLOT_TITLE}
+
+
+def test_history_is_paginated(client, db):
+    alice, bob, accepted, rejected, pending = decided_requests(client, db)
+    # One archived request and one not archived yet, merged in one listing
+    backdate(db, [accepted])
+    assert run_archive() == 1
+
+    assert pages(client, "/api/swap-requests/history", bob, limit=1) == [[rejected], [accepted]]
+
+    response = client.get("/api/swap-requests/history", params={"cursor": "garbage"}, headers=bob)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_live_lists_are_paginated(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 3)
+    oldest, middle, newest = [r["id"] for r in client.get("/api/swap-requests/incoming", headers=bob).json()]
+
+    assert pages(client, "/api/swap-requests/incoming", bob, limit=2) == [[oldest, middle], [newest]]
+    assert pages(client, "/api/swap-requests/outgoing", alice, limit=2) == [[newest, middle], [oldest]]
+    response = client.get("/api/swap-requests/outgoing", params={"cursor": "garbage"}, headers=alice)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_archiving_can_be_disabled():
+    assert not SwapArchiveScheduler(0, 300, 1000).enabled
+    assert SwapArchiveScheduler(24, 300, 1000).enabled
@@ -1,5 +1,14 @@
+import asyncio
+import threading
 import pytest
 from fastapi import status
+from app.api.deps import user_id_from_token
+from app.core import security
+from app.database import get_db
+from app.main import app
+from app.core.security import HashingExecutor, HashingQueueFull, hashing_executor
+from app.core.principal_cache import principal_cache
+from app.models.user import User
 
 
 def test_signup(client):
@@ -83,4 +92,211 @@ def test_login_wrong_password(client):
             "password": "wrongpassword"
         }
     )
-    assert response.status_code == status.HTTP_401_UNAUTHORIZED
\ No newline at end of file
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_repeat_requests_use_principal_cache(client):
+    signup = client.post(
+        "/api/auth/signup",
+        json={
+            "name": "Test User",
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    headers = {"Authorization": f"Bearer {signup.json()['access_token']}"}
+    
+    client.get("/api/auth/me", headers=headers)
+    hits_before = principal_cache.stats()["hits"]
+    response = client.get("/api/auth/me", headers=headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["name"] == "Test User"
+    assert principal_cache.stats()["hits"] == hits_before + 1
+
+
+def test_principal_cache_invalidated_on_user_update(client, db):
+    signup = client.post(
+        "/api/auth/signup",
+        json={
+            "name": "Test User",
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    headers = {"Authorization": f"Bearer {signup.json()['access_token']}"}
+    client.get("/api/auth/me", headers=headers)
+    
+    user = db.get(User, signup.json()["user"]["id"])
+    user.name = "Renamed User"
+    db.commit()
+    
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.json()["name"] == "Renamed User"
+
+
+def test_principal_cache_not_refilled_before_commit(client, db):
+    signup = client.post(
+        "/api/auth/signup",
+        json={
+            "name": "Test User",
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    headers = {"Authorization": f"Bearer {signup.json()['access_token']}"}
+    client.get("/api/auth/me", headers=headers)
+    
+    user = db.get(User, signup.json()["user"]["id"])
+    user.name = "Renamed User"
+    db.flush()
+    
+    # The rename is flushed but not committed; the cache must not be
+    # refilled with the old row and kept past the commit
+    assert client.get("/api/auth/me", headers=headers).json()["name"] == "Test User"
+    db.commit()
+    
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.json()["name"] == "Renamed User"
+
+
+def test_principal_cache_kept_on_rollback(client, db):
+    signup = client.post(
+        "/api/auth/signup",
+        json={
+            "name": "Test User",
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    headers = {"Authorization": f"Bearer {signup.json()['access_token']}"}
+    client.get("/api/auth/me", headers=headers)
+    invalidations_before = principal_cache.stats()["invalidations"]
+    
+    user = db.get(User, signup.json()["user"]["id"])
+    user.name = "Renamed User"
+    db.flush()
+    db.rollback()
+    db.commit()
+    
+    assert principal_cache.stats()["invalidations"] == invalidations_before
+
+
+def test_current_user_id_skips_database(client):
+    signup = client.post(
+        "/api/auth/signup",
+        json={
+            "name": "Test User",
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    
+    assert user_id_from_token(signup.json()["access_token"]) == signup.json()["user"]["id"]
+
+
+
+def test_hashing_executor_rejects_when_full():
+    executor = HashingExecutor(workers=1, max_queue=0)
+    
+    async def submit_while_busy():
+        release = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        busy = asyncio.create_task(
+            executor.run(lambda: asyncio.run_coroutine_threadsafe(release.wait(), loop).result())
+        )
+        await asyncio.sleep(0.05)
+        with pytest.raises(HashingQueueFull):
+            await executor.run(lambda: None)
+        release.set()
+        await busy
+    
+    asyncio.run(submit_while_busy())
+    assert executor.stats()["rejected"] == 1
+    assert executor.stats()["pending"] == 0
+    executor.shutdown()
+
+
+def test_hashing_executor_counts_cancelled_work_until_done():
+    executor = HashingExecutor(workers=1, max_queue=0)
+    release = threading.Event()
+    
+    async def cancel_while_hashing():
+        busy = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        busy.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await busy
+        # The thread is still hashing, so the pool is still full
+        assert executor.stats()["pending"] == 1
+        release.set()
+        while executor.stats()["pending"]:
+            await asyncio.sleep(0.01)
+    
+    try:
+        asyncio.run(cancel_while_hashing())
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_auth_releases_the_connection_while_hashing(client, monkeypatch):
+    sessions = []
+    override_get_db = app.dependency_overrides[get_db]
+    
+    async def recording_get_db():
+        async for session in override_get_db():
+            sessions.append(session)
+            yield session
+    
+    def check_released(fn):
+        def run(*args):
+            assert not sessions[-1].in_transaction()
+            return fn(*args)
+        return run
+    
+    app.dependency_overrides[get_db] = recording_get_db
+    monkeypatch.setattr(security, "get_password_hash", check_released(security.get_password_hash))
+    monkeypatch.setattr(security, "verify_password", check_released(security.verify_password))
+    
+    signup = client.post(
+        "/api/auth/signup",
+        json={
+            "name": "Test User",
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    login = client.post(
+        "/api/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    
+    assert signup.status_code == status.HTTP_201_CREATED
+    assert login.status_code == status.HTTP_200_OK
+    assert login.json()["user"] == signup.json()["user"]
+
+
+def test_login_returns_503_when_hashing_saturated(client, monkeypatch):
+    client.post(
+        "/api/auth/signup",
+        json={
+            "name": "Test User",
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    monkeypatch.setattr(hashing_executor, "max_pending", 0)
+    
+    response = client.post(
+        "/api/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,202 @@
+from datetime import datetime, timedelta
+from fastapi import status
+from sqlalchemy import event as sa_event
+from app.utils.ical import ICalendarParser, fold_line
+from tests.conftest import async_engine, get_auth_header
+
+SAMPLE_CALENDAR = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "BEGIN:VEVENT",
+    "SUMMARY:Algorithms\\, lecture",
+    "DTSTART:20300107T090000Z",
+    "DTEND:20300107T103000Z",
+    "BEGIN:VALARM",
+    "TRIGGER:-PT15M",
+    "DTSTART:19990101T000000Z",
+    "END:VALARM",
+    "END:VEVENT",
+    "BEGIN:VEVENT",
+    "SUMMARY:A very long seminar title that is folded across several content lin",
+    " es by the exporting calendar",
+    "DTSTART;TZID=Europe/Paris:20300708T140000",
+    "DURATION:PT2H",
+    "END:VEVENT",
+    "BEGIN:VEVENT",
+    "SUMMARY:Holiday",
+    "DTSTART;VALUE=DATE:20301225",
+    "END:VEVENT",
+    "BEGIN:VEVENT",
+    "SUMMARY:No end",
+    "DTSTART:20300101T090000Z",
+    "END:VEVENT",
+    "END:VCALENDAR",
+    "",
+])
+
+
+def create_event(client, headers, title, days=1):
+    start_time = datetime.utcnow() + timedelta(days=days)
+    response = client.post(
+        "/api/events",
+        json={
+            "title": title,
+            "start_time": start_time.isoformat(),
+            "end_time": (start_time + timedelta(hours=1)).isoformat()
+        },
+        headers=headers
+    )
+    return response.json()["id"]
+
+
+def count_statements(callable_):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sa_event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = callable_()
+    finally:
+        sa_event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return response, statements
+
+
+def test_parser_handles_folding_time_zones_and_durations():
+    parser = ICalendarParser()
+    for line in SAMPLE_CALENDAR.split("\n"):
+        parser.feed(line)
+    parser.close()
+    
+    events = parser.take_events()
+    assert [(e.title, e.start_time, e.end_time) for e in events] == [
+        ("Algorithms, lecture", datetime(2030, 1, 7, 9), datetime(2030, 1, 7, 10, 30)),
+        (
+            "A very long seminar title that is folded across several content lines by the exporting calendar",
+            datetime(2030, 7, 8, 12),
+            datetime(2030, 7, 8, 14),
+        ),
+        ("Holiday", datetime(2030, 12, 25), datetime(2030, 12, 26)),
+    ]
+    assert parser.skipped == 1
+
+
+def test_fold_line_keeps_lines_short():
+    folded = fold_line("SUMMARY:" + "é" * 100)
+    lines = folded.split("\r\n")[:-1]
+    assert all(len(line.encode()) <= 75 for line in lines)
+    assert "".join(line[1:] if i else line for i, line in enumerate(lines)) == "SUMMARY:" + "é" * 100
+
+
+def test_feed_exports_events_with_token_query(client):
+    headers = get_auth_header(client)
+    create_event(client, headers, "Standup, daily", days=2)
+    create_event(client, headers, "Review", days=1)
+    token = headers["Authorization"].split()[1]
+    
+    response = client.get("/api/calendar/feed.ics", params={"token": token})
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/calendar")
+    body = response.text
+    assert body.startswith("BEGIN:VCALENDAR\r\n") and body.endswith("END:VCALENDAR\r\n")
+    assert body.index("SUMMARY:Review") < body.index("SUMMARY:Standup\\, daily")
+    assert body.count("BEGIN:VEVENT") == 2
+
+
+def test_feed_not_modified_costs_one_query(client):
+    headers = get_auth_header(client)
+    event_id = create_event(client, headers, "Review")
+    etag = client.get("/api/calendar/feed.ics", headers=headers).headers["etag"]
+    
+    response, statements = count_statements(
+        lambda: client.get("/api/calendar/feed.ics", headers={**headers, "If-None-Match": etag})
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["etag"] == etag
+    assert len(statements) == 1
+    
+    client.put(f"/api/events/{event_id}", json={"title": "Renamed"}, headers=headers)
+    changed = client.get("/api/calendar/feed.ics", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == status.HTTP_200_OK
+    assert "SUMMARY:Renamed" in changed.text
+    
+    etag = changed.headers["etag"]
+    create_event(client, headers, "Second", days=3)
+    client.delete(f"/api/events/{event_id}", headers=headers)
+    response = client.get("/api/calendar/feed.ics", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_feed_requires_token(client):
+    assert client.get("/api/calendar/feed.ics").status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_feed_on_sync_driver(sync_client):
+    headers = get_auth_header(sync_client)
+    create_event(sync_client, headers, "Review")
+    
+    response = sync_client.get("/api/calendar/feed.ics", headers=headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert "SUMMARY:Review" in response.text
+
+
+def test_import_bulk_inserts_events(client):
+    headers = get_auth_header(client)
+    
+    response = client.post(
+        "/api/calendar/import",
+        files={"file": ("calendar.ics", SAMPLE_CALENDAR.encode(), "text/calendar")},
+        headers=headers
+    )
+    
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json() == {"imported": 3, "skipped": 1}
+    events = client.get("/api/events", headers=headers).json()
+    assert [e["title"] for e in events] == [
+        "Algorithms, lecture",
+        "A very long seminar title that is folded across several content lines by the exporting calendar",
+        "Holiday",
+    ]
+    assert {e["status"] for e in events} == {"BUSY"}
+
+
+def test_import_round_trips_export(client):
+    headers = get_auth_header(client)
+    create_event(client, headers, "Review; with ,punctuation")
+    exported = client.get("/api/calendar/feed.ics", headers=headers).content
+    
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    response = client.post(
+        "/api/calendar/import",
+        files={"file": ("feed.ics", exported, "text/calendar")},
+        headers=bob
+    )
+    
+    assert response.json() == {"imported": 1, "skipped": 0}
+    titles = [e["title"] for e in client.get("/api/events", headers=bob).json()]
+    assert titles == ["Review; with ,punctuation"]
+    # Importing it again would double-book the same time
+    response = client.post(
+        "/api/calendar/import",
+        files={"file": ("feed.ics", exported, "text/calendar")},
+        headers=headers
+    )
+    assert response.json() == {"imported": 0, "skipped": 1}
+
+
+def test_import_rejects_malformed_file_atomically(client):
+    headers = get_auth_header(client)
+    broken = SAMPLE_CALENDAR.replace("DTSTART;VALUE=DATE:20301225", "DTSTART:not-a-date")
+    
+    response = client.post(
+        "/api/calendar/import",
+        files={"file": ("calendar.ics", broken.encode(), "text/calendar")},
+        headers=headers
+    )
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"].startswith("Invalid calendar file: Line")
+    assert client.get("/api/events", headers=headers).json() == []
@@ -0,0 +1,223 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from fastapi import status
+from sqlalchemy import update
+from app.api import expiry
+from app.api import matching
+from app.api.expiry import SwapExpiryScheduler, expire_stale_swap_cycles
+from app.api.matching import SwapCycleMatcher, propose_swap_cycles
+from app.models.swap_cycle import SwapCycle
+from app.utils.cycles import IntentGraph, find_disjoint_cycles, strongly_connected_components
+from tests.conftest import TestingAsyncSessionLocal
+from tests.conftest import create_swappable_slot, get_auth_header
+
+
+def assert_valid_cycles(cycles, edges, max_length):
+    edge_set = set(edges)
+    seen = set()
+    for cycle in cycles:
+        assert 2 <= len(cycle) <= max_length
+        for i, node in enumerate(cycle):
+            assert (node, cycle[(i + 1) % len(cycle)]) in edge_set
+        assert not seen.intersection(cycle)
+        seen.update(cycle)
+
+
+def test_strongly_connected_components():
+    # 0 <-> 1 -> 2 <-> 3, 4 alone
+    component = strongly_connected_components([[1], [0, 2], [3], [2], []])
+
+    assert component[0] == component[1]
+    assert component[2] == component[3]
+    assert len({component[0], component[2], component[4]}) == 3
+
+
+def test_shortest_cycles_are_taken_first():
+    # 0 -> 1 -> 2 -> 0 and 1 <-> 2: the 2-way swap wins, 0 is left over
+    edges = [(0, 1), (1, 2), (2, 0), (2, 1)]
+
+    assert find_disjoint_cycles(3, edges, max_length=4) == [[1, 2]]
+
+
+def test_cycles_respect_the_length_limit():
+    ring = [(i, (i + 1) % 5) for i in range(5)]
+
+    assert find_disjoint_cycles(5, ring, max_length=4) == []
+    assert find_disjoint_cycles(5, ring, max_length=5) == [[0, 1, 2, 3, 4]]
+
+
+def test_random_graphs_yield_valid_disjoint_cycles():
+    rng = random.Random(7)
+    for _ in range(50):
+        nodes = rng.randrange(2, 40)
+        edges = [(rng.randrange(nodes), rng.randrange(nodes)) for _ in range(nodes * 2)]
+        edges = [(a, b) for a, b in edges if a != b]
+        cycles = find_disjoint_cycles(nodes, edges, max_length=4)
+        assert_valid_cycles(cycles, edges, 4)
+
+
+def test_intent_graph_maps_cycles_back_to_intents():
+    graph = IntentGraph()
+    graph.add_intent("alice wants bob's", offered=10, wanted=20)
+    graph.add_intent("bob wants carol's", offered=20, wanted=30)
+    graph.add_intent("carol wants alice's", offered=30, wanted=10)
+    graph.add_intent("dave wants alice's", offered=40, wanted=10)
+
+    assert graph.find_cycles(max_length=3) == [
+        ["alice wants bob's", "bob wants carol's", "carol wants alice's"]
+    ]
+
+
+def in_session(job, *args):
+    async def run():
+        async with TestingAsyncSessionLocal() as session:
+            return await job(session, *args)
+
+    return asyncio.run(run())
+
+
+def run_match():
+    return in_session(propose_swap_cycles)
+
+
+def three_way_setup(client):
+    users = [get_auth_header(client, name, f"{name.lower()}@example.com") for name in ("Alice", "Bob", "Carol")]
+    slots = [create_swappable_slot(client, headers, f"Slot {i}", days=i + 1) for i, headers in enumerate(users)]
+    # Alice wants Bob's slot, Bob wants Carol's, Carol wants Alice's
+    for i, headers in enumerate(users):
+        response = client.post(
+            "/api/swap-intents",
+            json={"offered_slot_id": slots[i], "wanted_slot_id": slots[(i + 1) % 3]},
+            headers=headers
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+    return users, slots
+
+
+def test_three_way_swap_is_proposed_and_applied(client, query_budget):
+    users, slots = three_way_setup(client)
+
+    with query_budget(8, "swap intent matching"):
+        result = run_match()
+    assert result.intents == 3
+    cycle_id, = result.proposed
+    assert client.get(f"/api/events/{slots[0]}", headers=users[0]).json()["status"] == "SWAP_PENDING"
+    # Nothing left to match
+    assert run_match().proposed == []
+
+    for headers in users[:2]:
+        cycle = client.post(f"/api/swap-cycles/{cycle_id}/respond", json={"accept": True}, headers=headers).json()
+        assert cycle["status"] == "PROPOSED"
+    cycle = client.post(f"/api/swap-cycles/{cycle_id}/respond", json={"accept": True}, headers=users[2]).json()
+
+    assert cycle["status"] == "ACCEPTED"
+    assert all(leg["accepted"] for leg in cycle["legs"])
+    # Everyone now owns the slot they asked for
+    for i, headers in enumerate(users):
+        events = client.get("/api/events", headers=headers).json()
+        assert [(e["id"], e["status"]) for e in events] == [(slots[(i + 1) % 3], "BUSY")]
+
+
+def test_matching_drops_cycles_over_slots_taken_meanwhile(client, monkeypatch):
+    users, slots = three_way_setup(client)
+    dave = get_auth_header(client, "Dave", "dave@example.com")
+    dave_slot = create_swappable_slot(client, dave, "Dave slot", days=5)
+    load_intent_graph = matching._load_intent_graph
+
+    async def load_then_race(db):
+        loaded = await load_intent_graph(db)
+        # A pairwise request takes Bob's slot after the graph was read
+        response = client.post(
+            "/api/swap-request", json={"my_slot_id": dave_slot, "their_slot_id": slots[1]}, headers=dave
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        return loaded
+
+    monkeypatch.setattr(matching, "_load_intent_graph", load_then_race)
+    result = run_match()
+
+    assert result.intents == 3
+    assert result.proposed == []
+    assert client.get(f"/api/events/{slots[0]}", headers=users[0]).json()["status"] == "SWAPPABLE"
+    request_id = client.get("/api/swap-requests/incoming", headers=users[1]).json()[0]["id"]
+    response = client.post(f"/api/swap-response/{request_id}", json={"accept": True}, headers=users[1])
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_rejecting_a_cycle_releases_slots_and_withdraws_intents(client):
+    users, slots = three_way_setup(client)
+    cycle_id, = run_match().proposed
+
+    response = client.post(f"/api/swap-cycles/{cycle_id}/respond", json={"accept": False}, headers=users[1])
+
+    assert response.json()["status"] == "REJECTED"
+    assert client.get(f"/api/events/{slots[0]}", headers=users[0]).json()["status"] == "SWAPPABLE"
+    assert [i["status"] for i in client.get("/api/swap-intents", headers=users[0]).json()] == ["OPEN"]
+    assert client.get("/api/swap-intents", headers=users[1]).json() == []
+    again = client.post(f"/api/swap-cycles/{cycle_id}/respond", json={"accept": True}, headers=users[0])
+    assert again.status_code == status.HTTP_400_BAD_REQUEST
+    # Bob's intent is gone, so the cycle cannot form again
+    assert run_match().proposed == []
+
+
+def test_unanswered_cycles_expire(client, db):
+    users, slots = three_way_setup(client)
+    cycle_id, = run_match().proposed
+    client.post(f"/api/swap-cycles/{cycle_id}/respond", json={"accept": True}, headers=users[0])
+    assert in_session(expire_stale_swap_cycles, timedelta(hours=72), 100) == 0
+
+    db.execute(
+        update(SwapCycle).where(SwapCycle.id == cycle_id)
+        .values(created_at=datetime.utcnow() - timedelta(days=4))
+    )
+    db.commit()
+    expired_before = expiry.expired_cycles.value()
+    assert in_session(expire_stale_swap_cycles, timedelta(hours=72), 100) == 1
+
+    assert expiry.expired_cycles.value() - expired_before == 1
+    assert client.get("/api/swap-cycles", headers=users[0]).json()[0]["status"] == "EXPIRED"
+    for i, headers in enumerate(users):
+        assert client.get(f"/api/events/{slots[i]}", headers=headers).json()["status"] == "SWAPPABLE"
+    # Alice accepted, so her intent reopens; Bob and Carol never answered
+    assert [i["status"] for i in client.get("/api/swap-intents", headers=users[0]).json()] == ["OPEN"]
+    assert client.get("/api/swap-intents", headers=users[1]).json() == []
+    response = client.post(f"/api/swap-cycles/{cycle_id}/respond", json={"accept": True}, headers=users[1])
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert run_match().proposed == []
+
+
+def test_matching_and_cycle_expiry_can_be_disabled():
+    assert not SwapCycleMatcher(0, 4, 10000).enabled
+    assert SwapCycleMatcher(60, 4, 10000).enabled
+    assert SwapExpiryScheduler(0, 60, 500, cycle_ttl_hours=72).enabled
+    assert not SwapExpiryScheduler(0, 60, 500, cycle_ttl_hours=0).enabled
+
+
+def test_cycles_are_private_to_participants(client):
+    users, _ = three_way_setup(client)
+    cycle_id, = run_match().proposed
+    dave = get_auth_header(client, "Dave", "dave@example.com")
+
+    assert [c["id"] for c in client.get("/api/swap-cycles", headers=users[2]).json()] == [cycle_id]
+    assert client.get("/api/swap-cycles", headers=dave).json() == []
+    response = client.post(f"/api/swap-cycles/{cycle_id}/respond", json={"accept": True}, headers=dave)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_intent_validation(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    alice_slot = create_swappable_slot(client, alice, "Alice slot")
+    bob_slot = create_swappable_slot(client, bob, "Bob slot")
+    body = {"offered_slot_id": alice_slot, "wanted_slot_id": bob_slot}
+
+    assert client.post("/api/swap-intents", json=body, headers=bob).status_code == status.HTTP_404_NOT_FOUND
+    own = {"offered_slot_id": alice_slot, "wanted_slot_id": alice_slot}
+    assert client.post("/api/swap-intents", json=own, headers=alice).status_code == status.HTTP_400_BAD_REQUEST
+    intent = client.post("/api/swap-intents", json=body, headers=alice).json()
+    assert client.post("/api/swap-intents", json=body, headers=alice).status_code == status.HTTP_400_BAD_REQUEST
+
+    assert client.delete(f"/api/swap-intents/{intent['id']}", headers=bob).status_code == status.HTTP_404_NOT_FOUND
+    assert client.delete(f"/api/swap-intents/{intent['id']}", headers=alice).status_code == status.HTTP_204_NO_CONTENT
+    assert client.get("/api/swap-intents", headers=alice).json() == []
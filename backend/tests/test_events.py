@@ -1,36 +1,34 @@
+import asyncio
+import json
 import pytest
 from datetime import datetime, timedelta
-from fastapi import status
+from fastapi import Request, status
+from sqlalchemy import bindparam, event as sa_event, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from app import main
+from app.models.event import Event, EventStatus
+from app.utils.locking import execute_versioned
+from app.utils.intervals import IntervalSet
+from tests.conftest import TestingAsyncSessionLocal, async_engine, create_swappable_slot, get_auth_header
 
 
-def get_auth_header(client):
-    response = client.post(
-        "/api/auth/signup",
-        json={
-            "name": "Test User",
-            "email": "test@example.com",
-            "password": "testpassword123"
-        }
-    )
-    token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
-
-
-def test_create_event(client):
+def test_create_event(client, query_budget):
     headers = get_auth_header(client)
     
     start_time = datetime.utcnow() + timedelta(days=1)
     end_time = start_time + timedelta(hours=1)
     
-    response = client.post(
-        "/api/events",
-        json={
-            "title": "Test Event",
-            "start_time": start_time.isoformat(),
-            "end_time": end_time.isoformat()
-        },
-        headers=headers
-    )
+    with query_budget(4, "POST /api/events"):
+        response = client.post(
+            "/api/events",
+            json={
+                "title": "Test Event",
+                "start_time": start_time.isoformat(),
+                "end_time": end_time.isoformat()
+            },
+            headers=headers
+        )
     
     assert response.status_code == status.HTTP_201_CREATED
     data = response.json()
@@ -38,7 +36,7 @@ def test_create_event(client):
     assert data["status"] == "BUSY"
 
 
-def test_get_events(client):
+def test_get_events(client, query_budget):
     headers = get_auth_header(client)
     
     # Create an event
@@ -56,14 +54,15 @@ def test_get_events(client):
     )
     
     # Get events
-    response = client.get("/api/events", headers=headers)
+    with query_budget(2, "GET /api/events"):
+        response = client.get("/api/events", headers=headers)
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert len(data) == 1
     assert data[0]["title"] == "Test Event"
 
 
-def test_update_event(client):
+def test_update_event(client, query_budget):
     headers = get_auth_header(client)
     
     # Create an event
@@ -82,17 +81,18 @@ def test_update_event(client):
     event_id = create_response.json()["id"]
     
     # Update the event
-    response = client.put(
-        f"/api/events/{event_id}",
-        json={"status": "SWAPPABLE"},
-        headers=headers
-    )
+    with query_budget(3, "PUT /api/events/{id}"):
+        response = client.put(
+            f"/api/events/{event_id}",
+            json={"status": "SWAPPABLE"},
+            headers=headers
+        )
     
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["status"] == "SWAPPABLE"
 
 
-def test_delete_event(client):
+def test_delete_event(client, query_budget):
     headers = get_auth_header(client)
     
     # Create an event
@@ -111,9 +111,431 @@ def test_delete_event(client):
     event_id = create_response.json()["id"]
     
     # Delete the event
-    response = client.delete(f"/api/events/{event_id}", headers=headers)
+    with query_budget(2, "DELETE /api/events/{id}"):
+        response = client.delete(f"/api/events/{event_id}", headers=headers)
     assert response.status_code == status.HTTP_204_NO_CONTENT
     
     # Verify deletion
     get_response = client.get("/api/events", headers=headers)
-    assert len(get_response.json()) == 0
\ No newline at end of file
+    assert len(get_response.json()) == 0
+
+
+def test_sync_driver_path(sync_client, query_budget):
+    headers = get_auth_header(sync_client)
+    
+    start_time = datetime.utcnow() + timedelta(days=1)
+    end_time = start_time + timedelta(hours=1)
+    
+    create_response = sync_client.post(
+        "/api/events",
+        json={
+            "title": "Test Event",
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat()
+        },
+        headers=headers
+    )
+    assert create_response.status_code == status.HTTP_201_CREATED
+    
+    with query_budget(2, "GET /api/events (sync driver)"):
+        response = sync_client.get("/api/events", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [event["title"] for event in response.json()] == ["Test Event"]
+
+
+
+def create_operation(title, days=1):
+    start_time = datetime.utcnow() + timedelta(days=days)
+    return {
+        "op": "create",
+        "title": title,
+        "start_time": start_time.isoformat(),
+        "end_time": (start_time + timedelta(hours=1)).isoformat()
+    }
+
+
+def test_batch_mixed_operations(client, auth_headers, query_budget):
+    existing = client.post("/api/events", json=create_operation("Existing"), headers=auth_headers).json()
+    doomed = client.post("/api/events", json=create_operation("Doomed", days=2), headers=auth_headers).json()
+    
+    with query_budget(6, "POST /api/events/batch"):
+        response = client.post(
+            "/api/events/batch",
+            json={"operations": [
+                create_operation("Lecture 1", days=3),
+                create_operation("Lecture 2", days=4),
+                {"op": "update", "id": existing["id"], "title": "Renamed"},
+                {"op": "status", "id": existing["id"], "status": "SWAPPABLE"},
+                {"op": "delete", "id": doomed["id"]}
+            ]},
+            headers=auth_headers
+        )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["applied"] is True
+    assert [r["status_code"] for r in data["results"]] == [201, 201, 200, 200, 204]
+    assert data["results"][0]["event"]["title"] == "Lecture 1"
+    assert data["results"][3]["event"]["title"] == "Renamed"
+    assert data["results"][3]["event"]["status"] == "SWAPPABLE"
+    
+    events = client.get("/api/events", headers=auth_headers).json()
+    assert [(e["title"], e["status"]) for e in events] == [
+        ("Renamed", "SWAPPABLE"), ("Lecture 1", "BUSY"), ("Lecture 2", "BUSY")
+    ]
+
+
+def test_batch_is_atomic_by_default(client, auth_headers, query_budget):
+    with query_budget(2, "POST /api/events/batch"):
+        response = client.post(
+            "/api/events/batch",
+            json={"operations": [create_operation("Lecture"), {"op": "delete", "id": 999}]},
+            headers=auth_headers
+        )
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    data = response.json()
+    assert data["applied"] is False
+    assert [r["status_code"] for r in data["results"]] == [424, 404]
+    assert client.get("/api/events", headers=auth_headers).json() == []
+
+
+def test_batch_non_atomic_skips_failures(client, auth_headers, query_budget):
+    with query_budget(4, "POST /api/events/batch"):
+        response = client.post(
+            "/api/events/batch",
+            json={"operations": [{"op": "status", "id": 999, "status": "SWAPPABLE"}, create_operation("Lecture")],
+                  "atomic": False},
+            headers=auth_headers
+        )
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert [r["status_code"] for r in response.json()["results"]] == [404, 201]
+    assert [e["title"] for e in client.get("/api/events", headers=auth_headers).json()] == ["Lecture"]
+
+
+def test_batch_keeps_swap_pending_guards(client, alice, bob, query_budget):
+    alice_slot = create_swappable_slot(client, alice, "Alice slot")
+    bob_slot = create_swappable_slot(client, bob, "Bob slot")
+    client.post("/api/swap-request", json={"my_slot_id": alice_slot, "their_slot_id": bob_slot}, headers=alice)
+    
+    with query_budget(1, "POST /api/events/batch"):
+        response = client.post(
+            "/api/events/batch",
+            json={"operations": [
+                {"op": "status", "id": alice_slot, "status": "BUSY"},
+                {"op": "delete", "id": alice_slot},
+                {"op": "delete", "id": bob_slot}
+            ], "atomic": False},
+            headers=alice
+        )
+    
+    results = response.json()["results"]
+    assert [r["status_code"] for r in results] == [400, 400, 404]
+    assert results[0]["detail"] == "Cannot modify event with pending swap request"
+    assert client.get(f"/api/events/{alice_slot}", headers=alice).json()["status"] == "SWAP_PENDING"
+
+
+def test_batch_updates_use_executemany(client, auth_headers, query_budget):
+    response = client.post(
+        "/api/events/batch",
+        json={"operations": [create_operation(f"Shift {i}", days=i + 1) for i in range(50)]},
+        headers=auth_headers
+    )
+    event_ids = [result["id"] for result in response.json()["results"]]
+    updates = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE events"):
+            updates.append(executemany)
+    
+    sa_event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        # Fifty updates must not cost fifty statements
+        with query_budget(2, "POST /api/events/batch"):
+            response = client.post(
+                "/api/events/batch",
+                json={"operations": [{"op": "status", "id": i, "status": "SWAPPABLE"} for i in event_ids]},
+                headers=auth_headers
+            )
+    finally:
+        sa_event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert updates == [True]
+    events = client.get("/api/events", headers=auth_headers).json()
+    assert {e["status"] for e in events} == {"SWAPPABLE"}
+
+
+@pytest.mark.parametrize("sane_multi_rowcount", [True, False])
+def test_versioned_updates_detect_stale_rows(client, auth_headers, monkeypatch, sane_multi_rowcount):
+    # asyncpg and psycopg2 cannot count the rows an executemany matched
+    monkeypatch.setattr(async_engine.dialect, "supports_sane_multi_rowcount", sane_multi_rowcount)
+    ids = [
+        client.post("/api/events", json=create_operation(f"Shift {i}", days=i + 1), headers=auth_headers).json()["id"]
+        for i in range(2)
+    ]
+    table = Event.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"), table.c.version == bindparam("b_version"))
+        .values({"title": "Moved", "version": table.c.version + 1})
+    )
+
+    async def write(versions):
+        async with TestingAsyncSessionLocal() as session:
+            await execute_versioned(session, statement, [{"b_id": i, "b_version": v} for i, v in zip(ids, versions)])
+            await session.commit()
+
+    with pytest.raises(StaleDataError):
+        asyncio.run(write([1, 0]))
+    asyncio.run(write([1, 1]))
+    assert {e["title"] for e in client.get("/api/events", headers=auth_headers).json()} == {"Moved"}
+
+
+def test_event_etag_conditional_get(client, query_budget):
+    headers = get_auth_header(client)
+    event_id = client.post("/api/events", json=create_operation("Review"), headers=headers).json()["id"]
+    
+    response = client.get(f"/api/events/{event_id}", headers=headers)
+    etag = response.headers["etag"]
+    assert response.status_code == status.HTTP_200_OK
+    
+    with query_budget(1, "GET /api/events/{id} (If-None-Match)"):
+        cached = client.get(f"/api/events/{event_id}", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.content == b""
+    
+    client.put(f"/api/events/{event_id}", json={"title": "Renamed"}, headers=headers)
+    changed = client.get(f"/api/events/{event_id}", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == status.HTTP_200_OK
+    assert changed.headers["etag"] != etag
+
+
+def test_event_list_etag_tracks_creates_updates_and_deletes(client, query_budget):
+    headers = get_auth_header(client)
+    etags = [client.get("/api/events", headers=headers).headers["etag"]]
+    
+    event_id = client.post("/api/events", json=create_operation("Review"), headers=headers).json()["id"]
+    etags.append(client.get("/api/events", headers=headers).headers["etag"])
+    client.put(f"/api/events/{event_id}", json={"title": "Renamed"}, headers=headers)
+    etags.append(client.get("/api/events", headers=headers).headers["etag"])
+    client.delete(f"/api/events/{event_id}", headers=headers)
+    etags.append(client.get("/api/events", headers=headers).headers["etag"])
+    
+    assert len(set(etags[:3])) == 3
+    with query_budget(1, "GET /api/events (If-None-Match)"):
+        response = client.get("/api/events", headers={**headers, "If-None-Match": etags[-1]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_if_match_rejects_stale_writes(client, query_budget):
+    headers = get_auth_header(client)
+    created = client.post("/api/events", json=create_operation("Review"), headers=headers)
+    event_id, etag = created.json()["id"], created.headers["etag"]
+    
+    updated = client.put(
+        f"/api/events/{event_id}", json={"title": "Mine"}, headers={**headers, "If-Match": etag}
+    )
+    assert updated.status_code == status.HTTP_200_OK
+    assert updated.headers["etag"] != etag
+    
+    with query_budget(1, "PUT /api/events/{id} (stale If-Match)"):
+        stale = client.put(
+            f"/api/events/{event_id}", json={"title": "Theirs"}, headers={**headers, "If-Match": etag}
+        )
+    assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+    weak = client.put(
+        f"/api/events/{event_id}", json={"title": "Theirs"},
+        headers={**headers, "If-Match": "W/" + updated.headers["etag"]}
+    )
+    assert weak.status_code == status.HTTP_412_PRECONDITION_FAILED
+    
+    response = client.delete(f"/api/events/{event_id}", headers={**headers, "If-Match": etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = client.delete(f"/api/events/{event_id}", headers={**headers, "If-Match": updated.headers["etag"]})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+def test_interval_set_merges_and_answers_overlaps():
+    busy = IntervalSet([(5, 7), (1, 3), (3, 4), (6, 9), (12, 12)])
+
+    assert len(busy) == 2  # [1, 4) and [5, 9); the empty interval is dropped
+    assert busy.overlaps(0, 2)
+    assert busy.overlaps(8, 20)
+    assert not busy.overlaps(4, 5)  # touching both runs
+    assert not busy.overlaps(9, 12)
+    assert not busy.overlaps(2, 2)
+
+
+def test_slot_suggestions_skip_overlaps_and_rank_by_proximity(client, query_budget):
+    alice = get_auth_header(client)
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    noon = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+
+    def add(headers, title, hours, status=None, length=1):
+        start_time = noon + timedelta(hours=hours)
+        response = client.post(
+            "/api/events",
+            json={
+                "title": title,
+                "start_time": start_time.isoformat(),
+                "end_time": (start_time + timedelta(hours=length)).isoformat()
+            },
+            headers=headers
+        )
+        event_id = response.json()["id"]
+        if status:
+            client.put(f"/api/events/{event_id}", json={"status": status}, headers=headers)
+        return event_id
+
+    source = add(alice, "Alice source", 0, "SWAPPABLE")
+    add(alice, "Alice busy", 2, length=2)
+    add(alice, "Alice spare", 5, "SWAPPABLE")
+    far_before = add(bob, "Bob -6h", -6, "SWAPPABLE")
+    before = add(bob, "Bob -1h", -1, "SWAPPABLE")
+    add(bob, "Bob +2h", 2, "SWAPPABLE")      # clashes with Alice's busy event
+    add(bob, "Bob +3h30", 3.5, "SWAPPABLE", length=0.5)  # clashes with Alice's busy event
+    after = add(bob, "Bob +4h", 4, "SWAPPABLE")
+    add(bob, "Bob +5h30", 5.5, "SWAPPABLE", length=0.5)  # clashes with Alice's spare slot
+    add(bob, "Bob busy", 1)
+
+    with query_budget(4, "GET /api/events/{id}/suggestions"):
+        response = client.get(f"/api/events/{source}/suggestions", headers=alice)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [slot["id"] for slot in response.json()] == [before, after, far_before]
+    # Pages smaller than the skipped run still fill up
+    response = client.get(f"/api/events/{source}/suggestions", params={"limit": 2}, headers=alice)
+    assert [slot["id"] for slot in response.json()] == [before, after]
+    response = client.get(f"/api/events/{source}/suggestions", headers=bob)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_slot_suggestions_skip_a_blocked_stretch_in_few_queries(client, db, query_budget):
+    alice = get_auth_header(client)
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    bob_id = client.get("/api/auth/me", headers=bob).json()["id"]
+    noon = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    source = client.post("/api/events", json={
+        "title": "Alice source",
+        "start_time": noon.isoformat(),
+        "end_time": (noon + timedelta(hours=1)).isoformat()
+    }, headers=alice).json()["id"]
+    client.post("/api/events", json={
+        "title": "Alice conference",
+        "start_time": (noon + timedelta(hours=1)).isoformat(),
+        "end_time": (noon + timedelta(days=3)).isoformat()
+    }, headers=alice)
+    # Hundreds of Bob's slots during Alice's conference, then one she can take
+    db.execute(insert(Event), [
+        {
+            "title": f"Bob slot {i}",
+            "start_time": noon + timedelta(hours=1, minutes=10 * i),
+            "end_time": noon + timedelta(hours=1, minutes=10 * i + 10),
+            "status": EventStatus.SWAPPABLE,
+            "user_id": bob_id,
+        }
+        for i in range(300)
+    ])
+    db.commit()
+    free = create_swappable_slot(client, bob, "Bob after", days=11)
+
+    with query_budget(8, "GET /api/events/{id}/suggestions (blocked calendar)"):
+        response = client.get(f"/api/events/{source}/suggestions", params={"limit": 1}, headers=alice)
+
+    assert [slot["id"] for slot in response.json()] == [free]
+
+
+def test_overlapping_events_are_rejected(client, query_budget):
+    headers = get_auth_header(client)
+    nine = datetime.utcnow().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=3)
+
+    def body(start_hours, end_hours):
+        return {
+            "title": "Block",
+            "start_time": (nine + timedelta(hours=start_hours)).isoformat(),
+            "end_time": (nine + timedelta(hours=end_hours)).isoformat()
+        }
+
+    first = client.post("/api/events", json=body(0, 2), headers=headers).json()["id"]
+    second = client.post("/api/events", json=body(3, 4), headers=headers).json()["id"]
+    # Touching is fine
+    assert client.post("/api/events", json=body(2, 3), headers=headers).status_code == status.HTTP_201_CREATED
+
+    with query_budget(2, "POST /api/events (overlapping)"):
+        response = client.post("/api/events", json=body(1, 3.5), headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["conflicting_event_ids"] == sorted([first, second, first + 2])
+
+    response = client.put(f"/api/events/{second}", json=body(1.5, 2.5), headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["conflicting_event_ids"] == [first, first + 2]
+    # Moving within its own time is not a conflict with itself
+    response = client.put(f"/api/events/{second}", json=body(3, 3.5), headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    # Another user's calendar is separate
+    other = get_auth_header(client, "Bob", "bob@example.com")
+    assert client.post("/api/events", json=body(0, 2), headers=other).status_code == status.HTTP_201_CREATED
+
+
+def overlap_violation(user_id, start_time, end_time):
+    """An IntegrityError shaped like asyncpg's report of the overlap constraint firing."""
+    cause = Exception("conflicting key value violates exclusion constraint")
+    cause.detail = (
+        f'Key (user_id, during)=({user_id}, ["{start_time}","{end_time}")) conflicts with '
+        f'existing key (user_id, during)=({user_id}, ["{start_time}","{end_time}")).'
+    )
+    orig = Exception('conflicting key value violates exclusion constraint "ex_events_user_id_during"')
+    orig.__cause__ = cause
+    return IntegrityError("COMMIT", {}, orig)
+
+
+def test_overlap_constraint_violation_names_the_conflicting_events(client, monkeypatch):
+    monkeypatch.setattr(main, "primary_session", TestingAsyncSessionLocal)
+    request = Request({"type": "http", "headers": []})
+    headers = get_auth_header(client)
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    nine = datetime(2030, 1, 1, 9)
+    event = client.post("/api/events", json={
+        "title": "Standup",
+        "start_time": nine.isoformat(),
+        "end_time": (nine + timedelta(hours=1)).isoformat(),
+    }, headers=headers).json()
+
+    # As when a concurrent write slipped past the application's check
+    violation = overlap_violation(user_id, nine + timedelta(minutes=30), nine + timedelta(hours=2))
+    response = asyncio.run(main.integrity_error_handler(request, violation))
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert json.loads(response.body)["conflicting_event_ids"] == [event["id"]]
+
+    unparsable = IntegrityError("COMMIT", {}, Exception("ex_events_user_id_during"))
+    response = asyncio.run(main.integrity_error_handler(request, unparsable))
+    assert json.loads(response.body)["conflicting_event_ids"] == []
+
+
+def test_batch_rejects_overlaps_but_allows_moving_into_vacated_time(client):
+    headers = get_auth_header(client)
+    early = client.post("/api/events", json=create_operation("Early", days=1), headers=headers).json()
+    late = client.post("/api/events", json=create_operation("Late", days=2), headers=headers).json()
+
+    # Two new events on top of each other
+    response = client.post(
+        "/api/events/batch",
+        json={"operations": [create_operation("A", days=5), create_operation("B", days=5)], "atomic": False},
+        headers=headers
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    # Early moves into Late's old time while Late is deleted
+    response = client.post(
+        "/api/events/batch",
+        json={"operations": [
+            {"op": "delete", "id": late["id"]},
+            {"op": "update", "id": early["id"], "start_time": late["start_time"], "end_time": late["end_time"]},
+        ]},
+        headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [e["id"] for e in client.get("/api/events", headers=headers).json()] == [early["id"]]
@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta
+from fastapi import status
+from sqlalchemy import update
+from app.api import expiry
+from app.api.expiry import SwapExpiryScheduler, expire_stale_swap_requests
+from app.models.swap_request import SwapRequest
+from tests.conftest import TestingAsyncSessionLocal
+from tests.conftest import create_swap_requests, get_auth_header
+
+
+def run_expiry(ttl=timedelta(hours=72), batch_size=500):
+    async def run():
+        async with TestingAsyncSessionLocal() as session:
+            return await expire_stale_swap_requests(session, ttl, batch_size)
+
+    return asyncio.run(run())
+
+
+def test_stale_requests_expire_and_release_their_slots(client, db, query_budget):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 3)
+    requests = client.get("/api/swap-requests/incoming", headers=bob).json()
+    stale, fresh = [r["id"] for r in requests[:2]], requests[2]["id"]
+    db.execute(
+        update(SwapRequest).where(SwapRequest.id.in_(stale))
+        .values(created_at=datetime.utcnow() - timedelta(days=4))
+    )
+    db.commit()
+    expired_before = expiry.expired_requests.value()
+
+    # Two full batches of one, then a short one: two UPDATEs per non-empty batch
+    with query_budget(5, "swap request expiry"):
+        assert run_expiry(batch_size=1) == 2
+
+    assert expiry.expired_requests.value() - expired_before == 2
+    assert [r["id"] for r in client.get("/api/swap-requests/incoming", headers=bob).json()] == [fresh]
+    outgoing = {r["id"]: r["status"] for r in client.get("/api/swap-requests/outgoing", headers=alice).json()}
+    assert outgoing == {stale[0]: "EXPIRED", stale[1]: "EXPIRED", fresh: "PENDING"}
+    slots = {s["id"] for s in client.get("/api/swappable-slots", headers=alice).json()}
+    assert {r["requested_slot_id"] for r in requests[:2]} <= slots
+
+    response = client.post(f"/api/swap-response/{stale[0]}", json={"accept": True}, headers=bob)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    # Nothing left to expire
+    assert run_expiry() == 0
+
+
+def test_expiry_can_be_disabled():
+    assert not SwapExpiryScheduler(0, 60, 500).enabled
+    assert SwapExpiryScheduler(0.5, 60, 500).enabled
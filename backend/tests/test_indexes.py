@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import event
+from tests.conftest import async_engine, create_swappable_slot, engine, get_auth_header
+
+
+def capture_selects(call):
+    """Run `call` and return every SELECT statement it sent to the database."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def full_scans(statement, parameters):
+    """Return the query plan steps that scan a table without an index."""
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    details = [row[3] for row in plan]
+    return [step for step in details if step.startswith("SCAN") and "USING" not in step]
+
+
+@pytest.fixture
+def seeded(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    my_slot = create_swappable_slot(client, alice, "Alice slot")
+    their_slot = create_swappable_slot(client, bob, "Bob slot")
+    my_spare = create_swappable_slot(client, alice, "Alice spare slot", days=2)
+    their_spare = create_swappable_slot(client, bob, "Bob spare slot", days=2)
+    client.post(
+        "/api/swap-request",
+        json={"my_slot_id": my_slot, "their_slot_id": their_slot},
+        headers=alice
+    )
+    return {
+        "alice": alice,
+        "bob": bob,
+        "my_slot": my_slot,
+        "swap": {"my_slot_id": my_spare, "their_slot_id": their_spare},
+    }
+
+
+@pytest.mark.parametrize("method, url, viewer", [
+    ("get", "/api/events", "alice"),
+    ("get", "/api/events/{my_slot}", "alice"),
+    ("get", "/api/events/{my_slot}/suggestions", "alice"),
+    ("get", "/api/swappable-slots", "alice"),
+    ("get", "/api/swap-requests/incoming", "bob"),
+    ("get", "/api/swap-requests/outgoing", "alice"),
+    ("get", "/api/swap-requests/history", "alice"),
+    ("post", "/api/swap-request", "alice"),
+])
+def test_route_queries_use_indexes(client, seeded, method, url, viewer):
+    url = url.format(**seeded)
+    kwargs = {"headers": seeded[viewer]}
+    if method == "post":
+        kwargs["json"] = seeded["swap"]
+
+    responses = []
+    statements = capture_selects(lambda: responses.append(getattr(client, method)(url, **kwargs)))
+
+    assert responses[0].status_code < 300
+    assert statements
+    for statement, parameters in statements:
+        assert full_scans(statement, parameters) == [], statement
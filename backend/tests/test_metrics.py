@@ -0,0 +1,97 @@
+import re
+import threading
+from datetime import datetime, timedelta
+from fastapi import status
+from app.core.metrics import Counter, Histogram, UNMATCHED_ROUTE
+from tests.conftest import get_auth_header
+
+
+def sample(text, name, **labels):
+    """Value of the sample `name` whose labels include `labels`."""
+    for line in text.splitlines():
+        match = re.fullmatch(r"(\w+)(?:\{(.*)\})? (\S+)", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if all(found.get(key) == value for key, value in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, ("/a",))
+
+    lines = histogram.collect()
+
+    assert lines[:2] == ["# HELP test_seconds Test.", "# TYPE test_seconds histogram"]
+    assert lines[2:] == [
+        'test_seconds_bucket{route="/a",le="0.1"} 2',
+        'test_seconds_bucket{route="/a",le="1"} 3',
+        'test_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_seconds_sum{route="/a"} 3.65',
+        'test_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_counter_merges_thread_shards():
+    counter = Counter("test_total", "Test.", ("kind",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(labels=("x",))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(2, labels=('a"b',))
+
+    assert counter.value(("x",)) == 4000
+    assert 'test_total{kind="a\\"b"} 2' in counter.collect()
+
+
+def test_metrics_record_route_template_status_and_db_usage(client):
+    headers = get_auth_header(client)
+    start_time = datetime.utcnow() + timedelta(days=1)
+    event_id = client.post(
+        "/api/events",
+        json={
+            "title": "Metered",
+            "start_time": start_time.isoformat(),
+            "end_time": (start_time + timedelta(hours=1)).isoformat()
+        },
+        headers=headers
+    ).json()["id"]
+    route = {"method": "GET", "route": "/api/events/{event_id}"}
+    before = client.get("/metrics").text
+    count_before = sample(before, "slotswapper_http_request_duration_seconds_count", status="200", **route) or 0
+    queries_before = sample(before, "slotswapper_http_request_db_queries_sum", **route) or 0
+
+    assert client.get(f"/api/events/{event_id}", headers=headers).status_code == status.HTTP_200_OK
+    assert client.get("/api/events/999999", headers=headers).status_code == status.HTTP_404_NOT_FOUND
+
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert sample(text, "slotswapper_http_request_duration_seconds_count", status="200", **route) == count_before + 1
+    assert sample(text, "slotswapper_http_request_duration_seconds_count", status="404", **route) >= 1
+    assert sample(text, "slotswapper_http_request_duration_seconds_bucket", status="200", le="+Inf", **route) == count_before + 1
+    # Both lookups ran SQL and checked a connection out of the pool
+    assert sample(text, "slotswapper_http_request_db_queries_sum", **route) >= queries_before + 2
+    assert sample(text, "slotswapper_http_request_db_seconds_count", **route) >= 2
+    assert sample(text, "slotswapper_http_request_pool_wait_seconds_count", **route) >= 2
+    assert sample(text, "slotswapper_db_queries_total") > 0
+    assert sample(text, "slotswapper_db_pool_checkouts_total") > 0
+
+
+def test_metrics_group_unknown_paths(client):
+    client.get("/no/such/path/123")
+
+    text = client.get("/metrics").text
+
+    assert sample(text, "slotswapper_http_request_duration_seconds_count", route=UNMATCHED_ROUTE, status="404") >= 1
+    assert "/no/such/path/123" not in text
@@ -0,0 +1,52 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.core.query_budget import QueryBudget, QueryBudgetExceeded, QueryDebugMiddleware
+from tests.conftest import TestingAsyncSessionLocal, engine
+
+
+def test_budget_counts_statements_and_reports_repeats(db):
+    with QueryBudget(engine) as counter:
+        db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+    assert counter.count == 2
+
+    with pytest.raises(QueryBudgetExceeded) as excinfo:
+        with QueryBudget(engine, max_statements=2, label="loop"):
+            for _ in range(3):
+                db.execute(text("SELECT  1"))
+
+    message = str(excinfo.value)
+    assert message.startswith("loop executed 3 statements, budget is 2:")
+    assert "3x SELECT 1" in message
+
+
+def test_budget_fixture_passes_within_budget(client, query_budget):
+    with query_budget(1, "GET /api/events") as counter:
+        response = client.get("/api/events")
+    # Rejected before any statement ran
+    assert response.status_code == 403
+    assert counter.count == 0
+
+
+def test_debug_headers_report_count_and_duplicates(db):
+    app = FastAPI()
+
+    async def get_session():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
+    @app.get("/n-plus-one")
+    async def n_plus_one(session=Depends(get_session)):
+        for i in range(3):
+            await session.execute(text("SELECT :i"), {"i": i})
+        await session.execute(text("SELECT 42"))
+        return {}
+
+    client = TestClient(QueryDebugMiddleware(app))
+
+    response = client.get("/n-plus-one")
+
+    assert response.headers["X-Query-Count"] == "4"
+    assert response.headers["X-Query-Duplicates"] == "3x SELECT ?"
@@ -0,0 +1,114 @@
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.replicas import COOKIE, HEADER, ReplicaRoutingMiddleware
+from app.database import Base, RoutingSession, get_db, replica_session_info
+from app.main import app
+from app.models.user import User
+from tests.conftest import async_engine, engine
+from tests.conftest import create_swappable_slot, get_auth_header
+
+REPLICA_PATH = "./replica.db"
+
+
+@pytest.fixture
+def replica(db):
+    """An empty second SQLite database standing in for a lagging replica."""
+    replica = create_engine(f"sqlite:///{REPLICA_PATH}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=replica)
+    yield replica
+    replica.dispose()
+    os.remove(REPLICA_PATH)
+
+
+@pytest.fixture
+def routed_client(replica):
+    async_replica = create_async_engine(f"sqlite+aiosqlite:///{REPLICA_PATH}", poolclass=NullPool)
+    Session = async_sessionmaker(
+        async_engine, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_db():
+        async with Session(info=replica_session_info([async_replica.sync_engine])) as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(ReplicaRoutingMiddleware(app, max_lag=5))
+    app.dependency_overrides.clear()
+
+
+def create_event(client, headers):
+    response = client.post("/api/events", json={
+        "title": "Standup",
+        "start_time": "2030-01-01T09:00:00",
+        "end_time": "2030-01-01T09:30:00",
+        "status": "BUSY",
+    }, headers=headers)
+    assert response.status_code == 201
+    return response
+
+
+def test_reads_follow_the_consistency_token(routed_client):
+    headers = get_auth_header(routed_client, "Alice", "alice@example.com")
+    token = create_event(routed_client, headers).headers[HEADER]
+
+    # The cookie set by the write pins the next reads to the primary
+    assert len(routed_client.get("/api/events", headers=headers).json()) == 1
+
+    # Without a token reads go to the replica, which has not seen the event
+    routed_client.cookies.clear()
+    assert routed_client.get("/api/events", headers=headers).json() == []
+
+    assert len(routed_client.get("/api/events", headers={**headers, HEADER: token}).json()) == 1
+    stale = {**headers, HEADER: f"{time.time() - 10:.3f}"}
+    assert routed_client.get("/api/events", headers=stale).json() == []
+
+
+def test_writes_always_go_to_the_primary(routed_client):
+    headers = get_auth_header(routed_client, "Alice", "alice@example.com")
+    routed_client.cookies.clear()
+    response = create_event(routed_client, headers)
+    assert COOKIE in response.cookies
+    routed_client.cookies.clear()
+    # The event was checked for overlaps and stored on the primary only
+    assert routed_client.get("/api/events", headers=headers).json() == []
+
+
+def test_slot_cache_is_filled_from_the_primary(routed_client):
+    alice = get_auth_header(routed_client, "Alice", "alice@example.com")
+    bob = get_auth_header(routed_client, "Bob", "bob@example.com")
+    create_swappable_slot(routed_client, bob, "Bob slot")
+    # Cache Alice's principal while the cookie still pins reads to the primary
+    routed_client.get("/api/events", headers=alice)
+    routed_client.cookies.clear()
+
+    # The miss is a replica-eligible read, but a lagging replica must not
+    # put an old window in the cache every worker shares
+    for _ in range(2):
+        slots = routed_client.get("/api/swappable-slots", headers=alice).json()
+        assert [slot["title"] for slot in slots] == ["Bob slot"]
+
+
+def test_session_stays_on_the_primary_after_its_first_write(db, replica):
+    db.add(User(name="Alice", email="alice@example.com", hashed_password="x"))
+    db.commit()
+    session = RoutingSession(bind=engine, info={"replica": replica})
+    try:
+        assert session.scalar(select(func.count(User.id))) == 0
+        # Locking reads are writes as far as routing is concerned
+        assert session.scalar(select(func.count(User.id)).with_for_update()) == 1
+        assert session.scalar(select(func.count(User.id))) == 1
+    finally:
+        session.close()
+
+    session = RoutingSession(bind=engine, info={"replica": replica})
+    try:
+        session.execute(update(User).values(name="Alicia"))
+        assert session.scalar(select(User.name)) == "Alicia"
+        session.rollback()
+    finally:
+        session.close()
@@ -0,0 +1,56 @@
+from typing import List
+import msgpack
+import pytest
+from fastapi import status
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from app.core.slot_cache import slot_cache
+from app.models.event import Event
+from app.schemas.event import EventResponse
+from tests.conftest import create_swap_requests, create_swappable_slot, get_auth_header
+
+MSGPACK = {"Accept": "application/msgpack"}
+
+
+def get_msgpack(client, url, headers):
+    response = client.get(url, headers={**headers, **MSGPACK})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/msgpack"
+    assert "Accept" in response.headers["vary"]
+    return response, msgpack.unpackb(response.content)
+
+
+def test_event_list_matches_the_response_model(client, db):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 3)
+
+    body = client.get("/api/events", headers=alice).json()
+    rows = db.scalars(select(Event).where(Event.user_id == body[0]["user_id"]).order_by(Event.start_time)).all()
+    adapter = TypeAdapter(List[EventResponse])
+    assert body == adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+
+@pytest.mark.parametrize("cached", [True, False])
+def test_list_endpoints_speak_msgpack(client, cached, monkeypatch):
+    monkeypatch.setattr(slot_cache, "enabled", cached)
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 2)
+    create_swappable_slot(client, alice, "Open slot", days=5)
+
+    for url, headers in [
+        ("/api/events", alice),
+        ("/api/swappable-slots", bob),
+        ("/api/swap-requests/incoming", bob),
+        ("/api/swap-requests/outgoing", alice),
+    ]:
+        json_response = client.get(url, headers=headers)
+        response, items = get_msgpack(client, url, headers)
+        assert items == json_response.json()
+        assert items
+        if "etag" in json_response.headers:
+            # Each encoding has its own tag, and both revalidate
+            assert response.headers["etag"] != json_response.headers["etag"]
+            revalidated = client.get(url, headers={**headers, **MSGPACK, "If-None-Match": response.headers["etag"]})
+            assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
@@ -0,0 +1,185 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import pytest
+from fastapi import status
+from app.api.routes import swaps
+from app.core import slot_cache as slot_cache_module
+from app.core.slot_cache import CachedWindow, MemorySlotCache, RedisSlotCache, SlotWindow
+from tests.conftest import create_swappable_slot, get_auth_header
+
+
+class FakeRedis:
+    """In-process stand-in for the redis.asyncio commands RedisSlotCache uses."""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+        self.expiry = {}
+
+    def _expired(self, key):
+        if key in self.expiry and self.expiry[key] <= time.monotonic():
+            self.values.pop(key, None)
+            self.sets.pop(key, None)
+            del self.expiry[key]
+
+    async def get(self, key):
+        self._expired(key)
+        value = self.values.get(key)
+        return value.encode() if isinstance(value, str) else value
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value if isinstance(value, bytes) else str(value).encode()
+        if ex is not None:
+            self.expiry[key] = time.monotonic() + ex
+
+    async def incr(self, key):
+        self._expired(key)
+        value = int(self.values.get(key, b"0")) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += (self.values.pop(key, None) is not None) + (self.sets.pop(key, None) is not None)
+            self.expiry.pop(key, None)
+        return removed
+
+    async def expire(self, key, seconds):
+        self.expiry[key] = time.monotonic() + seconds
+
+    async def sadd(self, key, *members):
+        self._expired(key)
+        self.sets.setdefault(key, set()).update(m.encode() for m in members)
+
+    async def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(m.encode() for m in members)
+
+    async def smembers(self, key):
+        self._expired(key)
+        return set(self.sets.get(key, set()))
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request, monkeypatch):
+    if request.param == "memory":
+        backend = MemorySlotCache(max_windows=16, ttl_seconds=60)
+    else:
+        backend = RedisSlotCache(FakeRedis(), ttl_seconds=60)
+    monkeypatch.setattr(slot_cache_module, "get_slot_cache", lambda: backend)
+    monkeypatch.setattr(swaps, "get_slot_cache", lambda: backend)
+    return backend
+
+
+def titles(client, headers, **params):
+    response = client.get("/api/swappable-slots", params=params, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    return [slot["title"] for slot in response.json()]
+
+
+def test_cached_window_excludes_callers_own_slots(client, cache):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swappable_slot(client, alice, "Alice slot", days=1)
+    create_swappable_slot(client, bob, "Bob slot", days=2)
+    
+    assert titles(client, alice) == ["Bob slot"]
+    assert titles(client, bob) == ["Alice slot"]
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_cached_pages_match_database_pages(client, cache):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    for i in range(5):
+        create_swappable_slot(client, bob, f"Bob slot {i}", days=i + 1)
+        create_swappable_slot(client, alice, f"Alice slot {i}", days=i + 1)
+    
+    seen, params = [], {"limit": 2}
+    while True:
+        response = client.get("/api/swappable-slots", params=params, headers=alice)
+        seen.extend(slot["title"] for slot in response.json())
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+    
+    assert seen == [f"Bob slot {i}" for i in range(5)]
+
+
+def test_write_paths_invalidate_cached_windows(client, cache):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    alice_slot = create_swappable_slot(client, alice, "Alice slot")
+    bob_slot = create_swappable_slot(client, bob, "Bob slot")
+    assert titles(client, alice) == ["Bob slot"]
+    
+    client.put(f"/api/events/{bob_slot}", json={"title": "Bob renamed"}, headers=bob)
+    assert titles(client, alice) == ["Bob renamed"]
+    
+    request_id = client.post(
+        "/api/swap-request", json={"my_slot_id": alice_slot, "their_slot_id": bob_slot}, headers=alice
+    ).json()["id"]
+    assert titles(client, alice) == []
+    
+    client.post(f"/api/swap-response/{request_id}", json={"accept": False}, headers=bob)
+    assert titles(client, alice) == ["Bob renamed"]
+    
+    request_id = client.post(
+        "/api/swap-request", json={"my_slot_id": alice_slot, "their_slot_id": bob_slot}, headers=alice
+    ).json()["id"]
+    assert titles(client, alice) == []
+    client.delete(f"/api/swap-request/{request_id}", headers=alice)
+    assert titles(client, alice) == ["Bob renamed"]
+    
+    client.post("/api/events/batch", json={"operations": [{"op": "status", "id": bob_slot, "status": "BUSY"}]}, headers=bob)
+    assert titles(client, alice) == []
+    
+    client.put(f"/api/events/{bob_slot}", json={"status": "SWAPPABLE"}, headers=bob)
+    assert titles(client, alice) == ["Bob renamed"]
+    client.delete(f"/api/events/{bob_slot}", headers=bob)
+    assert titles(client, alice) == []
+
+
+def test_invalidation_only_drops_windows_containing_the_slot(client, cache):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    near = create_swappable_slot(client, bob, "Near", days=1)
+    create_swappable_slot(client, bob, "Far", days=30)
+    now = datetime.utcnow()
+    near_window = {"to": (now + timedelta(days=7)).isoformat()}
+    far_window = {"from": (now + timedelta(days=7)).isoformat()}
+    assert titles(client, alice, **near_window) == ["Near"]
+    assert titles(client, alice, **far_window) == ["Far"]
+    
+    client.put(f"/api/events/{near}", json={"title": "Near renamed"}, headers=bob)
+    
+    assert cache.invalidations == 1
+    assert titles(client, alice, **near_window) == ["Near renamed"]
+    hits = cache.hits
+    assert titles(client, alice, **far_window) == ["Far"]
+    assert cache.hits == hits + 1
+
+
+def test_fill_racing_an_invalidation_is_not_stored(cache):
+    window = SlotWindow()
+    
+    async def scenario():
+        epoch = await cache.epoch()
+        await cache.invalidate([datetime.utcnow()])
+        stored = await cache.store(window, CachedWindow(slots=()), epoch)
+        return stored, await cache.get(window)
+    
+    assert asyncio.run(scenario()) == (False, None)
+
+
+def test_oversized_window_falls_back_to_database(client, cache, monkeypatch):
+    monkeypatch.setattr(swaps.settings, "SLOT_CACHE_MAX_SLOTS", 1)
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swappable_slot(client, bob, "Bob slot 1", days=1)
+    create_swappable_slot(client, bob, "Bob slot 2", days=2)
+    
+    assert titles(client, alice) == ["Bob slot 1", "Bob slot 2"]
+    assert titles(client, alice) == ["Bob slot 1", "Bob slot 2"]
+    assert asyncio.run(cache.get(SlotWindow())).slots is None
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code, **env):
+    """Run code in a fresh interpreter, so settings and engines start unbuilt."""
+    environment = {key: value for key, value in os.environ.items() if key not in ("DATABASE_URL", "SECRET_KEY")}
+    environment.update(env)
+    return subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)],
+        cwd=BACKEND, env=environment, capture_output=True, text=True,
+    )
+
+
+def test_app_imports_without_environment():
+    result = run_python("""
+        import app.main
+        import app.utils.intervals
+        from app.core.config import get_settings
+        assert get_settings.cache_info().currsize == 0
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_importing_the_app_does_not_touch_the_database(tmp_path):
+    database = tmp_path / "missing" / "app.db"
+    result = run_python("""
+        import app.main
+        from app.database import async_engines, sync_engines
+        assert async_engines.cache_info().currsize == 0
+        assert sync_engines.cache_info().currsize == 0
+    """, DATABASE_URL=f"sqlite:///{database}", SECRET_KEY="x")
+    assert result.returncode == 0, result.stderr
+    assert not database.parent.exists()
+
+
+def test_lifespan_creates_schema_and_primes_pools(tmp_path):
+    database = tmp_path / "app.db"
+    result = run_python("""
+        from fastapi.testclient import TestClient
+        from sqlalchemy import inspect
+        from app import database
+        from app.main import app
+
+        with TestClient(app) as client:
+            # aiosqlite does not pool file databases; the sync driver does
+            assert database.engine.pool.checkedin() == 2
+            assert client.get("/health/ready").status_code == 200
+            assert "swap_requests" in inspect(database.engine).get_table_names()
+    """, DATABASE_URL=f"sqlite:///{database}", SECRET_KEY="x", DB_ASYNC="false", DB_CREATE_SCHEMA="true")
+    assert result.returncode == 0, result.stderr
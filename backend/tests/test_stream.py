@@ -0,0 +1,218 @@
+import asyncio
+import pytest
+from app.core import broker as broker_module
+from app.core.broker import InMemoryBroker, Message, PostgresBroker
+from app.api.routes.stream import event_stream, format_sse
+from tests.conftest import create_swappable_slot, get_auth_header
+
+
+def test_message_json_round_trip():
+    message = Message(type="slot.updated", data={"ids": [1, 2], "status": "BUSY"}, user_ids=frozenset({3, 1}))
+    assert Message.from_json(message.to_json()) == message
+
+    broadcast = Message(type="slot.deleted", data={"ids": [1]})
+    assert Message.from_json(broadcast.to_json()).user_ids is None
+
+
+def test_broker_delivers_only_to_audience():
+    async def scenario():
+        broker = InMemoryBroker(queue_size=10)
+        async with broker.subscribe(1) as alice, broker.subscribe(2) as bob:
+            await broker.publish(Message(type="swap_request.created", data={"id": 1}, user_ids=frozenset({1})))
+            await broker.publish(Message(type="slot.updated", data={"ids": [5]}))
+            await asyncio.sleep(0)
+            return [m.type for m in _drain(alice)], [m.type for m in _drain(bob)], broker.subscriber_count
+
+    alice, bob, subscribers = asyncio.run(scenario())
+    assert alice == ["swap_request.created", "slot.updated"]
+    assert bob == ["slot.updated"]
+    assert subscribers == 2
+
+
+def test_event_stream_keepalive_and_resync():
+    async def scenario():
+        broker = InMemoryBroker(queue_size=1)
+        async with broker.subscribe(1) as subscription:
+            stream = event_stream(subscription, keepalive_seconds=0.01)
+            chunks = [await stream.__anext__(), await stream.__anext__()]
+
+            message = Message(type="slot.updated", data={"ids": [1]})
+            await broker.publish(message)
+            await asyncio.sleep(0)
+            chunks.append(await stream.__anext__())
+
+            # Overflow the queue: the client is told to refetch and the stream ends
+            for _ in range(3):
+                await broker.publish(message)
+            await asyncio.sleep(0)
+            chunks.append(await stream.__anext__())
+            with pytest.raises(StopAsyncIteration):
+                await stream.__anext__()
+            return chunks, format_sse(message)
+
+    chunks, formatted = asyncio.run(scenario())
+    assert chunks[0] == "retry: 5000\n\n"
+    assert chunks[1] == ": keepalive\n\n"
+    assert chunks[2] == formatted == 'event: slot.updated\ndata: {"ids": [1]}\n\n'
+    assert chunks[3].startswith("event: resync")
+
+
+class FakeConnection:
+    """The slice of an asyncpg connection PostgresBroker uses."""
+
+    def __init__(self):
+        self.listeners = {}
+        self.on_terminate = []
+        self.closed = False
+
+    def add_termination_listener(self, callback):
+        self.on_terminate.append(callback)
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    async def execute(self, query, *args):
+        if self.closed:
+            raise ConnectionError("connection is closed")
+        if "pg_notify" in query:
+            channel, payload = args
+            if len(payload.encode()) >= 8000:
+                raise ValueError("payload string too long")
+            for connection in FakeConnection.open:
+                if channel in connection.listeners:
+                    connection.listeners[channel](connection, 1, channel, payload)
+
+    def is_closed(self):
+        return self.closed
+
+    def terminate(self):
+        self.closed = True
+        FakeConnection.open.remove(self)
+        for callback in self.on_terminate:
+            callback(self)
+
+    async def close(self):
+        if not self.closed:
+            self.terminate()
+
+
+def test_postgres_broker_reconnects_and_resyncs(monkeypatch):
+    FakeConnection.open = []
+    attempts = []
+
+    async def connect():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise OSError("database is starting up")
+        connection = FakeConnection()
+        FakeConnection.open.append(connection)
+        return connection
+
+    async def scenario():
+        broker = PostgresBroker("postgresql://example", queue_size=10, reconnect_delay=0.01)
+        monkeypatch.setattr(broker, "_connect", connect)
+        # A failed first LISTEN does not fail startup
+        await broker.start()
+        async with broker.subscribe(1) as subscription:
+            while broker._listen_conn is None:
+                await asyncio.sleep(0.01)
+            subscription.overflowed = False
+            broker._listen_conn.terminate()
+            while broker._listen_conn is None or broker._listen_conn.closed:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0)
+            # Messages sent while disconnected are gone, so the stream resyncs
+            assert subscription.overflowed
+            subscription.overflowed = False
+            await broker.publish(Message(type="slot.updated", data={"ids": [1]}))
+            await asyncio.sleep(0)
+            message = subscription.queue.get_nowait()
+        await broker.stop()
+        return message
+
+    assert asyncio.run(scenario()).type == "slot.updated"
+    # The failed attempt, the first LISTEN, the notify connection and the new LISTEN
+    assert len(attempts) == 4
+    assert FakeConnection.open == []
+
+
+def test_postgres_broker_splits_large_messages(monkeypatch):
+    FakeConnection.open = []
+
+    async def connect():
+        connection = FakeConnection()
+        FakeConnection.open.append(connection)
+        return connection
+
+    async def scenario():
+        broker = PostgresBroker("postgresql://example", queue_size=100)
+        monkeypatch.setattr(broker, "_connect", connect)
+        await broker.start()
+        async with broker.subscribe(1) as subscription:
+            while broker._listen_conn is None:
+                await asyncio.sleep(0.01)
+            subscription.overflowed = False
+            # A batch touching a few thousand slots
+            await broker.publish(Message(type="slot.updated", data={"ids": list(range(100000, 103000)), "status": "BUSY"}))
+            await asyncio.sleep(0)
+            parts = []
+            while not subscription.queue.empty():
+                parts.append(subscription.queue.get_nowait())
+            assert not subscription.overflowed
+            # Nothing to split: the subscribers are told to refetch instead
+            await broker.publish(Message(type="slot.updated", data={"title": "x" * 10000}))
+            await asyncio.sleep(0)
+            assert subscription.overflowed
+        await broker.stop()
+        return parts
+
+    parts = asyncio.run(scenario())
+    assert len(parts) > 1
+    assert {part.data["status"] for part in parts} == {"BUSY"}
+    assert [i for part in parts for i in part.data["ids"]] == list(range(100000, 103000))
+
+
+def test_stream_requires_token(client):
+    assert client.get("/api/stream").status_code == 401
+    assert client.get("/api/stream", params={"token": "invalid"}).status_code == 401
+
+
+def test_swap_lifecycle_publishes_notifications(client, monkeypatch):
+    published = []
+
+    async def record(message):
+        published.append(message)
+
+    monkeypatch.setattr(broker_module.broker, "publish", record)
+
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    alice_id = client.get("/api/auth/me", headers=alice).json()["id"]
+    bob_id = client.get("/api/auth/me", headers=bob).json()["id"]
+    alice_slot_id = create_swappable_slot(client, alice, "Alice slot")
+    bob_slot_id = create_swappable_slot(client, bob, "Bob slot")
+    published.clear()
+
+    response = client.post(
+        "/api/swap-request",
+        json={"my_slot_id": alice_slot_id, "their_slot_id": bob_slot_id},
+        headers=alice,
+    )
+    request_id = response.json()["id"]
+    client.post(f"/api/swap-response/{request_id}", json={"accept": True}, headers=bob)
+
+    assert [(m.type, m.user_ids) for m in published] == [
+        ("swap_request.created", frozenset({alice_id, bob_id})),
+        ("slot.updated", None),
+        ("swap_request.accepted", frozenset({alice_id, bob_id})),
+        ("slot.updated", frozenset({alice_id, bob_id})),
+    ]
+    assert published[1].data == {"ids": sorted([alice_slot_id, bob_slot_id]), "status": "SWAP_PENDING"}
+    assert published[3].data["status"] == "BUSY"
+
+
+def _drain(subscription):
+    messages = []
+    while not subscription.queue.empty():
+        messages.append(subscription.queue.get_nowait())
+    return messages
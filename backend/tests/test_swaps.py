@@ -0,0 +1,296 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi import status
+from sqlalchemy import event, update
+from app.api.routes import swaps
+from app.models.event import Event, EventStatus
+from app.utils.locking import RowLockUnavailable
+from tests.conftest import async_engine, create_swap_requests, create_swappable_slot, get_auth_header
+
+
+def count_queries(client, url, headers):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == status.HTTP_200_OK
+    return len(statements), response.json()
+
+
+def test_swappable_slots_keyset_pagination(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    slot_ids = [create_swappable_slot(client, bob, f"Bob slot {i}", days=i + 1) for i in range(5)]
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/api/swappable-slots", params=params, headers=alice)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) <= 2
+        seen.extend(slot["id"] for slot in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        params = {"limit": 2, "cursor": next_cursor}
+
+    assert seen == slot_ids
+
+
+def test_swappable_slots_filters(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    short_slot = create_swappable_slot(client, bob, "Short", days=1, hours=1)
+    long_slot = create_swappable_slot(client, bob, "Long", days=3, hours=4)
+    late_slot = create_swappable_slot(client, bob, "Late", days=10, hours=4)
+
+    window = {
+        "from": (datetime.utcnow() + timedelta(days=2)).isoformat(),
+        "to": (datetime.utcnow() + timedelta(days=5)).isoformat(),
+    }
+    response = client.get("/api/swappable-slots", params=window, headers=alice)
+    assert [slot["id"] for slot in response.json()] == [long_slot]
+
+    response = client.get("/api/swappable-slots", params={"min_duration": 120}, headers=alice)
+    assert [slot["id"] for slot in response.json()] == [long_slot, late_slot]
+    assert short_slot not in [slot["id"] for slot in response.json()]
+
+
+def test_swappable_slots_invalid_cursor(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    response = client.get("/api/swappable-slots", params={"cursor": "not-a-cursor"}, headers=alice)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_incoming_swap_requests_details(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 1)
+
+    response = client.get("/api/swap-requests/incoming", headers=bob)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["requester_name"] == "Alice"
+    assert data[0]["receiver_name"] == "Bob"
+    assert data[0]["requester_slot_title"] == "Alice slot 0"
+    assert data[0]["requested_slot_title"] == "Bob slot 0"
+
+
+@pytest.mark.parametrize("url, viewer", [
+    ("/api/swap-requests/incoming", "bob"),
+    ("/api/swap-requests/outgoing", "alice"),
+])
+def test_swap_request_listing_query_count_is_constant(client, url, viewer):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    headers = {"alice": alice, "bob": bob}[viewer]
+
+    create_swap_requests(client, alice, bob, 1)
+    queries_for_one, data = count_queries(client, url, headers)
+    assert len(data) == 1
+
+    create_swap_requests(client, alice, bob, 5, first_day=2)
+    queries_for_six, data = count_queries(client, url, headers)
+    assert len(data) == 6
+
+    assert queries_for_six == queries_for_one
+
+
+def test_accept_swap_request_exchanges_owners(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 1)
+    request_id = client.get("/api/swap-requests/incoming", headers=bob).json()[0]["id"]
+
+    response = client.post(f"/api/swap-response/{request_id}", json={"accept": True}, headers=bob)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "ACCEPTED"
+    assert [e["title"] for e in client.get("/api/events", headers=alice).json()] == ["Bob slot 0"]
+    assert [e["title"] for e in client.get("/api/events", headers=bob).json()] == ["Alice slot 0"]
+
+
+def test_respond_rejects_request_whose_slots_moved_on(client, db):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 1)
+    request_id = client.get("/api/swap-requests/incoming", headers=bob).json()[0]["id"]
+
+    # A concurrent transition already released one of the slots
+    db.get(Event, 1).status = EventStatus.SWAPPABLE
+    db.commit()
+
+    response = client.post(f"/api/swap-response/{request_id}", json={"accept": False}, headers=bob)
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+def test_locked_slot_returns_conflict(client, monkeypatch):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    my_slot = create_swappable_slot(client, alice, "Alice slot")
+    their_slot = create_swappable_slot(client, bob, "Bob slot")
+
+    async def locked(db, model, ids):
+        raise RowLockUnavailable()
+
+    monkeypatch.setattr(swaps, "lock_rows", locked)
+    response = client.post(
+        "/api/swap-request",
+        json={"my_slot_id": my_slot, "their_slot_id": their_slot},
+        headers=alice
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+def test_concurrent_event_write_returns_conflict(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    slot_id = create_swappable_slot(client, alice, "Alice slot")
+
+    def concurrent_writer(mapper, connection, target):
+        # Another transaction bumps the row between our read and our write
+        connection.execute(
+            update(Event.__table__)
+            .where(Event.__table__.c.id == target.id)
+            .values(version=Event.__table__.c.version + 1)
+        )
+
+    event.listen(Event, "before_update", concurrent_writer)
+    try:
+        response = client.put(f"/api/events/{slot_id}", json={"status": "BUSY"}, headers=alice)
+    finally:
+        event.remove(Event, "before_update", concurrent_writer)
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert client.get(f"/api/events/{slot_id}", headers=alice).json()["status"] == "SWAPPABLE"
+
+
+def test_swappable_slots_conditional_get(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    slot_ids = [create_swappable_slot(client, bob, f"Bob slot {i}", days=i + 1) for i in range(3)]
+    
+    first = client.get("/api/swappable-slots", params={"limit": 2}, headers=alice)
+    etag = first.headers["etag"]
+    
+    cached = client.get("/api/swappable-slots", params={"limit": 2}, headers={**alice, "If-None-Match": etag})
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.headers["x-next-cursor"] == first.headers["x-next-cursor"]
+    
+    client.put(f"/api/events/{slot_ids[1]}", json={"title": "Renamed"}, headers=bob)
+    changed = client.get("/api/swappable-slots", params={"limit": 2}, headers={**alice, "If-None-Match": etag})
+    assert changed.status_code == status.HTTP_200_OK
+    assert changed.json()[1]["title"] == "Renamed"
+
+
+def test_accepting_a_swap_that_would_double_book_is_refused(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    alice_slot = create_swappable_slot(client, alice, "Alice slot", days=3)
+    bob_slot = create_swappable_slot(client, bob, "Bob slot", days=4)
+    request_id = client.post(
+        "/api/swap-request", json={"my_slot_id": alice_slot, "their_slot_id": bob_slot}, headers=alice
+    ).json()["id"]
+    start = datetime.fromisoformat(client.get(f"/api/events/{alice_slot}", headers=alice).json()["start_time"])
+    # Bob books a meeting during the slot Alice offers
+    meeting = client.post(
+        "/api/events",
+        json={
+            "title": "Meeting",
+            "start_time": (start + timedelta(minutes=30)).isoformat(),
+            "end_time": (start + timedelta(hours=2)).isoformat()
+        },
+        headers=bob
+    ).json()["id"]
+
+    response = client.post(f"/api/swap-response/{request_id}", json={"accept": True}, headers=bob)
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["conflicting_event_ids"] == [meeting]
+    assert client.get("/api/swap-requests/incoming", headers=bob).json()[0]["status"] == "PENDING"
+    # Rejecting still works
+    response = client.post(f"/api/swap-response/{request_id}", json={"accept": False}, headers=bob)
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_bulk_swap_responses_apply_in_one_transaction(client, query_budget):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 6)
+    incoming = client.get("/api/swap-requests/incoming", headers=bob).json()
+    decisions = [{"request_id": r["id"], "accept": i % 2 == 0} for i, r in enumerate(incoming)]
+
+    with query_budget(5, "POST /api/swap-responses"):
+        response = client.post("/api/swap-responses", json={"decisions": decisions}, headers=bob)
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["applied"] is True
+    assert [r["swap_request"]["status"] for r in data["results"]] == ["ACCEPTED", "REJECTED"] * 3
+    bob_events = {e["id"]: e["status"] for e in client.get("/api/events", headers=bob).json()}
+    for request, decision in zip(incoming, decisions):
+        if decision["accept"]:
+            assert bob_events[request["requester_slot_id"]] == "BUSY"
+        else:
+            assert bob_events[request["requested_slot_id"]] == "SWAPPABLE"
+    assert client.get("/api/swap-requests/incoming", headers=bob).json() == []
+
+
+def test_bulk_swap_responses_report_failures_per_decision(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    create_swap_requests(client, alice, bob, 2)
+    first, second = [r["id"] for r in client.get("/api/swap-requests/incoming", headers=bob).json()]
+    decisions = [
+        {"request_id": first, "accept": True},
+        {"request_id": first, "accept": False},
+        {"request_id": 999, "accept": True},
+        {"request_id": second, "accept": False},
+    ]
+
+    response = client.post("/api/swap-responses", json={"decisions": decisions}, headers=bob)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [r["status_code"] for r in response.json()["results"]] == [424, 409, 404, 424]
+    assert len(client.get("/api/swap-requests/incoming", headers=bob).json()) == 2
+    # Alice cannot answer requests she sent
+    response = client.post("/api/swap-responses", json={"decisions": decisions[:1]}, headers=alice)
+    assert [r["status_code"] for r in response.json()["results"]] == [404]
+
+    response = client.post(
+        "/api/swap-responses", json={"decisions": decisions, "atomic": False}, headers=bob
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [r["status_code"] for r in response.json()["results"]] == [200, 409, 404, 200]
+    assert client.get("/api/swap-requests/incoming", headers=bob).json() == []
+
+
+def test_bulk_swap_responses_refuse_accepting_overlapping_slots(client):
+    alice = get_auth_header(client, "Alice", "alice@example.com")
+    carol = get_auth_header(client, "Carol", "carol@example.com")
+    bob = get_auth_header(client, "Bob", "bob@example.com")
+    # Alice and Carol offer Bob slots at the same time for two of his
+    alice_slot = create_swappable_slot(client, alice, "Alice slot", days=5)
+    carol_slot = create_swappable_slot(client, carol, "Carol slot", days=5)
+    bob_slots = [create_swappable_slot(client, bob, f"Bob slot {i}", days=i + 1) for i in range(2)]
+    for headers, slot, bob_slot in ((alice, alice_slot, bob_slots[0]), (carol, carol_slot, bob_slots[1])):
+        client.post("/api/swap-request", json={"my_slot_id": slot, "their_slot_id": bob_slot}, headers=headers)
+    decisions = [
+        {"request_id": r["id"], "accept": True}
+        for r in client.get("/api/swap-requests/incoming", headers=bob).json()
+    ]
+
+    response = client.post("/api/swap-responses", json={"decisions": decisions, "atomic": False}, headers=bob)
+
+    results = response.json()["results"]
+    assert sorted(r["status_code"] for r in results) == [200, 409]
+    refused, = [r for r in results if r["status_code"] == 409]
+    assert refused["conflicting_event_ids"] in ([alice_slot], [carol_slot])
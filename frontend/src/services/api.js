@@ -15,6 +15,19 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Fetch every page of a keyset-paginated list by following X-Next-Cursor.
+// Resolves like a single response whose data holds all the items.
+const getAllPages = async (url, params = {}) => {
+  const items = [];
+  let cursor;
+  do {
+    const response = await api.get(url, { params: { limit: 200, ...params, cursor } });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return { data: items };
+};
+
 // Auth API
 export const authAPI = {
   signup: (data) => api.post('/auth/signup', data),
@@ -28,15 +41,16 @@ export const eventsAPI = {
   createEvent: (data) => api.post('/events', data),
   updateEvent: (id, data) => api.put(`/events/${id}`, data),
   deleteEvent: (id) => api.delete(`/events/${id}`),
-  getSwappableSlots: () => api.get('/swappable-slots'),
+  batchEvents: (operations, atomic = true) => api.post('/events/batch', { operations, atomic }),
+  getSwappableSlots: (params) => getAllPages('/swappable-slots', params),
 };
 
 // Swap API
 export const swapAPI = {
   createSwapRequest: (data) => api.post('/swap-request', data),
   respondToSwap: (id, accept) => api.post(`/swap-response/${id}`, { accept }),
-  getIncomingRequests: () => api.get('/swap-requests/incoming'),
-  getOutgoingRequests: () => api.get('/swap-requests/outgoing'),
+  getIncomingRequests: () => getAllPages('/swap-requests/incoming'),
+  getOutgoingRequests: () => getAllPages('/swap-requests/outgoing'),
   cancelSwapRequest: (id) => api.delete(`/swap-request/${id}`),
 };
 